@@ -108,37 +108,45 @@ public function conectar(Request $request)
 
             $timeout = min(max($timeout, 1), 30);
 
-            $scriptPath = base_path('scripts/detector_universal_basculas.py');
-            if (!file_exists($scriptPath)) {
-                throw new \Exception('Script Python no encontrado');
-            }
+            $resultado = $this->consultarDaemon([
+                'comando' => 'conectar',
+                'puerto' => $puerto,
+                'timeout' => $timeout
+            ], $timeout + 10);
+
+            if ($resultado === null) {
+                $scriptPath = base_path('scripts/detector_universal_basculas.py');
+                if (!file_exists($scriptPath)) {
+                    throw new \Exception('Script Python no encontrado');
+                }
 
-            $pythonPath = $this->getPythonPath();
+                $pythonPath = $this->getPythonPath();
 
-            $process = new Process([
-                $pythonPath,
-                $scriptPath,
-                'conectar',
-                $puerto,
-                (string)$timeout
-            ]);
-            $process->setTimeout($timeout + 10);
-            $process->run();
+                $process = new Process([
+                    $pythonPath,
+                    $scriptPath,
+                    'conectar',
+                    $puerto,
+                    (string)$timeout
+                ]);
+                $process->setTimeout($timeout + 10);
+                $process->run();
 
-            $output = trim($process->getOutput());
-            $errorOutput = trim($process->getErrorOutput());
+                $output = trim($process->getOutput());
+                $errorOutput = trim($process->getErrorOutput());
 
-            if ($errorOutput) {
-            }
+                if ($errorOutput) {
+                }
 
-            if (!$process->isSuccessful()) {
-                throw new \Exception('Error ejecutando script: ' . ($errorOutput ?: 'Proceso falló'));
-            }
+                if (!$process->isSuccessful()) {
+                    throw new \Exception('Error ejecutando script: ' . ($errorOutput ?: 'Proceso falló'));
+                }
 
-            $resultado = json_decode($output, true);
+                $resultado = json_decode($output, true);
 
-            if (json_last_error() !== JSON_ERROR_NONE) {
-                throw new \Exception("Respuesta JSON inválida del script: " . $output);
+                if (json_last_error() !== JSON_ERROR_NONE) {
+                    throw new \Exception("Respuesta JSON inválida del script: " . $output);
+                }
             }
 
             if ($resultado['success']) {
@@ -189,38 +197,46 @@ public function leerPeso(Request $request)
 
             $timeout = min(max($timeout, 1), 10);
 
-            $scriptPath = base_path('scripts/detector_universal_basculas.py');
-            if (!file_exists($scriptPath)) {
-                throw new \Exception('Script Python no encontrado');
-            }
+            $resultado = $this->consultarDaemon([
+                'comando' => 'leer',
+                'puerto' => $puerto,
+                'timeout' => $timeout
+            ], $timeout + 5);
 
-            $pythonPath = $this->getPythonPath();
+            if ($resultado === null) {
+                $scriptPath = base_path('scripts/detector_universal_basculas.py');
+                if (!file_exists($scriptPath)) {
+                    throw new \Exception('Script Python no encontrado');
+                }
 
-            $process = new Process([
-                $pythonPath,
-                $scriptPath,
-                'leer',
-                $puerto,
-                (string)$currentConfig['baudios'],
-                (string)$timeout
-            ]);
+                $pythonPath = $this->getPythonPath();
 
-            $process->setTimeout($timeout + 5);
-            $process->run();
+                $process = new Process([
+                    $pythonPath,
+                    $scriptPath,
+                    'leer',
+                    $puerto,
+                    (string)$currentConfig['baudios'],
+                    (string)$timeout
+                ]);
 
-            $output = trim($process->getOutput());
-            $errorOutput = trim($process->getErrorOutput());
+                $process->setTimeout($timeout + 5);
+                $process->run();
 
-            if ($errorOutput) {
-            }
+                $output = trim($process->getOutput());
+                $errorOutput = trim($process->getErrorOutput());
 
-            if (!$process->isSuccessful()) {
-            }
+                if ($errorOutput) {
+                }
+
+                if (!$process->isSuccessful()) {
+                }
 
-            $resultado = json_decode($output, true);
+                $resultado = json_decode($output, true);
 
-            if (json_last_error() !== JSON_ERROR_NONE) {
-                throw new \Exception("Error en la comunicación con la báscula");
+                if (json_last_error() !== JSON_ERROR_NONE) {
+                    throw new \Exception("Error en la comunicación con la báscula");
+                }
             }
 
             if ($resultado['success']) {
@@ -231,6 +247,7 @@ public function leerPeso(Request $request)
                     'peso_kg' => $peso,
                     'timestamp' => now()->toISOString(),
                     'puerto' => $puerto,
+                    'estable' => $resultado['estable'] ?? false,
                     'formato_detectado' => $resultado['formato_detectado'] ?? 'desconocido',
                     'metodo' => $resultado['metodo'] ?? 'desconocido',
                     'raw_data' => $resultado['raw_data'] ?? null,
@@ -254,18 +271,171 @@ public function leerPeso(Request $request)
         }
     }
 
+    public function leerPesoEstable(Request $request)
+    {
+        try {
+            $currentConfig = $this->obtenerConfiguracion();
+            $puerto = $request->input('puerto', $currentConfig['puerto']);
+            $plazo = min(max((float) $request->input('plazo', 10), 1), 30);
+
+            $resultado = $this->consultarDaemon([
+                'comando' => 'leer_estable',
+                'puerto' => $puerto,
+                'plazo' => $plazo
+            ], $plazo + 5);
+
+            if ($resultado === null) {
+                $scriptPath = base_path('scripts/detector_universal_basculas.py');
+                if (!file_exists($scriptPath)) {
+                    throw new \Exception('Script Python no encontrado');
+                }
+
+                $process = new Process([
+                    $this->getPythonPath(),
+                    $scriptPath,
+                    'leer_estable',
+                    $puerto,
+                    (string)$plazo
+                ]);
+                $process->setTimeout($plazo + 10);
+                $process->run();
+
+                $resultado = json_decode(trim($process->getOutput()), true);
+
+                if (json_last_error() !== JSON_ERROR_NONE) {
+                    throw new \Exception("Error en la comunicación con la báscula");
+                }
+            }
+
+            return response()->json([
+                'success' => $resultado['success'] ?? false,
+                'peso_kg' => $resultado['peso'] ?? 0,
+                'estable' => $resultado['estable'] ?? false,
+                'timestamp' => now()->toISOString(),
+                'puerto' => $puerto,
+                'formato_detectado' => $resultado['formato_detectado'] ?? 'desconocido',
+                'mensaje' => $resultado['error'] ?? ($resultado['mensaje'] ?? 'Peso estable'),
+                'requiere_conexion' => $resultado['requiere_conexion'] ?? false
+            ]);
+        } catch (\Exception $e) {
+            return response()->json([
+                'success' => false,
+                'mensaje' => 'Error de comunicación con la báscula: ' . $e->getMessage(),
+                'peso_kg' => 0,
+                'estable' => false,
+                'error_tecnico' => $e->getMessage()
+            ], 200);
+        }
+    }
+
+    public function leerTodas(Request $request)
+    {
+        try {
+            $resultado = $this->consultarDaemon(['comando' => 'leer_todas'], 10);
+
+            if ($resultado === null) {
+                $scriptPath = base_path('scripts/detector_universal_basculas.py');
+                if (!file_exists($scriptPath)) {
+                    throw new \Exception('Script Python no encontrado');
+                }
+
+                $puertos = (array) $request->input('puertos', [$this->obtenerPuertoConfigurado()]);
+
+                $process = new Process(array_merge(
+                    [$this->getPythonPath(), $scriptPath, 'leer_todas'],
+                    array_map('strval', $puertos)
+                ));
+                $process->setTimeout(15);
+                $process->run();
+
+                $resultado = json_decode(trim($process->getOutput()), true);
+
+                if (json_last_error() !== JSON_ERROR_NONE) {
+                    throw new \Exception("Error en la comunicación con las básculas");
+                }
+            }
+
+            $basculas = [];
+            foreach ($resultado['basculas'] ?? [] as $id => $lectura) {
+                $basculas[$id] = [
+                    'success' => $lectura['success'] ?? false,
+                    'puerto' => $lectura['puerto'] ?? $id,
+                    'peso_kg' => $lectura['peso'] ?? 0,
+                    'estable' => $lectura['estable'] ?? false,
+                    'estado' => $lectura['estado'] ?? (($lectura['success'] ?? false) ? 'conectado' : 'desconectado'),
+                    'formato_detectado' => $lectura['formato_detectado'] ?? 'desconocido',
+                    'mensaje' => $lectura['error'] ?? ($lectura['mensaje'] ?? null)
+                ];
+            }
+
+            return response()->json([
+                'success' => $resultado['success'] ?? false,
+                'basculas' => $basculas,
+                'conectadas' => $resultado['conectadas'] ?? 0,
+                'timestamp' => now()->toISOString()
+            ]);
+        } catch (\Exception $e) {
+            return response()->json([
+                'success' => false,
+                'mensaje' => 'Error de comunicación con las básculas: ' . $e->getMessage(),
+                'basculas' => [],
+                'error_tecnico' => $e->getMessage()
+            ], 200);
+        }
+    }
+
+    public function estadisticas(Request $request)
+    {
+        $puerto = $request->input('puerto', $this->obtenerPuertoConfigurado());
+        $ventanaMs = min(max((float) $request->input('ventana_ms', 1000), 10), 600000);
+
+        $resultado = $this->consultarDaemon([
+            'comando' => 'estadisticas',
+            'puerto' => $puerto,
+            'ventana_ms' => $ventanaMs
+        ], 5);
+
+        if ($resultado === null) {
+            return response()->json([
+                'success' => false,
+                'mensaje' => 'Las estadísticas requieren el daemon de básculas (BASCULA_DAEMON)'
+            ], 200);
+        }
+
+        return response()->json(array_merge($resultado, ['timestamp' => now()->toISOString()]));
+    }
+
+    public function tarar(Request $request)
+    {
+        $puerto = $request->input('puerto', $this->obtenerPuertoConfigurado());
+
+        $resultado = $this->consultarDaemon(['comando' => 'tarar', 'puerto' => $puerto], 5);
+
+        if ($resultado === null) {
+            return response()->json([
+                'success' => false,
+                'mensaje' => 'El pico desde tara requiere el daemon de básculas (BASCULA_DAEMON)'
+            ], 200);
+        }
+
+        return response()->json($resultado);
+    }
+
     public function desconectar(Request $request)
     {
         try {
             $puerto = $request->input('puerto', $this->obtenerPuertoConfigurado());
 
+            $resultado = $this->consultarDaemon(['comando' => 'cerrar', 'puerto' => $puerto], 5);
 
-            $scriptPath = base_path('scripts/detector_universal_basculas.py');
-            $pythonPath = $this->getPythonPath();
+            if ($resultado === null) {
+                $scriptPath = base_path('scripts/detector_universal_basculas.py');
+                $pythonPath = $this->getPythonPath();
 
-            $process = new Process([$pythonPath, $scriptPath, 'cerrar']);
-            $process->setTimeout(5);
-            $process->run();
+                $process = new Process([$pythonPath, $scriptPath, 'cerrar']);
+                $process->setTimeout(5);
+                $process->run();
+            }
 
             Cache::forget($this->getConexionKey($puerto));
 
@@ -356,6 +526,46 @@ public function diagnostico()
         return response()->json($diagnostico);
     }
 
+    private function consultarDaemon(array $solicitud, $timeout = 5)
+    {
+        $direccion = config('services.bascula.daemon');
+        if (!$direccion) {
+            return null;
+        }
+
+        // Solo "no hay daemon" (falla la conexión) devuelve null y deja usar el script; si el daemon
+        // aceptó la solicitud tiene el puerto abierto y el script competiría con él por la báscula
+        $socket = @stream_socket_client($direccion, $errno, $errstr, 0.5);
+        if (!$socket) {
+            return null;
+        }
+
+        try {
+            stream_set_timeout($socket, (int) ceil($timeout));
+            fwrite($socket, json_encode($solicitud) . "\n");
+            $linea = fgets($socket);
+            $agotado = stream_get_meta_data($socket)['timed_out'];
+        } finally {
+            fclose($socket);
+        }
+
+        if ($linea === false) {
+            return [
+                'success' => false,
+                'error' => $agotado
+                    ? "El daemon de básculas no respondió en {$timeout} s"
+                    : 'El daemon de básculas cerró la conexión sin responder'
+            ];
+        }
+
+        $resultado = json_decode($linea, true);
+
+        return is_array($resultado) ? $resultado : [
+            'success' => false,
+            'error' => 'Respuesta inválida del daemon de básculas'
+        ];
+    }
+
     private function getPythonPath()
     {
         $venvPath = base_path('venv');
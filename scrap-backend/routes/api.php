@@ -72,6 +72,10 @@
         Route::get('/puertos', [BasculaController::class, 'listarPuertos']);
         Route::post('/conectar', [BasculaController::class, 'conectar']);
         Route::post('/leer-peso', [BasculaController::class, 'leerPeso']);
+        Route::post('/leer-estable', [BasculaController::class, 'leerPesoEstable']);
+        Route::get('/leer-todas', [BasculaController::class, 'leerTodas']);
+        Route::get('/estadisticas', [BasculaController::class, 'estadisticas']);
+        Route::post('/tarar', [BasculaController::class, 'tarar']);
         Route::post('/leer-rapido', [BasculaController::class, 'leerPesoRapido']);
         Route::post('/leer-continuo', [BasculaController::class, 'leerPesoContinuo']);
         Route::post('/iniciar-continua', [BasculaController::class, 'iniciarLecturaContinua']);
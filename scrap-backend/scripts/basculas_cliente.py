@@ -0,0 +1,201 @@
+""" scripts/basculas_cliente.py """
+# Cliente mínimo del daemon, lector de memoria compartida y utilidades de línea de comandos;
+# solo biblioteca estándar para que la CLI pueda atender una orden sin cargar pyserial.
+import json
+import os
+import mmap
+import time
+import socket
+import struct
+from collections import namedtuple
+
+DIRECCION_DAEMON_DEFECTO = "tcp://127.0.0.1:8765"
+
+
+def _parsear_direccion(direccion):
+    if direccion.startswith("unix://"):
+        return "unix", direccion[len("unix://"):]
+
+    if direccion.startswith("tcp://"):
+        direccion = direccion[len("tcp://"):]
+
+    host, _, puerto = direccion.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(puerto))
+
+
+class DaemonNoDisponible(OSError):
+    """No hay daemon escuchando en la dirección; el llamador puede ejecutar la orden en proceso."""
+
+
+def direccion_daemon(argumentos):
+    """--daemon DIR, luego BASCULA_DAEMON, luego la dirección por defecto; None con --local o BASCULA_DAEMON=off."""
+    if '--local' in argumentos:
+        return None
+    direccion = _leer_opcion(argumentos, '--daemon') or os.environ.get("BASCULA_DAEMON") or DIRECCION_DAEMON_DEFECTO
+    return None if direccion.lower() in ("off", "no", "0") else direccion
+
+
+def consultar_daemon(direccion, solicitud, timeout=2.0, timeout_conexion=None):
+    tipo, destino = _parsear_direccion(direccion)
+    familia = socket.AF_UNIX if tipo == "unix" else socket.AF_INET
+
+    with socket.socket(familia, socket.SOCK_STREAM) as s:
+        # Conectar falla en milisegundos si no hay daemon; la respuesta puede tardar lo que tarde la báscula
+        s.settimeout(timeout_conexion or timeout)
+        try:
+            s.connect(destino)
+        except OSError as e:
+            raise DaemonNoDisponible(f"Daemon no disponible en {direccion}: {e}") from e
+        s.settimeout(timeout)
+        s.sendall(json.dumps(solicitud).encode("utf-8") + b"\n")
+        with s.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+# Segmento de memoria compartida por báscula (archivo mapeado, little-endian, tamaño fijo):
+#   0    cabecera: b"BSCL", versión u16, número de formatos u16, reservado u32, puerto 48s
+#   64   secuencia u64 del seqlock: impar mientras el escritor actualiza el registro
+#   72   registro: peso f64, monotonic_ns i64, timestamp f64, lecturas u64, estable u8, formato u8, conectado u8
+#   128  tabla de formatos, 16 bytes por nombre; el ID de formato es la posición (0 = sin formato)
+MAGIA_MEMORIA = b"BSCL"
+VERSION_MEMORIA = 1
+TAMANO_MEMORIA = 1024
+CABECERA_MEMORIA = struct.Struct("<4sHHI48s")
+SECUENCIA_MEMORIA = struct.Struct("<Q")
+REGISTRO_MEMORIA = struct.Struct("<dqdQBBB")
+DESPLAZAMIENTO_SECUENCIA = 64
+DESPLAZAMIENTO_REGISTRO = 72
+DESPLAZAMIENTO_FORMATOS = 128
+LARGO_FORMATO = 16
+MAXIMO_FORMATOS = (TAMANO_MEMORIA - DESPLAZAMIENTO_FORMATOS) // LARGO_FORMATO
+
+InstantaneaMemoria = namedtuple(
+    "InstantaneaMemoria",
+    ["peso", "monotonic_ns", "timestamp", "lecturas", "estable", "formato", "conectado", "secuencia"]
+)
+
+
+def directorio_memoria(argumentos):
+    """Directorio de los segmentos por --shm DIR o BASCULA_SHM; None si la publicación está desactivada."""
+    return _leer_opcion(argumentos, '--shm') or os.environ.get("BASCULA_SHM") or None
+
+
+def ruta_memoria(directorio, puerto):
+    """/dev/ttyUSB0 -> <directorio>/dev_ttyUSB0.shm, COM3 -> <directorio>/COM3.shm"""
+    nombre = "".join(c if c.isalnum() else "_" for c in puerto).strip("_")
+    return os.path.join(directorio, f"{nombre}.shm")
+
+
+class LectorMemoria:
+    """Lee la última lectura publicada por el detector de otro proceso, sin llamadas al sistema por lectura.
+
+    El escritor incrementa la secuencia antes y después de cada actualización; una instantánea es
+    consistente si la secuencia era par y no cambió mientras se copiaba el registro.
+    """
+
+    def __init__(self, ruta):
+        with open(ruta, "rb") as archivo:
+            self._mapa = mmap.mmap(archivo.fileno(), TAMANO_MEMORIA, access=mmap.ACCESS_READ)
+        magia, version, formatos, _, puerto = CABECERA_MEMORIA.unpack_from(self._mapa, 0)
+        if magia != MAGIA_MEMORIA or version != VERSION_MEMORIA:
+            self._mapa.close()
+            raise ValueError(f"{ruta} no es un segmento de báscula (versión {VERSION_MEMORIA})")
+        self.ruta = ruta
+        self.puerto = puerto.rstrip(b"\0").decode("utf-8", "replace")
+        self.formatos = [
+            bytes(self._mapa[i:i + LARGO_FORMATO]).rstrip(b"\0").decode("ascii")
+            for i in range(DESPLAZAMIENTO_FORMATOS, DESPLAZAMIENTO_FORMATOS + formatos * LARGO_FORMATO, LARGO_FORMATO)
+        ]
+
+    def leer(self, plazo=0.5):
+        mapa = self._mapa
+        intentos = 0
+        limite = None
+        while True:
+            antes, = SECUENCIA_MEMORIA.unpack_from(mapa, DESPLAZAMIENTO_SECUENCIA)
+            if not antes & 1:
+                registro = REGISTRO_MEMORIA.unpack_from(mapa, DESPLAZAMIENTO_REGISTRO)
+                despues, = SECUENCIA_MEMORIA.unpack_from(mapa, DESPLAZAMIENTO_SECUENCIA)
+                if antes == despues:
+                    return InstantaneaMemoria(*registro, antes)
+
+            intentos += 1
+            if intentos < 64:
+                continue
+            # Si el planificador expropió al escritor a mitad de la actualización, girar no lo deja terminar
+            if limite is None:
+                limite = time.monotonic() + plazo
+            elif time.monotonic() > limite:
+                raise RuntimeError(f"El escritor de {self.ruta} no terminó la actualización")
+            time.sleep(0)
+
+    def nombre_formato(self, formato):
+        return self.formatos[formato] if 0 < formato < len(self.formatos) else None
+
+    def resultado(self):
+        """La instantánea con las mismas claves que una lectura del daemon."""
+        instantanea = self.leer()
+        if not instantanea.conectado:
+            return {"success": False, "error": "Báscula desconectada", "puerto": self.puerto,
+                    "peso": instantanea.peso, "metodo": "memoria_compartida"}
+        if not instantanea.lecturas:
+            return {"success": True, "peso": 0.0, "mensaje": "Esperando datos de báscula...",
+                    "puerto": self.puerto, "metodo": "memoria_compartida"}
+        return {
+            "success": True,
+            "peso": instantanea.peso,
+            "estable": bool(instantanea.estable),
+            "formato_detectado": self.nombre_formato(instantanea.formato),
+            "metodo": "memoria_compartida",
+            "secuencia": instantanea.lecturas,
+            "timestamp": instantanea.timestamp,
+            "antiguedad_ms": round((time.monotonic_ns() - instantanea.monotonic_ns) / 1e6, 3),
+            "puerto": self.puerto
+        }
+
+    def cerrar(self):
+        self._mapa.close()
+
+
+def _leer_opcion(argumentos, nombre, defecto=None):
+    if nombre in argumentos:
+        indice = argumentos.index(nombre)
+        if indice + 1 < len(argumentos):
+            return argumentos[indice + 1]
+    return defecto
+
+
+def _leer_opciones(argumentos, nombre):
+    """Todos los valores de una opción repetible (--bascula piso=COM3 --bascula banco=COM4)."""
+    return [argumentos[i + 1] for i, argumento in enumerate(argumentos[:-1]) if argumento == nombre]
+
+
+def _basculas_configuradas(argumentos):
+    """IDs lógicos desde --bascula ID=PUERTO o BASCULA_IDS="piso=COM3,banco=COM4"."""
+    pares = [p for p in os.environ.get("BASCULA_IDS", "").split(",") if p.strip()]
+    pares += _leer_opciones(argumentos, '--bascula')
+
+    basculas = {}
+    for par in pares:
+        identificador, separador, puerto = par.partition("=")
+        if not separador or not identificador.strip() or not puerto.strip():
+            raise ValueError(f"Báscula inválida '{par}', use ID=PUERTO")
+        basculas[identificador.strip()] = puerto.strip()
+    return basculas
+
+
+# Opciones que son solo una bandera: no consumen el argumento siguiente
+OPCIONES_SIN_VALOR = {'--local', '--resumen', '--solo-comando', '--asyncio', '--sin-reconexion', '--todas'}
+
+
+def _posicionales(argumentos):
+    posicionales = []
+    saltar = False
+    for argumento in argumentos:
+        if saltar:
+            saltar = False
+        elif argumento.startswith('--'):
+            saltar = argumento not in OPCIONES_SIN_VALOR
+        else:
+            posicionales.append(argumento)
+    return posicionales
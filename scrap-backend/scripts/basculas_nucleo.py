@@ -0,0 +1,3357 @@
+""" scripts/basculas_nucleo.py """
+# Motor serie: tramas, protocolos, detector, caché, historial y registro.
+# No importa nada de red; el daemon vive en basculas_servidor y la CLI en detector_universal_basculas.
+import serial
+import time
+import sys
+import json
+import re
+import os
+import queue
+import math
+import select
+import struct
+import bisect
+import operator
+import logging
+import threading
+from array import array
+from collections import namedtuple, deque
+from contextlib import contextmanager
+import serial.tools.list_ports
+
+from basculas_cliente import (
+    TAMANO_MEMORIA, MAGIA_MEMORIA, VERSION_MEMORIA, CABECERA_MEMORIA, SECUENCIA_MEMORIA, REGISTRO_MEMORIA,
+    DESPLAZAMIENTO_SECUENCIA, DESPLAZAMIENTO_REGISTRO, DESPLAZAMIENTO_FORMATOS, LARGO_FORMATO, MAXIMO_FORMATOS,
+    ruta_memoria
+)
+
+log = logging.getLogger("bascula")
+
+
+class _FormatoJSON(logging.Formatter):
+    _CAMPOS_ESTANDAR = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+    def format(self, registro):
+        datos = {
+            "ts": round(registro.created, 3),
+            "nivel": registro.levelname.lower(),
+            "mensaje": registro.getMessage(),
+        }
+        datos.update({k: v for k, v in vars(registro).items() if k not in self._CAMPOS_ESTANDAR})
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+def configurar_log(nivel=None, formato=None):
+    """Nivel por BASCULA_LOG_NIVEL (INFO por defecto) y formato texto|json por BASCULA_LOG_FORMATO."""
+    nivel = (nivel or os.environ.get("BASCULA_LOG_NIVEL", "INFO")).upper()
+    formato = formato or os.environ.get("BASCULA_LOG_FORMATO", "texto")
+
+    manejador = logging.StreamHandler(sys.stderr)
+    manejador.setFormatter(_FormatoJSON() if formato == "json" else logging.Formatter("%(message)s"))
+    log.handlers[:] = [manejador]
+    log.setLevel(getattr(logging, nivel, logging.INFO))
+    log.propagate = False
+
+
+class MetricasDetector:
+    """Contadores e histogramas de un detector; se exportan como JSON o texto Prometheus."""
+
+    CUBETAS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+    def __init__(self):
+        self.bloqueo = threading.Lock()
+        self.contadores = {}
+        self.histogramas = {}
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self.bloqueo:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor):
+        with self.bloqueo:
+            histograma = self.histogramas.get(nombre)
+            if histograma is None:
+                histograma = self.histogramas[nombre] = [[0] * (len(self.CUBETAS) + 1), 0.0, 0]
+            histograma[0][bisect.bisect_left(self.CUBETAS, valor)] += 1
+            histograma[1] += valor
+            histograma[2] += 1
+
+    def instantanea(self):
+        with self.bloqueo:
+            contadores = {}
+            for (nombre, etiquetas), valor in self.contadores.items():
+                clave = nombre + "".join(f"|{k}={v}" for k, v in etiquetas)
+                contadores[clave] = valor
+            histogramas = {
+                nombre: {"cubetas": list(zip(self.CUBETAS + ("+Inf",), conteos)), "suma": suma, "total": total}
+                for nombre, (conteos, suma, total) in self.histogramas.items()
+            }
+        return {"contadores": contadores, "histogramas": histogramas}
+
+
+# Instantánea inmutable publicada por el hilo lector; se reemplaza completa en cada trama
+LecturaPeso = namedtuple("LecturaPeso", ["peso", "formato", "raw", "monotonic", "secuencia", "estable"])
+
+
+def _leer_disponible(ser, plazo):
+    """Espera hasta `plazo` s a que lleguen bytes y devuelve los disponibles (b"" si no llegó ninguno).
+
+    No toca ser.timeout: en pyserial cada asignación reconfigura el puerto abierto (tcsetattr).
+    En POSIX espera con select sobre el descriptor; sin descriptor (Windows) sondea in_waiting.
+    """
+    try:
+        fd = ser.fileno()
+    except AttributeError:
+        fd = None
+
+    if fd is not None:
+        listo, _, _ = select.select([fd], [], [], max(plazo, 0.0))
+        if not listo:
+            return b""
+        # Legible sin bytes pendientes es un cuelgue del puerto: read() lo informa como excepción
+        return ser.read(ser.in_waiting or 1)
+
+    fin = time.monotonic() + plazo
+    while True:
+        pendientes = ser.in_waiting
+        if pendientes:
+            return ser.read(pendientes)
+        restante = fin - time.monotonic()
+        if restante <= 0:
+            return b""
+        time.sleep(min(restante, 0.002))
+
+
+class EnsambladorTramas:
+    """Acumula bytes del puerto y entrega solo tramas completas (CR/LF o STX/ETX)."""
+
+    _DELIMITADOR = re.compile(rb'[\r\n\x02\x03]')
+
+    def __init__(self, longitud_maxima=256):
+        self.buffer = bytearray()
+        self.longitud_maxima = longitud_maxima
+        self.bytes_descartados = 0
+        # Lo recibido antes del primer delimitador suele ser la cola de una trama cortada
+        self.sincronizado = False
+
+    def alimentar(self, datos):
+        buffer = self.buffer
+        buffer += datos
+
+        tramas = []
+        inicio = 0
+        with memoryview(buffer) as vista:
+            for delimitador in self._DELIMITADOR.finditer(buffer):
+                fin = delimitador.start()
+                if fin > inicio and self.sincronizado:
+                    tramas.append(str(vista[inicio:fin], 'ascii', 'ignore'))
+                elif fin > inicio:
+                    self.bytes_descartados += fin - inicio
+                self.sincronizado = True
+                inicio = fin + 1
+
+        if inicio:
+            del buffer[:inicio]
+
+        # Sin delimitador dentro de longitud_maxima no es una trama: se descarta
+        if len(buffer) > self.longitud_maxima:
+            self.bytes_descartados += len(buffer)
+            buffer.clear()
+
+        return tramas
+
+    def reiniciar(self):
+        self.buffer.clear()
+        self.sincronizado = False
+
+
+# Protocolos registrados en orden de prioridad para la autodetección
+PROTOCOLOS = []
+
+TramaDecodificada = namedtuple("TramaDecodificada", ["peso", "formato", "estable", "unidad"])
+
+
+def registrar_protocolo(clase):
+    PROTOCOLOS.append(clase())
+    return clase
+
+
+class ProtocoloBascula:
+    """Base de los protocolos: el patrón debe tener un grupo 'peso' y opcionalmente 'estado'."""
+
+    nombre = None
+    patron = None
+    # Unidad del peso que entrega decodificar(); convertir() lleva el valor de la trama a ella
+    unidad = "kg"
+    # Valores del grupo 'estado' que indican peso estable / en movimiento
+    estados_estables = ()
+    estados_inestables = ()
+    # Estabilidad implícita cuando el formato no trae bandera (None = desconocida)
+    estable_por_defecto = None
+
+    def convertir(self, valor):
+        return valor
+
+    def verificar(self, trama):
+        """Comprobación de integridad propia del protocolo (checksum, longitud...); los protocolos
+        registrados no traen checksum, así que por defecto toda trama que decodifica es válida."""
+        return True
+
+    def decodificar(self, trama):
+        # Los grupos solo aceptan sintaxis numérica válida, así que float() no puede fallar
+        match = self.patron.search(trama)
+        if match is None:
+            return None
+
+        peso = self.convertir(float(match.group("peso")))
+        if not 0.001 <= peso <= 1000:
+            return None
+
+        estable = self.estable_por_defecto
+        if "estado" in self.patron.groupindex:
+            estado = match.group("estado")
+            if estado in self.estados_estables:
+                estable = True
+            elif estado in self.estados_inestables:
+                estable = False
+
+        return TramaDecodificada(peso, self.nombre, estable, self.unidad)
+
+
+@registrar_protocolo
+class ProtocoloBraumkerYP200(ProtocoloBascula):
+    nombre = "braumker_yp200"
+    patron = re.compile(r'(?P<estado>ST|US),GS,(?P<peso>[+-]?\d+\.\d{2})kg')
+    estados_estables = ("ST",)
+    estados_inestables = ("US",)
+
+
+@registrar_protocolo
+class ProtocoloTorrey(ProtocoloBascula):
+    nombre = "torrey"
+    patron = re.compile(r'ST,GS[, ]*(?P<peso>[0-9]+\.[0-9]+)')
+    estable_por_defecto = True
+
+
+@registrar_protocolo
+class ProtocoloCAS(ProtocoloBascula):
+    nombre = "cas"
+    # N = neto, T = tara; el formato no informa estabilidad
+    patron = re.compile(r'[NT](?P<peso>\d+\.?\d*)')
+
+
+@registrar_protocolo
+class ProtocoloConSigno(ProtocoloBascula):
+    nombre = "signed"
+    # Exige signo o punto decimal: un entero sin signo ("000100") es una báscula en gramos, no 100 kg
+    patron = re.compile(r'(?:[+-]|(?=\d+\.))(?P<peso>\d+\.?\d*)')
+
+
+@registrar_protocolo
+class ProtocoloDecimalSimple(ProtocoloBascula):
+    nombre = "simple"
+    patron = re.compile(r'(?P<peso>\d+\.\d+)')
+
+
+@registrar_protocolo
+class ProtocoloGramos(ProtocoloBascula):
+    nombre = "gramos"
+    patron = re.compile(r'(?P<peso>\d{3,})')
+
+    def convertir(self, valor):
+        return valor / 1000.0
+
+
+def obtener_protocolo(nombre):
+    for protocolo in PROTOCOLOS:
+        if protocolo.nombre == nombre:
+            return protocolo
+    return None
+
+
+class DecodificadorPesos:
+    """Autodetecta el protocolo y lo fija tras tramas_para_fijar tramas consecutivas del mismo formato."""
+
+    _DIGITO = re.compile(r'\d')
+
+    def __init__(self, tramas_para_fijar=3, fallos_para_liberar=10):
+        self.tramas_para_fijar = tramas_para_fijar
+        self.fallos_para_liberar = fallos_para_liberar
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.protocolo_fijado = None
+        self._candidato = None
+        self._coincidencias = 0
+        self._fallos = 0
+
+    def fijar_protocolo(self, nombre):
+        protocolo = obtener_protocolo(nombre)
+        if protocolo is not None:
+            self.protocolo_fijado = protocolo
+            self._fallos = 0
+        return protocolo
+
+    def decodificar(self, datos):
+        trama = self.decodificar_trama(datos)
+        if trama is None:
+            return None, ("sin_datos" if not datos or len(datos) < 2 else "desconocido")
+        return trama.peso, trama.formato
+
+    def decodificar_trama(self, datos):
+        if not datos or len(datos) < 2 or not self._DIGITO.search(datos):
+            return None
+
+        fijado = self.protocolo_fijado
+        if fijado is not None:
+            trama = fijado.decodificar(datos)
+            if trama is not None:
+                self._fallos = 0
+                return trama
+
+            # Una trama ajena al protocolo fijado se descarta; muchas seguidas lo liberan
+            self._fallos += 1
+            if self._fallos >= self.fallos_para_liberar:
+                self.reiniciar()
+            return None
+
+        for protocolo in PROTOCOLOS:
+            trama = protocolo.decodificar(datos)
+            if trama is not None:
+                self._registrar_coincidencia(protocolo)
+                return trama
+
+        return None
+
+    def _registrar_coincidencia(self, protocolo):
+        if protocolo is self._candidato:
+            self._coincidencias += 1
+        else:
+            self._candidato = protocolo
+            self._coincidencias = 1
+
+        if self._coincidencias >= self.tramas_para_fijar:
+            self.protocolo_fijado = protocolo
+            self._fallos = 0
+
+
+# Tablas para bytes.translate: cuentan y enmascaran una captura completa sin recorrerla en Python
+_PARIDAD_IMPAR = bytes(bin(i).count("1") & 1 for i in range(256))
+_SIETE_BITS = bytes(i & 0x7F for i in range(256))
+_BIT_ALTO = bytes(i >> 7 for i in range(256))
+_IMPRIMIBLE = bytes(int(0x20 <= i < 0x7F or i in b"\r\n\t\x02\x03") for i in range(256))
+
+# 1 bit de inicio + 8 bits (datos o 7 datos + paridad/parada) + 1 de parada: leídos como 8N1 se distinguen entre sí
+ENCUADRES_10_BITS = {(8, 'N', 1), (7, 'E', 1), (7, 'O', 1)}
+
+
+def puntuar_encuadre(datos, bytesize=8, parity='N'):
+    """Qué tan plausible es que `datos` (leídos como 8N1) vengan de una báscula con este encuadre.
+
+    Combina la proporción de caracteres imprimibles, la coherencia del bit de paridad (7E1/7O1), la
+    regularidad del largo entre delimitadores y la proporción de tramas que decodifica algún protocolo.
+    Devuelve (puntaje 0-1, detalle, última trama decodificada).
+    """
+    if not datos:
+        return 0.0, {"bytes": 0}, None
+
+    if bytesize == 7:
+        impares = datos.translate(_PARIDAD_IMPAR).count(1)
+        paridad = (len(datos) - impares if parity == 'E' else impares) / len(datos)
+        datos = datos.translate(_SIETE_BITS)
+    else:
+        # Las básculas transmiten ASCII: leído como 8N1, un bit alto suele ser el de paridad de un 7E1/7O1
+        paridad = 1.0 - datos.translate(_BIT_ALTO).count(1) / len(datos)
+    imprimibles = datos.translate(_IMPRIMIBLE).count(1) / len(datos)
+
+    # Lo anterior al primer delimitador y lo posterior al último son tramas cortadas
+    segmentos = [s.strip() for s in EnsambladorTramas._DELIMITADOR.split(datos)[1:-1]]
+    segmentos = [s for s in segmentos if s]
+    regularidad = 0.0
+    if len(segmentos) >= 2:
+        largos = [len(s) for s in segmentos]
+        media = sum(largos) / len(largos)
+        desviacion = math.sqrt(sum((l - media) ** 2 for l in largos) / len(largos))
+        regularidad = max(0.0, 1.0 - desviacion / media)
+
+    decodificador = DecodificadorPesos()
+    trama = None
+    decodificadas = 0
+    for segmento in segmentos:
+        # Una trama con bytes corruptos no cuenta aunque sus dígitos sueltos decodifiquen
+        if segmento.translate(_IMPRIMIBLE).count(0):
+            continue
+        decodificada = decodificador.decodificar_trama(str(segmento, 'ascii'))
+        if decodificada is not None:
+            decodificadas += 1
+            trama = decodificada
+    protocolo = decodificadas / len(segmentos) if segmentos else 0.0
+
+    puntaje = 0.25 * imprimibles + 0.2 * paridad + 0.2 * regularidad + 0.35 * protocolo
+    detalle = {
+        "bytes": len(datos),
+        "imprimibles": round(imprimibles, 3),
+        "paridad": round(paridad, 3),
+        "regularidad": round(regularidad, 3),
+        "protocolo": round(protocolo, 3),
+        "tramas": len(segmentos)
+    }
+    return round(puntaje, 3), detalle, trama
+
+
+class FiltroPesos:
+    """Etapa entre decodificación y publicación; por trama, con memoria constante.
+
+    1. `verificar` del protocolo (checksum cuando el protocolo lo trae).
+    2. Forma de la trama: dígitos, espacios y signo se enmascaran, y también el grupo 'estado' del
+       protocolo (ST/US), y la forma debe repetir la ya establecida; una trama cortada o con ruido
+       pegado cambia de forma. Una forma nueva se adopta tras `confirmaciones` tramas seguidas.
+    3. Picos (solo si se configura): un salto más rápido que `velocidad_maxima` kg/s se descarta salvo
+       que el nuevo valor se repita `confirmaciones` veces (carga real). La trama no trae la capacidad
+       de la báscula, así que no hay un límite por defecto que sirva para 3 kg y para 3 t: se da
+       `velocidad` en kg/s o `capacidad` en kg, y entonces se admite ir de cero a capacidad en
+       SUBIDA_MINIMA_S (150 kg -> 1500 kg/s).
+    4. Suavizado opcional: mediana de las últimas `mediana` lecturas y luego EMA con factor `ema`.
+    """
+
+    _MASCARA = str.maketrans("0123456789 +-", "9999999999999")
+    OPCIONES = {
+        "mediana": int, "ema": float, "velocidad": float, "capacidad": float, "confirmaciones": int, "forma": int
+    }
+    SUBIDA_MINIMA_S = 0.1
+
+    def __init__(self, mediana=1, ema=None, velocidad=None, confirmaciones=2, forma=True, capacidad=None):
+        self.mediana = max(int(mediana), 1)
+        self.ema = ema
+        if velocidad is None and capacidad:
+            velocidad = capacidad / self.SUBIDA_MINIMA_S
+        self.velocidad_maxima = velocidad
+        self.confirmaciones = confirmaciones
+        self.verificar_forma = bool(forma)
+        self.motivo = None
+        self.reiniciar()
+
+    @classmethod
+    def desde_texto(cls, especificacion=None):
+        """"mediana=5,ema=0.3,capacidad=150,confirmaciones=2,forma=0" (vacío = valores por defecto)."""
+        opciones = {}
+        for par in (especificacion or "").split(","):
+            if not par.strip():
+                continue
+            nombre, _, valor = par.partition("=")
+            nombre = nombre.strip()
+            if nombre not in cls.OPCIONES:
+                raise ValueError(f"Opción de filtro desconocida: {nombre} (use {', '.join(cls.OPCIONES)})")
+            opciones[nombre] = cls.OPCIONES[nombre](valor)
+        return cls(**opciones)
+
+    def reiniciar(self):
+        self._forma = None
+        self._forma_candidata = None
+        self._repeticiones_forma = 0
+        self._ultimo = None
+        self._instante_ultimo = None
+        self._salto_candidato = None
+        self._repeticiones_salto = 0
+        self._ventana = deque(maxlen=self.mediana)
+        self._suavizado = None
+
+    def filtrar(self, trama, texto, instante):
+        """Peso filtrado, o None si la trama se rechaza (el motivo queda en self.motivo)."""
+        protocolo = obtener_protocolo(trama.formato)
+        if protocolo is not None and not protocolo.verificar(texto):
+            return self._rechazar("checksum")
+
+        if self.verificar_forma and not self._forma_valida(self._forma_trama(protocolo, texto)):
+            return self._rechazar("formato")
+
+        peso = trama.peso
+        if self.velocidad_maxima and self._ultimo is not None and not self._salto_valido(peso, instante):
+            return self._rechazar("pico")
+
+        self._ultimo = peso
+        self._instante_ultimo = instante
+        self.motivo = None
+
+        if self.mediana > 1:
+            self._ventana.append(peso)
+            peso = sorted(self._ventana)[len(self._ventana) // 2]
+        if self.ema:
+            peso = peso if self._suavizado is None else self.ema * peso + (1 - self.ema) * self._suavizado
+            self._suavizado = peso
+        return peso
+
+    def _rechazar(self, motivo):
+        self.motivo = motivo
+        return None
+
+    def _forma_trama(self, protocolo, texto):
+        # Un cambio ST <-> US es información de la báscula, no una trama distinta
+        if protocolo is not None and "estado" in protocolo.patron.groupindex:
+            match = protocolo.patron.search(texto)
+            if match is not None and match.group("estado") is not None:
+                inicio, fin = match.span("estado")
+                texto = texto[:inicio] + "#" * (fin - inicio) + texto[fin:]
+        return texto.translate(self._MASCARA)
+
+    def _forma_valida(self, forma):
+        if self._forma is None or forma == self._forma:
+            self._forma = forma
+            self._forma_candidata = None
+            return True
+
+        if forma == self._forma_candidata:
+            self._repeticiones_forma += 1
+        else:
+            self._forma_candidata = forma
+            self._repeticiones_forma = 1
+
+        if self._repeticiones_forma >= self.confirmaciones:
+            self._forma = forma
+            self._forma_candidata = None
+            return True
+        return False
+
+    def _salto_valido(self, peso, instante):
+        transcurrido = max(instante - self._instante_ultimo, 1e-3)
+        if abs(peso - self._ultimo) / transcurrido <= self.velocidad_maxima:
+            self._salto_candidato = None
+            return True
+
+        # Un salto que se repite es una carga real, no ruido
+        if self._salto_candidato is not None and abs(peso - self._salto_candidato) <= max(abs(peso) * 0.01, 0.01):
+            self._repeticiones_salto += 1
+        else:
+            self._salto_candidato = peso
+            self._repeticiones_salto = 1
+
+        if self._repeticiones_salto >= self.confirmaciones:
+            self._salto_candidato = None
+            return True
+        return False
+
+
+class MotorEstabilidad:
+    """Peso estable cuando las lecturas de los últimos `permanencia` s caben en ±tolerancia.
+
+    Si el protocolo trae bandera propia (ST/US) ambas condiciones deben cumplirse.
+    """
+
+    def __init__(self, tolerancia=0.005, permanencia=0.5):
+        self.tolerancia = tolerancia
+        self.permanencia = permanencia
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._ventana = deque()
+        # Colas monótonas para conocer mínimo y máximo de la ventana en O(1) amortizado
+        self._minimos = deque()
+        self._maximos = deque()
+        self._indice = 0
+
+    def actualizar(self, peso, instante, bandera=None):
+        indice = self._indice
+        self._indice += 1
+
+        self._ventana.append((instante, indice))
+        while self._minimos and self._minimos[-1][0] >= peso:
+            self._minimos.pop()
+        self._minimos.append((peso, indice))
+        while self._maximos and self._maximos[-1][0] <= peso:
+            self._maximos.pop()
+        self._maximos.append((peso, indice))
+
+        # Conserva una lectura anterior al inicio de la ventana para saber que la cubre completa
+        limite = instante - self.permanencia
+        while len(self._ventana) > 1 and self._ventana[1][0] <= limite:
+            _, descartado = self._ventana.popleft()
+            if self._minimos[0][1] == descartado:
+                self._minimos.popleft()
+            if self._maximos[0][1] == descartado:
+                self._maximos.popleft()
+
+        cubierta = instante - self._ventana[0][0] >= self.permanencia
+        quieta = self._maximos[0][0] - self._minimos[0][0] <= self.tolerancia * 2
+        return cubierta and quieta and bandera is not False
+
+
+_NUMPY = None
+
+
+def _numpy():
+    """numpy es opcional: se importa la primera vez que hace falta y si no está se usan los builtins."""
+    global _NUMPY
+    if _NUMPY is None:
+        try:
+            import numpy
+            _NUMPY = numpy
+        except ImportError:
+            _NUMPY = False
+    return _NUMPY or None
+
+
+class HistorialPesos:
+    """Buffer circular de tamaño fijo con (instante, peso) y agregados por ventana de tiempo.
+
+    Dos array('d') preasignados: agregar es O(1) y la memoria no crece aunque la báscula publique a
+    100 Hz durante semanas. La capacidad por defecto cubre la ventana máxima (la misma que acota el
+    controlador PHP) a HZ_MAXIMO: 60000 muestras, 10 min a 100 Hz en 960 KB. Las consultas ubican el
+    inicio de la ventana por búsqueda binaria y agregan en C sobre a lo sumo dos rebanadas contiguas.
+    """
+
+    VENTANA_MAXIMA_MS = 600000.0
+    HZ_MAXIMO = 100
+
+    def __init__(self, capacidad=None, umbral_cero=0.05):
+        if capacidad is None:
+            capacidad = int(self.VENTANA_MAXIMA_MS / 1000.0 * self.HZ_MAXIMO)
+        self.capacidad = capacidad
+        self.umbral_cero = umbral_cero
+        self.instantes = array('d', bytes(8 * capacidad))
+        self.pesos = array('d', bytes(8 * capacidad))
+        # Muestras agregadas desde el inicio; la posición física es total % capacidad
+        self.total = 0
+        self.bloqueo = threading.Lock()
+        self.tarar(None)
+        self.pesadas = 0
+        self._cargada = False
+
+    def tarar(self, instante=None):
+        """Reinicia el pico; ocurre sola cuando el peso vuelve a cero."""
+        self.pico_desde_tara = 0.0
+        self.instante_tara = instante
+
+    def agregar(self, peso, instante, estable=False):
+        with self.bloqueo:
+            posicion = self.total % self.capacidad
+            self.instantes[posicion] = instante
+            self.pesos[posicion] = peso
+            self.total += 1
+
+            if abs(peso) <= self.umbral_cero:
+                if self._cargada or self.instante_tara is None:
+                    self.tarar(instante)
+                    self._cargada = False
+            elif estable and not self._cargada:
+                # Una pesada por cada carga que se estabiliza después de volver a cero
+                self._cargada = True
+                self.pesadas += 1
+
+            if peso > self.pico_desde_tara:
+                self.pico_desde_tara = peso
+
+    def _inicio_ventana(self, desde):
+        """Primer índice lógico con instante >= desde (los instantes son monótonos)."""
+        bajo = self.total - min(self.total, self.capacidad)
+        alto = self.total
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self.instantes[medio % self.capacidad] < desde:
+                bajo = medio + 1
+            else:
+                alto = medio
+        return bajo
+
+    def _rebanadas(self, datos, inicio):
+        cantidad = self.total - inicio
+        posicion = inicio % self.capacidad
+        if posicion + cantidad <= self.capacidad:
+            return [datos[posicion:posicion + cantidad]]
+        return [datos[posicion:], datos[:posicion + cantidad - self.capacidad]]
+
+    def ventana(self, ms=1000.0, ahora=None):
+        """Agregados de los últimos `ms` (acotados a VENTANA_MAXIMA_MS).
+
+        "truncada" indica que el buffer ya descartó muestras dentro de la ventana: la báscula publica
+        más rápido que HZ_MAXIMO y los agregados solo cubren "cubierta_ms".
+        """
+        ms = min(float(ms), self.VENTANA_MAXIMA_MS)
+        ahora = time.monotonic() if ahora is None else ahora
+        with self.bloqueo:
+            desde = ahora - ms / 1000.0
+            inicio = self._inicio_ventana(desde)
+            rebanadas = self._rebanadas(self.pesos, inicio)
+            primero = self.instantes[inicio % self.capacidad] if inicio < self.total else None
+            truncada = self.total > self.capacidad and inicio == self.total - self.capacidad and primero > desde
+
+        muestras = sum(len(r) for r in rebanadas)
+        if not muestras:
+            return {"ventana_ms": ms, "muestras": 0, "minimo": None, "maximo": None, "media": None, "desviacion": None}
+
+        np = _numpy()
+        if np is not None:
+            valores = np.concatenate([np.frombuffer(r, dtype=np.float64) for r in rebanadas])
+            minimo, maximo = float(valores.min()), float(valores.max())
+            media, desviacion = float(valores.mean()), float(valores.std())
+        else:
+            minimo = min(min(r) for r in rebanadas if r)
+            maximo = max(max(r) for r in rebanadas if r)
+            media = sum(sum(r) for r in rebanadas) / muestras
+            cuadrados = sum(sum(map(operator.mul, r, r)) for r in rebanadas)
+            desviacion = math.sqrt(max(cuadrados / muestras - media * media, 0.0))
+
+        return {
+            "ventana_ms": ms,
+            "muestras": muestras,
+            "minimo": round(minimo, 3),
+            "maximo": round(maximo, 3),
+            "media": round(media, 3),
+            "desviacion": round(desviacion, 4),
+            "cubierta_ms": int((ahora - primero) * 1000),
+            "truncada": truncada
+        }
+
+    def resumen(self, ms=1000.0):
+        ahora = time.monotonic()
+        resultado = self.ventana(ms, ahora)
+        resultado.update({
+            "pico_desde_tara": round(self.pico_desde_tara, 3),
+            "segundos_desde_tara": round(ahora - self.instante_tara, 3) if self.instante_tara is not None else None,
+            "pesadas": self.pesadas,
+            "muestras_totales": self.total,
+            "capacidad": self.capacidad
+        })
+        return resultado
+
+
+RUTA_CACHE_DETECCIONES = os.environ.get(
+    "BASCULA_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "storage", "app", "bascula_detecciones.json")
+)
+
+
+def _clave_adaptador(info):
+    """Clave estable del adaptador físico: VID/PID/número de serie si es USB, si no el nombre del puerto.
+
+    Adaptadores sin número de serie (CH340 y similares) son idénticos entre sí: se distinguen por la
+    ubicación USB (el conector donde están enchufados) o, si no se conoce, por el nombre del puerto;
+    sin ambos el hwid solo repite VID:PID.
+    """
+    if info.vid is not None:
+        distintivo = info.serial_number or f"@{info.location or info.device}"
+        return f"usb:{info.vid:04X}:{info.pid:04X}:{distintivo}"
+    return f"puerto:{info.device}"
+
+
+def identificar_adaptador(puerto):
+    try:
+        for info in serial.tools.list_ports.comports():
+            if info.device == puerto:
+                return _clave_adaptador(info)
+    except Exception:
+        pass
+    return f"puerto:{puerto}"
+
+
+@contextmanager
+def _bloqueo_archivo(ruta):
+    """Bloqueo exclusivo entre procesos sobre `ruta` (se crea vacío si no existe)."""
+    descriptor = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            import fcntl
+            fcntl.flock(descriptor, fcntl.LOCK_EX)
+        except ImportError:
+            import msvcrt
+            msvcrt.locking(descriptor, msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        # Cerrar el descriptor libera el bloqueo en ambos sistemas
+        os.close(descriptor)
+
+
+class CacheDetecciones:
+    """Última configuración y protocolo que funcionaron por adaptador, persistidos en JSON.
+
+    Varios procesos (CLI, daemon) comparten el archivo: cada escritura toma un bloqueo sobre
+    `<ruta>.lock`, relee el archivo, aplica su cambio y lo reemplaza con un temporal propio, así
+    ninguno pisa las entradas de otro. Las lecturas recargan el archivo si cambió en disco.
+    """
+
+    def __init__(self, ruta=RUTA_CACHE_DETECCIONES):
+        self.ruta = ruta
+        self.bloqueo = threading.Lock()
+        self.entradas = None
+        self._firma = None
+        self._pendientes = None
+
+    def _firma_archivo(self):
+        try:
+            estado = os.stat(self.ruta)
+        except OSError:
+            return None
+        return estado.st_mtime_ns, estado.st_size
+
+    def _cargar(self, forzar=False):
+        firma = self._firma_archivo()
+        if forzar or self.entradas is None or firma != self._firma:
+            try:
+                with open(self.ruta, encoding="utf-8") as f:
+                    self.entradas = json.load(f)
+            except (OSError, ValueError):
+                self.entradas = {}
+            self._firma = firma
+        return self.entradas
+
+    def obtener(self, puerto):
+        clave = identificar_adaptador(puerto)
+        with self.bloqueo:
+            return self._cargar().get(clave)
+
+    def guardar(self, puerto, configuracion, protocolo=None, comando=None):
+        clave = identificar_adaptador(puerto)
+        configuracion = {k: v for k, v in configuracion.items() if k != "timeout"}
+
+        with self.bloqueo:
+            try:
+                os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+                with _bloqueo_archivo(f"{self.ruta}.lock"):
+                    # Relee bajo el bloqueo: otro proceso pudo guardar otra báscula desde la última lectura
+                    entradas = self._cargar(forzar=True)
+                    anterior = entradas.get(clave, {})
+                    misma = anterior.get("configuracion") == configuracion
+                    entradas[clave] = {
+                        "configuracion": configuracion,
+                        "protocolo": protocolo or (anterior.get("protocolo") if misma else None),
+                        # Comando al que responde una báscula que no transmite sola (None si transmite sola)
+                        "comando": comando.decode("ascii") if comando is not None else (
+                            anterior.get("comando") if misma else None
+                        ),
+                        "puerto": puerto,
+                        "actualizado": time.strftime("%Y-%m-%dT%H:%M:%S")
+                    }
+                    self._escribir(entradas)
+            except OSError as e:
+                log.warning(f"No se pudo guardar la caché de detección: {e}")
+
+    def guardar_en_segundo_plano(self, puerto, configuracion, protocolo=None, comando=None):
+        """Como guardar(), pero desde un hilo propio: el hilo lector no paga el listado de puertos ni la escritura.
+
+        Las escrituras se aplican en orden; las pendientes se completan al salir del proceso.
+        """
+        with self.bloqueo:
+            if self._pendientes is None:
+                import atexit
+
+                self._pendientes = queue.Queue()
+                threading.Thread(target=self._bucle_escritor, name="cache-detecciones", daemon=True).start()
+                atexit.register(self._pendientes.join)
+        self._pendientes.put((puerto, dict(configuracion), protocolo, comando))
+
+    def _bucle_escritor(self):
+        while True:
+            argumentos = self._pendientes.get()
+            try:
+                self.guardar(*argumentos)
+            except Exception as e:
+                log.warning(f"No se pudo guardar la caché de detección: {e}")
+            finally:
+                self._pendientes.task_done()
+
+    def _escribir(self, entradas):
+        import tempfile
+
+        temporal = None
+        try:
+            directorio = os.path.dirname(self.ruta) or "."
+            descriptor, temporal = tempfile.mkstemp(
+                prefix=f".{os.path.basename(self.ruta)}.", suffix=".tmp", dir=directorio
+            )
+            with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+                json.dump(entradas, f, indent=2)
+            os.replace(temporal, self.ruta)
+            self._firma = self._firma_archivo()
+        except OSError as e:
+            log.warning(f"No se pudo guardar la caché de detección: {e}")
+            if temporal is not None and os.path.exists(temporal):
+                os.unlink(temporal)
+
+
+cache_detecciones_global = None
+
+
+def obtener_cache_detecciones():
+    global cache_detecciones_global
+    if cache_detecciones_global is None:
+        cache_detecciones_global = CacheDetecciones()
+    return cache_detecciones_global
+
+
+class RegistroEventos:
+    """Bitácora de solo-anexar en SQLite (modo WAL) con las tramas que envió cada báscula.
+
+    modo "tramas" guarda cada trama recibida, incluidas las que no se pudieron decodificar (peso NULL);
+    modo "estables" guarda una fila por pesada, cuando la lectura pasa a estable. El hilo lector solo
+    encola; un hilo escritor agrupa las filas en transacciones, así el registro nunca frena la lectura
+    serial. Si la cola se llena las filas se descartan y se cuentan en `descartados`.
+    """
+
+    MODOS = ("tramas", "estables")
+
+    def __init__(self, ruta, modo="tramas", retencion_dias=None, lote=500, intervalo=0.5, capacidad=100000):
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo de registro no soportado: {modo} (use {', '.join(self.MODOS)})")
+
+        import sqlite3
+
+        self.ruta = ruta
+        self.modo = modo
+        self.retencion_dias = retencion_dias
+        self.lote = lote
+        self.intervalo = intervalo
+        self.pendientes = queue.Queue(maxsize=capacidad)
+        self.escritos = 0
+        self.descartados = 0
+        self._ultimo_estable = {}
+        self._detener = threading.Event()
+
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS tramas ("
+            "id INTEGER PRIMARY KEY, ts REAL NOT NULL, monotonic REAL NOT NULL, puerto TEXT, "
+            "raw TEXT NOT NULL, peso REAL, formato TEXT, estable INTEGER)"
+        )
+        self.conexion.execute("CREATE INDEX IF NOT EXISTS tramas_puerto_ts ON tramas (puerto, ts)")
+        self.conexion.commit()
+
+        self.hilo = threading.Thread(target=self._bucle_escritor, name="registro", daemon=True)
+        self.hilo.start()
+
+    def anotar(self, puerto, raw, trama=None, estable=False, instante=None, rechazada=False):
+        """Llamado desde el hilo lector por cada trama; no bloquea.
+
+        `instante` es el monotónico que la trama recibió al decodificarse (el que ven filtro y
+        estabilidad), no el momento de encolar. Las tramas rechazadas por el filtro o ilegibles no
+        cambian el estado de "estables": un pico aislado no parte una pesada en dos filas.
+        """
+        if self.modo == "estables":
+            if trama is None or rechazada:
+                return
+            anterior = self._ultimo_estable.get(puerto, False)
+            self._ultimo_estable[puerto] = estable
+            if not estable or anterior:
+                return
+
+        ahora = time.monotonic()
+        if instante is None:
+            instante = ahora
+        fila = (
+            time.time() - (ahora - instante), instante, puerto, raw,
+            trama.peso if trama else None, trama.formato if trama else None, int(estable)
+        )
+        try:
+            self.pendientes.put_nowait(fila)
+        except queue.Full:
+            self.descartados += 1
+
+    def _bucle_escritor(self):
+        ultima_purga = 0.0
+        while True:
+            try:
+                filas = [self.pendientes.get(timeout=self.intervalo)]
+            except queue.Empty:
+                filas = []
+
+            if filas:
+                # Agrupa lo que llegue durante el intervalo en una sola transacción
+                fin = time.monotonic() + self.intervalo
+                while len(filas) < self.lote:
+                    try:
+                        filas.append(self.pendientes.get(timeout=max(fin - time.monotonic(), 0)))
+                    except queue.Empty:
+                        break
+                self._escribir(filas)
+
+            if self.retencion_dias and time.monotonic() - ultima_purga > 3600:
+                ultima_purga = time.monotonic()
+                self._purgar()
+
+            if self._detener.is_set() and self.pendientes.empty():
+                return
+
+    def _escribir(self, filas):
+        try:
+            with self.conexion:
+                self.conexion.executemany(
+                    "INSERT INTO tramas (ts, monotonic, puerto, raw, peso, formato, estable) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    filas
+                )
+            self.escritos += len(filas)
+        except Exception as e:
+            self.descartados += len(filas)
+            log.error(f"No se pudo escribir el registro de tramas: {e}", extra={"ruta": self.ruta})
+
+    def _purgar(self):
+        try:
+            with self.conexion:
+                self.conexion.execute("DELETE FROM tramas WHERE ts < ?", (time.time() - self.retencion_dias * 86400,))
+        except Exception as e:
+            log.warning(f"No se pudo purgar el registro de tramas: {e}")
+
+    def cerrar(self):
+        """Espera a que se escriba lo encolado y cierra la base."""
+        self._detener.set()
+        self.hilo.join(timeout=5.0)
+        self.conexion.close()
+
+
+def crear_registro(ruta=None, modo=None):
+    """Registro configurado por argumentos o por BASCULA_REGISTRO / BASCULA_REGISTRO_MODO / BASCULA_REGISTRO_DIAS."""
+    ruta = ruta or os.environ.get("BASCULA_REGISTRO")
+    if not ruta:
+        return None
+    dias = os.environ.get("BASCULA_REGISTRO_DIAS")
+    return RegistroEventos(
+        ruta,
+        modo or os.environ.get("BASCULA_REGISTRO_MODO", "tramas"),
+        retencion_dias=float(dias) if dias else None
+    )
+
+
+def leer_registro(ruta, puerto=None, desde=None, hasta=None):
+    """Filas del registro en orden de llegada, como tuplas (ts, monotonic, puerto, raw, peso, formato, estable)."""
+    import sqlite3
+
+    consulta = "SELECT ts, monotonic, puerto, raw, peso, formato, estable FROM tramas WHERE 1 = 1"
+    parametros = []
+    if puerto:
+        consulta += " AND puerto = ?"
+        parametros.append(puerto)
+    if desde is not None:
+        consulta += " AND ts >= ?"
+        parametros.append(desde)
+    if hasta is not None:
+        consulta += " AND ts <= ?"
+        parametros.append(hasta)
+
+    conexion = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+    try:
+        yield from conexion.execute(consulta + " ORDER BY id", parametros)
+    finally:
+        conexion.close()
+
+
+def tabla_formatos():
+    """Nombres de los protocolos registrados por ID numérico; el ID 0 es "sin formato"."""
+    return [""] + [protocolo.nombre for protocolo in PROTOCOLOS][:MAXIMO_FORMATOS - 1]
+
+
+class PublicadorMemoria:
+    """Escribe cada lectura publicada en un segmento mapeado en memoria que otros procesos leen sin IPC.
+
+    La disposición y el lector (LectorMemoria) están en basculas_cliente. Hay un solo escritor por
+    segmento; el bloqueo solo ordena al hilo lector frente a los cambios de estado de conexión.
+    """
+
+    def __init__(self, ruta, puerto):
+        import mmap
+
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self.ruta = ruta
+        self.puerto = puerto
+        self.bloqueo = threading.Lock()
+
+        # Se reutiliza el archivo en lugar de recrearlo: los lectores que ya lo tienen mapeado siguen viendo datos
+        descriptor = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(descriptor).st_size < TAMANO_MEMORIA:
+                os.ftruncate(descriptor, TAMANO_MEMORIA)
+            self._mapa = mmap.mmap(descriptor, TAMANO_MEMORIA)
+        finally:
+            os.close(descriptor)
+
+        formatos = tabla_formatos()
+        self._ids_formato = {nombre: i for i, nombre in enumerate(formatos) if nombre}
+        for i, nombre in enumerate(formatos):
+            inicio = DESPLAZAMIENTO_FORMATOS + i * LARGO_FORMATO
+            self._mapa[inicio:inicio + LARGO_FORMATO] = nombre.encode("ascii")[:LARGO_FORMATO].ljust(LARGO_FORMATO, b"\0")
+        CABECERA_MEMORIA.pack_into(
+            self._mapa, 0, MAGIA_MEMORIA, VERSION_MEMORIA, len(formatos), 0, puerto.encode("utf-8")[:48]
+        )
+
+        secuencia, = SECUENCIA_MEMORIA.unpack_from(self._mapa, DESPLAZAMIENTO_SECUENCIA)
+        self._secuencia = secuencia + (secuencia & 1)
+        self._registro = (0.0, 0, 0.0, 0, 0, 0, 0)
+
+    def _escribir(self, registro):
+        with self.bloqueo:
+            self._secuencia += 1
+            SECUENCIA_MEMORIA.pack_into(self._mapa, DESPLAZAMIENTO_SECUENCIA, self._secuencia)
+            REGISTRO_MEMORIA.pack_into(self._mapa, DESPLAZAMIENTO_REGISTRO, *registro)
+            self._secuencia += 1
+            SECUENCIA_MEMORIA.pack_into(self._mapa, DESPLAZAMIENTO_SECUENCIA, self._secuencia)
+            self._registro = registro
+
+    def publicar(self, lectura):
+        self._escribir((
+            lectura.peso, int(lectura.monotonic * 1e9), time.time(), lectura.secuencia,
+            int(lectura.estable), self._ids_formato.get(lectura.formato, 0), 1
+        ))
+
+    def marcar_conexion(self, conectado):
+        self._escribir(self._registro[:6] + (int(conectado),))
+
+    def cerrar(self):
+        """Deja el segmento marcado como desconectado; el archivo queda para los lectores que lo tengan abierto."""
+        self.marcar_conexion(False)
+        self._mapa.close()
+
+
+class SalidaLecturas:
+    """Flujo de salida de leer_continuo/leer_rapido: agrupa lecturas repetidas, las codifica y escribe con búfer.
+
+    Una lectura se emite si el peso se movió más que `banda_muerta` o cambió la estabilidad, a lo sumo
+    `hz_maximo` veces por segundo; sin cambios se repite la última como latido cada `latido` s. Cada
+    registro cuenta las lecturas fusionadas en él (iguales a la ya emitida) y las descartadas (cambios
+    superados por otro más nuevo antes de poder emitirse). El búfer se vacía cada `vaciado` s.
+
+    Formatos: "json" (el diccionario de leer_peso_tiempo_real, como antes), "ndjson" (claves cortas:
+    t ms, p peso, e estable, f formato, s secuencia, m fusionadas, d descartadas, l latido, x error)
+    y "binario" (CABECERA con la tabla de formatos y luego registros REGISTRO de tamaño fijo).
+    """
+
+    FORMATOS = ("json", "ndjson", "binario")
+    # b"BSCS", versión, tamaño de registro, número de formatos; siguen los nombres de LARGO_FORMATO bytes
+    CABECERA = struct.Struct("<4sHHH")
+    # timestamp, peso, secuencia, fusionadas, descartadas, estable, ID de formato, tipo
+    REGISTRO = struct.Struct("<ddIIIBBBx")
+    LECTURA, LATIDO, ESTADO = 0, 1, 2
+
+    def __init__(self, detector, formato="json", banda_muerta=0.001, hz_maximo=None, latido=1.0, vaciado=0.05,
+                 destino=None):
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato de salida no soportado: {formato} (use {', '.join(self.FORMATOS)})")
+
+        self.detector = detector
+        self.formato = formato
+        self.banda_muerta = banda_muerta
+        self.intervalo_minimo = 1.0 / hz_maximo if hz_maximo else 0.0
+        self.latido = latido
+        self.vaciado = vaciado
+        self.destino = destino or sys.stdout.buffer
+
+        self.emitidas = 0
+        self.fusionadas = 0
+        self.descartadas = 0
+        self.bytes_escritos = 0
+        self._bufer = bytearray()
+        self._ultimo_vaciado = 0.0
+        self._ultima_emision = 0.0
+        self._emitida = None
+        self._pendiente = None
+        self._estado = None
+        self._fusionadas = 0
+        self._descartadas = 0
+
+        formatos = tabla_formatos()
+        self._ids_formato = {nombre: i for i, nombre in enumerate(formatos) if nombre}
+        if formato == "binario":
+            self._bufer += self.CABECERA.pack(b"BSCS", 1, self.REGISTRO.size, len(formatos))
+            self._bufer += b"".join(nombre.encode("ascii").ljust(LARGO_FORMATO, b"\0") for nombre in formatos)
+
+    def ofrecer(self, lectura, ahora=None, omitidas=0):
+        """Entrega una lectura nueva del detector; `omitidas` son las publicadas que el llamador no llegó a ver."""
+        self._descartadas += omitidas
+        self.descartadas += omitidas
+        self._estado = None
+        emitida = self._emitida
+        if emitida is not None and abs(lectura.peso - emitida[0]) <= self.banda_muerta and lectura.estable == emitida[1]:
+            self._fusionadas += 1
+            self.fusionadas += 1
+            if self._pendiente is not None:
+                # El cambio retenido por hz_maximo volvió al valor emitido antes de salir
+                self._pendiente = None
+                self._descartadas += 1
+                self.descartadas += 1
+            return
+
+        if self._pendiente is not None:
+            self._descartadas += 1
+            self.descartadas += 1
+        self._pendiente = lectura
+        self.atender(ahora)
+
+    def estado(self, resultado):
+        """Errores y cambios de conexión se escriben una sola vez y sin esperar al vaciado."""
+        clave = (resultado.get("error"), resultado.get("reconectando"))
+        if clave == self._estado:
+            return
+        self._estado = clave
+        self._emitida = None
+        self._pendiente = None
+
+        if self.formato == "json":
+            self._bufer += json.dumps(resultado).encode("utf-8") + b"\n"
+        elif self.formato == "ndjson":
+            self._bufer += json.dumps(
+                {"t": int(time.time() * 1000), "x": resultado.get("error"), "r": int(bool(resultado.get("reconectando")))},
+                ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8") + b"\n"
+        else:
+            self._bufer += self.REGISTRO.pack(time.time(), math.nan, 0, 0, 0, 0, 0, self.ESTADO)
+        self.emitidas += 1
+        self.vaciar()
+
+    def atender(self, ahora=None):
+        """Emite lo retenido o el latido cuando toca y vacía el búfer; devuelve cuánto se puede esperar."""
+        ahora = time.monotonic() if ahora is None else ahora
+        desde_emision = ahora - self._ultima_emision
+
+        if self._pendiente is not None and desde_emision >= self.intervalo_minimo:
+            self._emitir(self._pendiente, self.LECTURA, ahora)
+            self._pendiente = None
+            desde_emision = 0.0
+        elif self.latido and self._emitida is not None and desde_emision >= self.latido \
+                and self.detector.lectura_actual is not None:
+            self._emitir(self.detector.lectura_actual, self.LATIDO, ahora)
+            desde_emision = 0.0
+
+        if self._bufer and ahora - self._ultimo_vaciado >= self.vaciado:
+            self.vaciar(ahora)
+
+        esperas = [self.latido - desde_emision if self.latido else 1.0]
+        if self._pendiente is not None:
+            esperas.append(self.intervalo_minimo - desde_emision)
+        if self._bufer:
+            esperas.append(self.vaciado - (ahora - self._ultimo_vaciado))
+        return max(min(esperas), 0.001)
+
+    def _emitir(self, lectura, tipo, ahora):
+        if self.formato == "json":
+            # La lectura agrupada, no la instantánea actual del detector (que puede ser más nueva)
+            datos = self.detector.resultado_lectura(lectura)
+            datos["fusionadas"] = self._fusionadas
+            datos["descartadas"] = self._descartadas
+            if tipo == self.LATIDO:
+                datos["latido"] = True
+            self._bufer += json.dumps(datos).encode("utf-8") + b"\n"
+        elif self.formato == "ndjson":
+            # Formateo directo: json.dumps por registro es la mayor parte del costo a cientos de Hz
+            self._bufer += (
+                f'{{"t":{int(time.time() * 1000)},"p":{round(lectura.peso, 3)!r},"e":{int(lectura.estable)},'
+                f'"f":"{lectura.formato}","s":{lectura.secuencia},"m":{self._fusionadas},"d":{self._descartadas}'
+                + (',"l":1}\n' if tipo == self.LATIDO else '}\n')
+            ).encode("ascii")
+        else:
+            self._bufer += self.REGISTRO.pack(
+                time.time(), lectura.peso, lectura.secuencia & 0xFFFFFFFF, self._fusionadas, self._descartadas,
+                int(lectura.estable), self._ids_formato.get(lectura.formato, 0), tipo
+            )
+
+        self.emitidas += 1
+        self._fusionadas = 0
+        self._descartadas = 0
+        self._emitida = (lectura.peso, lectura.estable)
+        self._ultima_emision = ahora
+
+    def vaciar(self, ahora=None):
+        if self._bufer:
+            self.destino.write(self._bufer)
+            self.destino.flush()
+            self.bytes_escritos += len(self._bufer)
+            self._bufer.clear()
+        self._ultimo_vaciado = time.monotonic() if ahora is None else ahora
+
+    def cerrar(self):
+        """Emite lo retenido, vacía el búfer y devuelve el resumen del flujo."""
+        if self._pendiente is not None:
+            self._emitir(self._pendiente, self.LECTURA, time.monotonic())
+            self._pendiente = None
+        self.vaciar()
+        return self.resumen()
+
+    def resumen(self):
+        return {
+            "formato": self.formato,
+            "emitidas": self.emitidas,
+            "fusionadas": self.fusionadas,
+            "descartadas": self.descartadas,
+            "bytes": self.bytes_escritos + len(self._bufer)
+        }
+
+
+class DetectorUniversalBasculas:
+    # "metodo" de las lecturas servidas desde la instantánea que publica el lector en segundo plano
+    METODO_LECTOR = "hilo_lector"
+
+    def __init__(self, lector_en_segundo_plano=False, tolerancia_estable=0.005, permanencia_estable=0.5,
+                 hz_sondeo=20.0, en_vuelo_maximo=2):
+        self.configuraciones_comunes = [
+            {'baudrate': 9600, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'timeout': 0.05},  # Reducido timeout
+            {'baudrate': 9600, 'bytesize': 7, 'parity': 'E', 'stopbits': 1, 'timeout': 0.05},
+            {'baudrate': 2400, 'bytesize': 7, 'parity': 'E', 'stopbits': 1, 'timeout': 0.05},
+            {'baudrate': 4800, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'timeout': 0.05},
+            {'baudrate': 19200, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'timeout': 0.05},
+        ]
+
+        self.comandos_solicitud = [b'P\r\n', b'W\r\n', b'S\r\n', b'\r\n']
+        # Básculas que solo responden a comando: el lector envía comando_activo a hz_sondeo con hasta
+        # en_vuelo_maximo solicitudes sin respuesta, y cada respuesta se entrega al llegar su delimitador
+        self.comando_activo = None
+        self.hz_sondeo = hz_sondeo
+        self.en_vuelo_maximo = en_vuelo_maximo
+        self.plazo_pasivo = 0.25
+        self.plazo_respuesta = 0.15
+        # Escucha del tráfico sin caché: una ventana por velocidad y puntaje mínimo para aceptar un encuadre
+        self.plazo_escucha = 0.4
+        self.umbral_escucha = 0.7
+        self.conexion_activa = None
+        self.config_activa = None
+        self.puerto_activo = None
+        
+        self.ensamblador = EnsambladorTramas()
+        self.decodificador = DecodificadorPesos()
+        self.estabilidad = MotorEstabilidad(tolerancia_estable, permanencia_estable)
+        self.filtro = FiltroPesos.desde_texto(os.environ.get("BASCULA_FILTRO"))
+        self.ultimo_estable = False
+        self.tramas_decodificadas = 0
+        # Última trama que entregó el decodificador, antes del filtro (None si no se pudo leer)
+        self.ultima_trama = None
+        self._llegada_anterior = None
+        self.metricas = MetricasDetector()
+        self.historial = HistorialPesos()
+        self.registro = None
+        # Con directorio_memoria cada lectura se publica también en un segmento compartido por puerto
+        self.directorio_memoria = None
+        self.memoria = None
+        self.ultimo_peso = 0.0
+        self.ultimo_raw_data = ""
+        self.ultimo_timestamp = time.time()
+
+        self.cache_detecciones = obtener_cache_detecciones()
+        self._protocolo_guardado = None
+
+        self.lector_en_segundo_plano = lector_en_segundo_plano
+        self.lectura_actual = None
+        self.hilo_lector = None
+        self.error_lector = None
+        self._detener_lector = threading.Event()
+        self._nueva_lectura = threading.Condition()
+
+        # Con supervisor las lecturas informan "desconectado" en vez de pedir reconexión al llamador
+        self.supervisor = None
+        self.estado_conexion = "desconectado"
+        self.motivo_desconexion = None
+        self.desconectado_desde = None
+        self.fallo_conexion = threading.Event()
+
+    def detectar_y_conectar(self, puerto, timeout=0.1, configuraciones=None):
+        log.info(f"🔍 Conectando a {puerto} con timeout {timeout}s", extra={"puerto": puerto})
+
+        self.detener_lector()
+        if self.conexion_activa and self.conexion_activa.is_open:
+            try:
+                self.conexion_activa.close()
+            except:
+                pass
+            self.conexion_activa = None
+
+        entrada_cache = None
+        if configuraciones is None:
+            entrada_cache = self.cache_detecciones.obtener(puerto)
+            configuraciones = self._configuraciones_con_cache(entrada_cache)
+            if entrada_cache is None:
+                # Adaptador desconocido: escuchar la línea evita abrir el puerto con cada configuración
+                configuraciones = self._configuraciones_por_escucha(puerto, configuraciones)
+
+        for config in configuraciones:
+            ser = None
+            try:
+                config_actual = config.copy()
+                config_actual['timeout'] = timeout
+                
+                log.debug(f"🎯 Probando: {config_actual['baudrate']} baud, {timeout}s timeout")
+
+                ser = serial.Serial(
+                    port=puerto,
+                    baudrate=config_actual['baudrate'],
+                    bytesize=config_actual['bytesize'],
+                    parity=config_actual['parity'],
+                    stopbits=config_actual['stopbits'],
+                    timeout=config_actual['timeout']  
+                )
+
+                ser.reset_input_buffer()
+                ser.reset_output_buffer()
+
+                peso_inicial, comando = self._leer_peso_conexion(
+                    ser, config_actual, self._comandos_con_cache(entrada_cache), (entrada_cache or {}).get("comando")
+                )
+                if peso_inicial is None:
+                    # Que el puerto abra no prueba la configuración: sin trama decodificada se prueba la siguiente.
+                    # La entrada de la caché se conserva (la báscula puede estar arrancando); solo la reemplaza
+                    # otra configuración que sí decodifique
+                    log.info(f"Sin tramas válidas con {config_actual['baudrate']} baud", extra={"puerto": puerto})
+                    ser.close()
+                    continue
+
+                self._activar_conexion(ser, puerto, config_actual, entrada_cache, comando)
+
+                if self.lector_en_segundo_plano:
+                    self.iniciar_lector()
+                self._marcar_estado("conectado")
+
+                return self._resultado_conexion(puerto, config_actual, peso_inicial)
+
+            except Exception as e:
+                log.info(f"Configuración descartada: {e}", extra={"puerto": puerto})
+                if ser is not None:
+                    try:
+                        ser.close()
+                    except:
+                        pass
+                continue
+
+        return {
+            "success": False,
+            "error": f"No se pudo conectar en {puerto}",
+            "puerto": puerto
+        }
+
+    def _activar_conexion(self, ser, puerto, config_actual, entrada_cache=None, comando=None, guardar=True):
+        self.metricas.incrementar("conexiones")
+        self.conexion_activa = ser
+        self.config_activa = config_actual
+        self.puerto_activo = puerto
+        self.comando_activo = comando
+        self.ensamblador.reiniciar()
+        self.decodificador.reiniciar()
+        self.estabilidad.reiniciar()
+        self.filtro.reiniciar()
+        self._protocolo_guardado = None
+        self._llegada_anterior = time.monotonic()
+        if self.directorio_memoria and (self.memoria is None or self.memoria.puerto != puerto):
+            if self.memoria is not None:
+                self.memoria.cerrar()
+            self.memoria = PublicadorMemoria(ruta_memoria(self.directorio_memoria, puerto), puerto)
+        if self.memoria is not None:
+            self.memoria.marcar_conexion(True)
+
+        if entrada_cache and entrada_cache.get("protocolo") and \
+                entrada_cache.get("configuracion") == self._sin_timeout(config_actual):
+            self._protocolo_guardado = self.decodificador.fijar_protocolo(entrada_cache["protocolo"])
+
+        if guardar:
+            self._guardar_cache_conexion(comando)
+
+        log.info(f"Conectado en {puerto} (MODO TIEMPO REAL)", extra={"puerto": puerto, "baudios": config_actual["baudrate"]})
+
+    def _guardar_cache_conexion(self, comando=None):
+        self.cache_detecciones.guardar(
+            self.puerto_activo, self.config_activa,
+            self._protocolo_guardado.nombre if self._protocolo_guardado else None, comando
+        )
+
+    @staticmethod
+    def _resultado_conexion(puerto, config_actual, peso_inicial):
+        return {
+            "success": True,
+            "conectado": True,
+            "peso": peso_inicial if peso_inicial is not None else 0.0,
+            "puerto": puerto,
+            "configuracion": config_actual,
+            "baudios_detectados": config_actual['baudrate'],
+            "mensaje": f"Báscula conectada en {puerto} - Modo tiempo real activado",
+            "tiene_peso_inicial": peso_inicial is not None
+        }
+
+    @staticmethod
+    def _sin_timeout(config):
+        return {k: v for k, v in config.items() if k != "timeout"}
+
+    def _configuraciones_con_cache(self, entrada_cache):
+        """La configuración que funcionó la última vez con este adaptador se prueba primero."""
+        if not entrada_cache or not entrada_cache.get("configuracion"):
+            return self.configuraciones_comunes
+
+        cacheada = entrada_cache["configuracion"]
+        resto = [c for c in self.configuraciones_comunes if self._sin_timeout(c) != cacheada]
+        return [dict(cacheada, timeout=0.05)] + resto
+
+    def escuchar_configuracion(self, puerto, configuraciones=None, plazo=None, cancelado=None):
+        """Elige baudios y encuadre escuchando el tráfico de una báscula que transmite sola, sin enviar comandos.
+
+        El puerto se abre una vez y solo cambia de velocidad: cada baudio distinto tiene una ventana de
+        escucha leída como 8N1, y con esa misma captura se puntúan 8N1, 7E1 y 7O1 (puntuar_encuadre).
+        Una línea en silencio lo está a cualquier velocidad, así que sin bytes en la primera ventana se
+        abandona. "configuracion" es None si ningún encuadre decodificó tramas con puntaje suficiente.
+        """
+        inicio = time.monotonic()
+        configuraciones = configuraciones or self.configuraciones_comunes
+        velocidades = list(dict.fromkeys(c['baudrate'] for c in configuraciones))
+        fin = inicio + (plazo or self.plazo_escucha * len(velocidades))
+        # Los encuadres de la lista se prueban primero; ante un empate gana el que aparece antes
+        encuadres = list(dict.fromkeys(
+            [(c['bytesize'], c['parity'], c['stopbits']) for c in configuraciones
+             if (c['bytesize'], c['parity'], c['stopbits']) in ENCUADRES_10_BITS]
+            + sorted(ENCUADRES_10_BITS, key=lambda e: (-e[0], e[1]))
+        ))
+
+        candidatos = []
+        mejor = None
+        resultado = {"configuracion": None, "puntaje": 0.0, "candidatos": candidatos, "ventanas": 0}
+        try:
+            ser = serial.Serial(port=puerto, baudrate=velocidades[0], bytesize=8, parity='N', stopbits=1, timeout=0)
+        except Exception as e:
+            resultado["error"] = str(e)
+            resultado["tiempo_ms"] = round((time.monotonic() - inicio) * 1000, 1)
+            return resultado
+
+        try:
+            for indice, baudios in enumerate(velocidades):
+                restante = fin - time.monotonic()
+                if restante <= 0 or (cancelado is not None and cancelado.is_set()):
+                    break
+                if ser.baudrate != baudios:
+                    ser.baudrate = baudios
+                ser.reset_input_buffer()
+                # La velocidad más probable (caché o primera de la lista) escucha la ventana completa
+                ventana = min(self.plazo_escucha, restante if indice == 0 else restante / (len(velocidades) - indice))
+                captura = self._capturar_trafico(
+                    ser, time.monotonic() + ventana, cancelado, silencio=self.plazo_pasivo if indice == 0 else None
+                )
+                resultado["ventanas"] += 1
+                if not captura:
+                    if indice == 0:
+                        resultado["error"] = "Sin tráfico en la línea"
+                        break
+                    continue
+
+                for bytesize, parity, stopbits in encuadres:
+                    puntaje, detalle, trama = puntuar_encuadre(captura, bytesize, parity)
+                    config = {'baudrate': baudios, 'bytesize': bytesize, 'parity': parity, 'stopbits': stopbits}
+                    candidatos.append(dict(detalle, configuracion=config, puntaje=puntaje))
+                    if trama is not None and puntaje >= self.umbral_escucha and \
+                            (mejor is None or puntaje > mejor[0]):
+                        mejor = (puntaje, config, trama)
+
+                # Un encuadre casi perfecto no va a ser superado en otra velocidad
+                if mejor is not None and mejor[0] >= 0.95:
+                    break
+        except Exception as e:
+            resultado["error"] = str(e)
+        finally:
+            try:
+                ser.close()
+            except:
+                pass
+
+        if mejor is not None:
+            puntaje, config, trama = mejor
+            resultado.update(configuracion=config, puntaje=puntaje, protocolo=trama.formato,
+                             peso=trama.peso, estable=trama.estable)
+            resultado.pop("error", None)
+        resultado["tiempo_ms"] = round((time.monotonic() - inicio) * 1000, 1)
+        self.metricas.incrementar("escuchas", resultado="encontrada" if mejor else "sin_resultado")
+        return resultado
+
+    @staticmethod
+    def _capturar_trafico(ser, fin, cancelado=None, tramas=3, silencio=None):
+        """Bytes crudos hasta `fin`, hasta reunir `tramas` tramas completas o tras `silencio` s sin ningún byte.
+
+        Las tramas suelen cerrar con CR LF o abrir y cerrar con STX/ETX: se cuentan dos delimitadores por trama.
+        """
+        captura = bytearray()
+        delimitadores = 0
+        if silencio is not None:
+            fin_silencio = time.monotonic() + silencio
+        while True:
+            ahora = time.monotonic()
+            restante = fin - ahora
+            if restante <= 0 or (cancelado is not None and cancelado.is_set()):
+                break
+            if silencio is not None and not captura:
+                if ahora >= fin_silencio:
+                    break
+                restante = min(restante, fin_silencio - ahora)
+            chunk = _leer_disponible(ser, min(restante, 0.1))
+            if not chunk:
+                continue
+            captura += chunk
+            delimitadores += len(EnsambladorTramas._DELIMITADOR.findall(chunk.translate(_SIETE_BITS)))
+            if delimitadores > 2 * tramas:
+                break
+        return bytes(captura)
+
+    def _configuraciones_por_escucha(self, puerto, configuraciones):
+        """Pone primero la configuración que eligió la escucha del tráfico (sin cambios si no eligió ninguna)."""
+        escucha = self.escuchar_configuracion(puerto, configuraciones)
+        elegida = escucha["configuracion"]
+        if elegida is None:
+            return configuraciones
+
+        log.info(
+            f"Configuración por escucha: {elegida['baudrate']} {elegida['bytesize']}{elegida['parity']}"
+            f"{elegida['stopbits']} (puntaje {escucha['puntaje']}, {escucha['tiempo_ms']} ms)",
+            extra={"puerto": puerto}
+        )
+        resto = [c for c in configuraciones if self._sin_timeout(c) != elegida]
+        return [dict(elegida, timeout=0.05)] + resto
+
+    def _comandos_con_cache(self, entrada_cache):
+        """El comando al que respondió este adaptador la última vez se envía primero."""
+        comando = (entrada_cache or {}).get("comando")
+        if comando is None:
+            return self.comandos_solicitud
+        guardado = comando.encode("ascii")
+        return [guardado] + [c for c in self.comandos_solicitud if c != guardado]
+
+    def _solicitar_trama(self, ser, cmd, plazo=None):
+        """Envía cmd y devuelve la primera trama válida en cuanto llega su delimitador (None si vence el plazo)."""
+        ser.reset_input_buffer()
+        ser.write(cmd)
+        # La respuesta a un comando empieza en limpio: no hay trama cortada que descartar
+        ensamblador = EnsambladorTramas()
+        ensamblador.sincronizado = True
+        fin = time.monotonic() + (plazo or self.plazo_respuesta)
+        return self._esperar_respuesta(ser, ensamblador, DecodificadorPesos(), fin)
+
+    def _leer_peso_conexion(self, ser, config, comandos=None, comando_guardado=None):
+        """Peso inicial y comando al que responde la báscula (None si transmite sola).
+
+        Devuelve (None, None) si no se decodificó ninguna trama con esta configuración.
+        """
+        try:
+            if comando_guardado is not None:
+                # Ya se sabe que esta báscula no transmite sola: no hace falta la escucha pasiva
+                trama = self._solicitar_trama(ser, comando_guardado.encode("ascii"))
+                if trama is not None:
+                    return trama.peso, comando_guardado.encode("ascii")
+
+            fin = time.monotonic() + self.plazo_pasivo
+            trama = self._esperar_respuesta(ser, EnsambladorTramas(), DecodificadorPesos(), fin)
+            if trama is not None:
+                return trama.peso, None
+
+            for cmd in comandos or self.comandos_solicitud:
+                try:
+                    trama = self._solicitar_trama(ser, cmd)
+                    if trama is not None:
+                        return trama.peso, cmd
+                except Exception as e:
+                    log.debug(f"Error con comando {cmd}: {e}")
+                    continue
+
+            return None, None
+
+        except Exception as e:
+            log.warning(f"Error en lectura inicial: {e}")
+            return None, None
+
+    def _marcar_estado(self, estado, motivo=None):
+        self.estado_conexion = estado
+        self.motivo_desconexion = motivo
+        self.desconectado_desde = None if estado == "conectado" else (self.desconectado_desde or time.monotonic())
+        if self.memoria is not None:
+            self.memoria.marcar_conexion(estado == "conectado")
+        with self._nueva_lectura:
+            self._nueva_lectura.notify_all()
+
+    def supervisar(self, bloqueo=None, **opciones):
+        """Deja la reconexión de este detector a un SupervisorConexion en segundo plano."""
+        if self.supervisor is None:
+            self.supervisor = SupervisorConexion(self, bloqueo, **opciones)
+            self.supervisor.iniciar()
+        return self.supervisor
+
+    def soltar_conexion(self, motivo):
+        """Cierra el puerto perdido sin olvidar la última lectura; lo usa el supervisor."""
+        self.detener_lector()
+        if self.conexion_activa:
+            try:
+                self.conexion_activa.close()
+            except Exception:
+                pass
+            self.conexion_activa = None
+        self.metricas.incrementar("desconexiones")
+        self._marcar_estado("desconectado", motivo)
+        log.warning(f"❌ Báscula desconectada: {motivo}", extra={"puerto": self.puerto_activo})
+
+    def _resultado_desconectado(self):
+        supervisor = self.supervisor
+        resultado = {
+            "success": False,
+            "estado": self.estado_conexion,
+            "error": f"Báscula desconectada: {self.motivo_desconexion or 'sin conexión'}",
+            "requiere_conexion": False,
+            "reconectando": True,
+            "intentos_reconexion": supervisor.intentos if supervisor else 0,
+            "timestamp": time.time()
+        }
+        if self.desconectado_desde is not None:
+            resultado["desconectado_ms"] = int((time.monotonic() - self.desconectado_desde) * 1000)
+        if self.lectura_actual is not None:
+            resultado["ultimo_peso"] = round(self.lectura_actual.peso, 3)
+        return resultado
+
+    def leer_peso_conexion_activa(self):
+        if self.supervisor is not None and self.estado_conexion != "conectado":
+            return self._resultado_desconectado()
+
+        if not self.conexion_activa or not self.conexion_activa.is_open:
+            return {
+                "success": False,
+                "error": "No hay conexión activa",
+                "requiere_conexion": True
+            }
+
+        try:
+            ser = self.conexion_activa
+
+            try:
+                ser.in_waiting
+            except Exception as e:
+                log.warning(f"❌ Puerto desconectado: {e}", extra={"puerto": self.puerto_activo})
+                self.conexion_activa = None
+                return {
+                    "success": False,
+                    "error": "Puerto desconectado",
+                    "requiere_conexion": True
+                }
+
+            if ser.in_waiting > 0:
+                decodificada = self._decodificar_tramas(ser.read(ser.in_waiting))
+                if decodificada is not None:
+                    peso, formato, raw, estable = decodificada
+                    self.ultimo_peso = peso
+                    self.ultimo_raw_data = raw
+                    self.ultimo_timestamp = time.time()
+                    self.ultimo_estable = estable
+
+                    return {
+                        "success": True,
+                        "peso": round(peso, 3),
+                        "estable": estable,
+                        "raw_data": raw,
+                        "formato_detectado": formato,
+                        "metodo": "buffer_directo",
+                        "timestamp": self.ultimo_timestamp
+                    }
+
+            if time.time() - self.ultimo_timestamp < 1.0:
+                return {
+                    "success": True,
+                    "peso": round(self.ultimo_peso, 3),
+                    "estable": self.ultimo_estable,
+                    "raw_data": self.ultimo_raw_data,
+                    "formato_detectado": "cache",
+                    "metodo": "ultimo_conocido",
+                    "timestamp": self.ultimo_timestamp
+                }
+
+            return {
+                "success": True,
+                "peso": 0.0,
+                "estable": False,
+                "mensaje": "Esperando datos de báscula...",
+                "metodo": "sin_datos_recientes",
+                "timestamp": time.time()
+            }
+
+        except Exception as e:
+            log.error(f"Error leyendo peso: {e}")
+            try:
+                if self.conexion_activa:
+                    self.conexion_activa.close()
+            except:
+                pass
+            self.conexion_activa = None
+            return {
+                "success": False,
+                "error": f"Error de comunicación: {str(e)}",
+                "requiere_conexion": True
+            }
+
+    def _lector_activo(self):
+        """Un lector en segundo plano publica las lecturas; leer solo copia la última instantánea."""
+        return self.hilo_lector is not None
+
+    def iniciar_lector(self):
+        if self.hilo_lector is not None or not self.conexion_activa:
+            return
+
+        self._detener_lector.clear()
+        self.fallo_conexion.clear()
+        self.error_lector = None
+        self.hilo_lector = threading.Thread(
+            target=self._bucle_lector,
+            args=(self.conexion_activa,),
+            name=f"lector-{self.puerto_activo}",
+            daemon=True
+        )
+        self.hilo_lector.start()
+
+    def detener_lector(self):
+        if self.hilo_lector is None:
+            return
+
+        self._detener_lector.set()
+        if self.hilo_lector is not threading.current_thread():
+            self.hilo_lector.join(timeout=1.0)
+        self.hilo_lector = None
+
+    def _bucle_lector(self, ser):
+        # El timeout corto solo acota cuánto tarda en notarse detener_lector()
+        ser.timeout = 0.05
+
+        metricas = self.metricas
+        comando = self.comando_activo
+        intervalo = 1.0 / self.hz_sondeo if self.hz_sondeo else 0.0
+        # Instantes de envío de las solicitudes que aún no tienen respuesta, en orden
+        enviados = deque()
+        proximo_envio = 0.0
+
+        while not self._detener_lector.is_set():
+            inicio = time.perf_counter()
+            try:
+                if comando is not None:
+                    while enviados and inicio - enviados[0] > self.plazo_respuesta:
+                        enviados.popleft()
+                        metricas.incrementar("respuestas_perdidas")
+                    if len(enviados) < self.en_vuelo_maximo and inicio >= proximo_envio:
+                        ser.write(comando)
+                        enviados.append(inicio)
+                        proximo_envio = inicio + intervalo
+                        metricas.incrementar("comandos_enviados")
+                    # La lectura solo espera hasta el próximo envío para mantener el ritmo
+                    espera = min(max(proximo_envio - inicio, 0.001), 0.05) if len(enviados) < self.en_vuelo_maximo else 0.05
+                    chunk = _leer_disponible(ser, espera)
+                else:
+                    chunk = ser.read(ser.in_waiting or 1)
+            except Exception as e:
+                log.warning(f"❌ Lector detenido: {e}", extra={"puerto": self.puerto_activo})
+                self.error_lector = str(e)
+                self.fallo_conexion.set()
+                break
+
+            if chunk:
+                leido = time.perf_counter()
+                previas = self.tramas_decodificadas
+                self._decodificar_tramas(chunk, publicar=True)
+                for _ in range(min(self.tramas_decodificadas - previas, len(enviados))):
+                    metricas.observar("respuesta_comando", leido - enviados.popleft())
+                metricas.observar("espera_lectura_serial", leido - inicio)
+                metricas.observar("iteracion_lector", time.perf_counter() - inicio)
+
+        with self._nueva_lectura:
+            self._nueva_lectura.notify_all()
+
+    def _decodificar_tramas(self, chunk, publicar=False, instante=None):
+        """Entrega el chunk al ensamblador y devuelve la última trama válida (peso, formato, raw, estable).
+
+        `instante` fija el tiempo de las tramas (reproducción de un registro); sin él se usa la llegada.
+        """
+        ultima = None
+        metricas = self.metricas
+        metricas.incrementar("bytes_leidos", len(chunk))
+        textos = self.ensamblador.alimentar(chunk)
+        if not textos:
+            return None
+
+        # Las tramas de un mismo read() llegaron repartidas desde el chunk anterior: se les da ese
+        # espaciado (la última, el instante de llegada) para que picos y estabilidad vean el ritmo real
+        llegada = time.monotonic() if instante is None else instante
+        anterior = self._llegada_anterior if self._llegada_anterior is not None else llegada
+        self._llegada_anterior = llegada
+        paso = (llegada - anterior) / len(textos)
+        for indice, texto in enumerate(textos, 1 - len(textos)):
+            texto = texto.strip()
+            if not texto:
+                continue
+            instante = llegada + indice * paso
+            trama = self.ultima_trama = self.decodificador.decodificar_trama(texto)
+            if trama is None:
+                metricas.incrementar("tramas_fallidas")
+                if self.registro is not None:
+                    self.registro.anotar(self.puerto_activo, texto, instante=instante)
+                continue
+            metricas.incrementar("tramas", formato=trama.formato)
+            self.tramas_decodificadas += 1
+
+            peso = self.filtro.filtrar(trama, texto, instante)
+            if peso is None:
+                metricas.incrementar("tramas_rechazadas", motivo=self.filtro.motivo)
+                if self.registro is not None:
+                    self.registro.anotar(self.puerto_activo, texto, trama, False, instante, rechazada=True)
+                continue
+
+            estable = self.estabilidad.actualizar(peso, instante, trama.estable)
+            self.historial.agregar(peso, instante, estable)
+            if self.registro is not None:
+                # El registro guarda lo que envió la báscula, no el valor filtrado
+                self.registro.anotar(self.puerto_activo, texto, trama, estable, instante)
+            ultima = (peso, trama.formato, texto, estable)
+            if publicar:
+                self._publicar_lectura(peso, trama.formato, texto, estable)
+
+        fijado = self.decodificador.protocolo_fijado
+        if fijado is not None and fijado is not self._protocolo_guardado and self.puerto_activo:
+            self._protocolo_guardado = fijado
+            self.cache_detecciones.guardar_en_segundo_plano(self.puerto_activo, self.config_activa, fijado.nombre)
+
+        return ultima
+
+    def _publicar_lectura(self, peso, formato, raw, estable=False):
+        anterior = self.lectura_actual
+        secuencia = anterior.secuencia + 1 if anterior else 1
+        self.lectura_actual = LecturaPeso(peso, formato, raw, time.monotonic(), secuencia, estable)
+        if self.memoria is not None:
+            self.memoria.publicar(self.lectura_actual)
+
+        self.ultimo_peso = peso
+        self.ultimo_raw_data = raw
+        self.ultimo_timestamp = time.time()
+        self.ultimo_estable = estable
+
+        with self._nueva_lectura:
+            self._nueva_lectura.notify_all()
+
+    def esperar_lectura(self, secuencia_anterior=0, timeout=1.0):
+        """Bloquea hasta que se publique una lectura más nueva que secuencia_anterior."""
+        with self._nueva_lectura:
+            self._nueva_lectura.wait_for(
+                lambda: (self.lectura_actual is not None and self.lectura_actual.secuencia > secuencia_anterior)
+                or (self.supervisor is None and (not self._lector_activo() or self.error_lector is not None)),
+                timeout=timeout
+            )
+        return self.lectura_actual
+
+    def esperar_peso_estable(self, timeout=10.0):
+        """Bloquea hasta que el hilo lector publique una lectura estable o venza el plazo."""
+        if self.supervisor is not None and self.estado_conexion != "conectado":
+            return self._resultado_desconectado()
+
+        if not self.conexion_activa:
+            return {
+                "success": False,
+                "error": "No hay conexión activa",
+                "requiere_conexion": True
+            }
+
+        fin = time.monotonic() + timeout
+        secuencia = 0
+        while True:
+            lectura = self.lectura_actual
+            if lectura is not None and lectura.estable:
+                return self.leer_peso_tiempo_real()
+
+            restante = fin - time.monotonic()
+            if restante <= 0 or self.error_lector is not None or not self._lector_activo():
+                return self._resultado_no_estable()
+
+            lectura = self.esperar_lectura(lectura.secuencia if lectura else secuencia, restante)
+            if lectura is not None:
+                secuencia = lectura.secuencia
+
+    def _resultado_no_estable(self):
+        resultado = self.leer_peso_tiempo_real()
+        if resultado.get("success"):
+            resultado = dict(resultado, success=False, error="La báscula no se estabilizó dentro del plazo")
+        return resultado
+
+    def _leer_peso_instantanea(self):
+        if self.error_lector is not None and self.supervisor is not None:
+            return self._resultado_desconectado()
+
+        if self.error_lector is not None:
+            error = self.error_lector
+            self.cerrar_conexion()
+            return {
+                "success": False,
+                "error": f"Puerto desconectado: {error}",
+                "requiere_conexion": True
+            }
+
+        lectura = self.lectura_actual
+        if lectura is None:
+            return {
+                "success": True,
+                "peso": 0.0,
+                "estable": False,
+                "mensaje": "Esperando datos de báscula...",
+                "metodo": "sin_datos_recientes",
+                "timestamp": time.time()
+            }
+        return self.resultado_lectura(lectura)
+
+    def resultado_lectura(self, lectura):
+        """Diccionario de respuesta para una LecturaPeso publicada por el lector."""
+        edad = time.monotonic() - lectura.monotonic
+        return {
+            "success": True,
+            "peso": round(lectura.peso, 3),
+            "estable": lectura.estable,
+            "raw_data": lectura.raw,
+            "formato_detectado": lectura.formato,
+            "metodo": self.METODO_LECTOR,
+            "secuencia": lectura.secuencia,
+            "timestamp": time.time() - edad,
+            "latencia_ms": int(edad * 1000)
+        }
+
+    def leer_peso_tiempo_real(self):
+        resultado = self._leer_peso_tiempo_real()
+        self.metricas.incrementar("lecturas", metodo=resultado.get("metodo", "error"))
+        return resultado
+
+    def _leer_peso_tiempo_real(self):
+        if self.supervisor is not None and self.estado_conexion != "conectado":
+            return self._resultado_desconectado()
+
+        if not self.conexion_activa or not self.conexion_activa.is_open:
+            return {
+                "success": False,
+                "error": "No hay conexión activa",
+                "requiere_conexion": True
+            }
+
+        if self._lector_activo():
+            return self._leer_peso_instantanea()
+
+        try:
+            ser = self.conexion_activa
+            timestamp_actual = time.time()
+
+            # Se drena todo lo pendiente (read() de lo ya recibido no espera) y se conserva la trama más reciente
+            ultima = None
+            bytes_disponibles = ser.in_waiting
+            while bytes_disponibles > 0:
+                decodificada = self._decodificar_tramas(ser.read(min(bytes_disponibles, 1024)))
+                if decodificada is not None:
+                    ultima = decodificada
+                bytes_disponibles = ser.in_waiting
+
+            if ultima is None and self.comando_activo is not None:
+                ultima = self._solicitar_lectura(ser)
+
+            if ultima is not None:
+                peso, formato, raw, estable = ultima
+                self.ultimo_peso = peso
+                self.ultimo_raw_data = raw
+                self.ultimo_timestamp = timestamp_actual
+                self.ultimo_estable = estable
+
+                return {
+                    "success": True,
+                    "peso": round(peso, 3),
+                    "estable": estable,
+                    "raw_data": raw,
+                    "formato_detectado": formato,
+                    "metodo": "tiempo_real_instantaneo",
+                    "timestamp": timestamp_actual,
+                    "latencia_ms": 0
+                }
+            
+            if timestamp_actual - self.ultimo_timestamp < 0.1:
+                return {
+                    "success": True,
+                    "peso": round(self.ultimo_peso, 3),
+                    "estable": self.ultimo_estable,
+                    "raw_data": self.ultimo_raw_data,
+                    "formato_detectado": "cache_reciente",
+                    "metodo": "cache_ultimo",
+                    "timestamp": self.ultimo_timestamp,
+                    "latencia_ms": int((timestamp_actual - self.ultimo_timestamp) * 1000)
+                }
+            
+            return {
+                "success": True,
+                "peso": round(self.ultimo_peso, 3),
+                "estable": self.ultimo_estable,
+                "raw_data": self.ultimo_raw_data,
+                "formato_detectado": "cache",
+                "metodo": "esperando_nuevos_datos",
+                "timestamp": self.ultimo_timestamp,
+                "latencia_ms": int((timestamp_actual - self.ultimo_timestamp) * 1000)
+            }
+
+        except Exception as e:
+            log.error(f"Error en tiempo real: {e}")
+            return {
+                "success": False,
+                "error": f"Error lectura tiempo real: {str(e)}",
+                "requiere_conexion": True
+            }
+
+    def _solicitar_lectura(self, ser):
+        """Sin hilo lector: envía el comando aprendido y espera solo hasta el delimitador de la respuesta."""
+        ser.write(self.comando_activo)
+        self.metricas.incrementar("comandos_enviados")
+        fin = time.monotonic() + self.plazo_respuesta
+        while True:
+            restante = fin - time.monotonic()
+            if restante <= 0:
+                self.metricas.incrementar("respuestas_perdidas")
+                return None
+            chunk = _leer_disponible(ser, min(restante, 0.05))
+            if chunk:
+                decodificada = self._decodificar_tramas(chunk)
+                if decodificada is not None:
+                    return decodificada
+
+    def sondear_puerto(self, puerto, plazo=2.0, cancelado=None):
+        """Prueba las configuraciones del puerto hasta decodificar una trama válida o agotar el plazo."""
+        inicio = time.monotonic()
+        fin = inicio + plazo
+        intentos = []
+
+        entrada_cache = self.cache_detecciones.obtener(puerto)
+        configuraciones = self._configuraciones_con_cache(entrada_cache)
+        comandos = self._comandos_con_cache(entrada_cache)
+
+        if not (entrada_cache or {}).get("comando"):
+            # Una báscula que transmite sola se identifica escuchando, con a lo sumo la mitad del plazo
+            escucha = self.escuchar_configuracion(puerto, configuraciones, plazo / 2, cancelado)
+            if escucha["configuracion"] is not None:
+                self.cache_detecciones.guardar(puerto, escucha["configuracion"], escucha["protocolo"])
+                return {
+                    "puerto": puerto,
+                    "detectada": True,
+                    "configuracion": escucha["configuracion"],
+                    "protocolo": escucha["protocolo"],
+                    "peso": escucha["peso"],
+                    "estable": escucha["estable"],
+                    "metodo": "escucha",
+                    "puntaje": escucha["puntaje"],
+                    "tiempo_ms": round((time.monotonic() - inicio) * 1000, 1),
+                    "intentos": escucha["ventanas"]
+                }
+            if escucha.get("error") and not escucha["ventanas"]:
+                # El puerto no abrió: tampoco abrirá con el barrido de configuraciones
+                return {
+                    "puerto": puerto,
+                    "detectada": False,
+                    "tiempo_ms": round((time.monotonic() - inicio) * 1000, 1),
+                    "intentos": 0,
+                    "error": escucha["error"]
+                }
+
+        for config in configuraciones:
+            if (cancelado is not None and cancelado.is_set()) or time.monotonic() >= fin:
+                break
+
+            # Cada configuración recibe una parte del tiempo restante
+            restantes = len(configuraciones) - len(intentos)
+            fin_config = min(fin, time.monotonic() + max((fin - time.monotonic()) / restantes, 0.25))
+
+            try:
+                ser = serial.Serial(
+                    port=puerto,
+                    baudrate=config['baudrate'],
+                    bytesize=config['bytesize'],
+                    parity=config['parity'],
+                    stopbits=config['stopbits'],
+                    timeout=0
+                )
+            except Exception as e:
+                intentos.append({"configuracion": config, "error": str(e)})
+                # Si el puerto no abre ni con la primera configuración no abrirá con las demás
+                if len(intentos) == 1:
+                    break
+                continue
+
+            try:
+                ser.reset_input_buffer()
+                trama, metodo, comando = self._esperar_trama(ser, fin_config, cancelado, comandos)
+            except Exception as e:
+                trama, metodo, comando = None, str(e), None
+            finally:
+                try:
+                    ser.close()
+                except:
+                    pass
+
+            intentos.append({"configuracion": config, "metodo": metodo})
+            if trama is not None:
+                self.cache_detecciones.guardar(puerto, config, trama.formato, comando)
+                return {
+                    "puerto": puerto,
+                    "detectada": True,
+                    "configuracion": config,
+                    "protocolo": trama.formato,
+                    "peso": trama.peso,
+                    "estable": trama.estable,
+                    "metodo": metodo,
+                    "tiempo_ms": round((time.monotonic() - inicio) * 1000, 1),
+                    "intentos": len(intentos)
+                }
+
+        return {
+            "puerto": puerto,
+            "detectada": False,
+            "tiempo_ms": round((time.monotonic() - inicio) * 1000, 1),
+            "intentos": len(intentos),
+            "error": (intentos[-1].get("error") if intentos else None) or "Sin tramas válidas dentro del plazo"
+        }
+
+    def _esperar_trama(self, ser, fin, cancelado=None, comandos=None):
+        """Escucha pasivamente la primera mitad del plazo y luego envía los comandos de solicitud.
+
+        Devuelve (trama, metodo, comando) con comando None si la báscula transmite sola.
+        """
+        ensamblador = EnsambladorTramas()
+        decodificador = DecodificadorPesos()
+        comandos = comandos or self.comandos_solicitud
+
+        mitad = time.monotonic() + (fin - time.monotonic()) / 2
+        trama = self._esperar_respuesta(ser, ensamblador, decodificador, mitad, cancelado)
+        if trama is not None:
+            return trama, "pasivo", None
+
+        for cmd in comandos:
+            restante = fin - time.monotonic()
+            if restante <= 0:
+                break
+            ser.reset_input_buffer()
+            ser.write(cmd)
+            # La respuesta a un comando empieza en limpio: no hay trama cortada que descartar
+            ensamblador.reiniciar()
+            ensamblador.sincronizado = True
+            limite = time.monotonic() + restante / 2 if cmd != comandos[-1] else fin
+            trama = self._esperar_respuesta(ser, ensamblador, decodificador, limite, cancelado)
+            if trama is not None:
+                return trama, f"comando:{cmd.decode('ascii').strip() or 'CR'}", cmd
+
+        return None, "sin_tramas", None
+
+    @staticmethod
+    def _esperar_respuesta(ser, ensamblador, decodificador, fin, cancelado=None):
+        while True:
+            restante = fin - time.monotonic()
+            if restante <= 0 or (cancelado is not None and cancelado.is_set()):
+                return None
+
+            # Espera hasta que llega al menos un byte o vence el plazo
+            chunk = _leer_disponible(ser, min(restante, 0.1))
+            if not chunk:
+                continue
+
+            for texto in ensamblador.alimentar(chunk):
+                trama = decodificador.decodificar_trama(texto.strip())
+                if trama is not None:
+                    return trama
+
+    def leer_peso_una_vez(self, puerto, baudios=None, timeout=0.1):
+        log.info(f"Lectura rápida desde {puerto} con timeout {timeout}s")
+        
+        configs_a_probar = self.configuraciones_comunes
+        entrada_cache = self.cache_detecciones.obtener(puerto)
+
+        if not baudios and not (entrada_cache or {}).get("comando"):
+            escucha = self.escuchar_configuracion(puerto, self._configuraciones_con_cache(entrada_cache))
+            if escucha["configuracion"] is not None:
+                return {
+                    "success": True,
+                    "peso": escucha["peso"],
+                    "configuracion": dict(escucha["configuracion"], timeout=timeout),
+                    "formato_detectado": escucha["protocolo"],
+                    "metodo": "escucha_pasiva"
+                }
+
+        if baudios:
+            configs_a_probar = [
+                {'baudrate': baudios, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'timeout': timeout}
+            ] + self.configuraciones_comunes
+
+        for config in configs_a_probar:
+            try:
+                ser = serial.Serial(
+                    port=puerto,
+                    baudrate=config['baudrate'],
+                    bytesize=config['bytesize'],
+                    parity=config['parity'],
+                    stopbits=config['stopbits'],
+                    timeout=config['timeout']
+                )
+
+                # Como el hilo lector: se bloquea hasta que llegan bytes y el ensamblador descarta la
+                # trama cortada del principio, en lugar de dormir y vaciar lo que ya había llegado
+                fin = time.monotonic() + self.plazo_pasivo
+                trama = self._esperar_respuesta(ser, EnsambladorTramas(), DecodificadorPesos(), fin)
+                if trama is not None:
+                    ser.close()
+                    return {
+                        "success": True,
+                        "peso": trama.peso,
+                        "configuracion": config,
+                        "formato_detectado": trama.formato,
+                        "metodo": "buffer_inmediato"
+                    }
+                
+                for cmd in self._comandos_con_cache(entrada_cache):
+                    try:
+                        trama = self._solicitar_trama(ser, cmd)
+                        if trama is not None:
+                            ser.close()
+                            return {
+                                "success": True,
+                                "peso": trama.peso,
+                                "configuracion": config,
+                                "formato_detectado": trama.formato,
+                                "metodo": "comando_solicitud"
+                            }
+                    except:
+                        continue
+                
+                ser.close()
+                
+            except Exception as e:
+                try:
+                    ser.close()
+                except:
+                    pass
+                continue
+
+        return {
+            "success": False,
+            "error": f"No se pudo leer peso desde {puerto}",
+            "puerto": puerto
+        }
+
+    def _extraer_peso_universal(self, datos):
+        return self.decodificador.decodificar(datos)
+
+    def cerrar_conexion(self):
+        if self.supervisor is not None:
+            self.supervisor.detener()
+            self.supervisor = None
+        self.detener_lector()
+        self.estado_conexion = "desconectado"
+        if self.memoria is not None:
+            self.memoria.marcar_conexion(False)
+
+        if self.conexion_activa:
+            try:
+                if self.conexion_activa.is_open:
+                    self.conexion_activa.reset_input_buffer()
+                    self.conexion_activa.reset_output_buffer()
+                    time.sleep(0.05)  # Reducido
+                    self.conexion_activa.close()
+                log.info("Conexión cerrada correctamente")
+            except Exception as e:
+                log.warning(f"Error cerrando: {e}")
+            finally:
+                self.conexion_activa = None
+                self.config_activa = None
+
+
+class SupervisorConexion:
+    """Vigila la conexión de un detector y la restablece en segundo plano con espera exponencial.
+
+    Detecta la pérdida por el fallo del hilo lector o porque el puerto desaparece del sistema; mientras
+    tanto los lectores reciben un estado "desconectado" inmediato. Los eventos de conexión USB llegan
+    por udev si pyudev está instalado; si no, se consulta la existencia del puerto cada `intervalo`.
+    """
+
+    def __init__(self, detector, bloqueo=None, intervalo=1.0, espera_inicial=0.5, espera_maxima=30.0):
+        self.detector = detector
+        self.puerto = detector.puerto_activo
+        self.bloqueo = bloqueo or threading.Lock()
+        self.intervalo = intervalo
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.intentos = 0
+        self.reconexiones = 0
+        self.hilo = None
+        self._detener = threading.Event()
+        self._monitor_udev = None
+
+    def iniciar(self):
+        if self.hilo is not None:
+            return
+        self._detener.clear()
+        self._monitor_udev = self._crear_monitor_udev()
+        self.hilo = threading.Thread(target=self._bucle, name=f"supervisor-{self.puerto}", daemon=True)
+        self.hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        # Despierta la espera por fallo del lector
+        self.detector.fallo_conexion.set()
+        if self.hilo is not None and self.hilo is not threading.current_thread():
+            self.hilo.join(timeout=1.0)
+        self.hilo = None
+
+    @staticmethod
+    def _crear_monitor_udev():
+        try:
+            import pyudev
+        except ImportError:
+            return None
+        try:
+            monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+            monitor.filter_by(subsystem="tty")
+            monitor.start()
+            return monitor
+        except Exception as e:
+            log.debug(f"udev no disponible, se usará sondeo: {e}")
+            return None
+
+    def puerto_presente(self):
+        # En POSIX basta con que exista el nodo; en Windows los COM solo aparecen en la enumeración
+        if os.path.exists(self.puerto):
+            return True
+        try:
+            return any(p.device == self.puerto for p in serial.tools.list_ports.comports())
+        except Exception:
+            return False
+
+    def _esperar_evento(self, timeout):
+        """Duerme hasta `timeout` o hasta un evento udev de tty; devuelve False si se pidió detener."""
+        if self._monitor_udev is not None:
+            fin = time.monotonic() + timeout
+            while not self._detener.is_set():
+                restante = fin - time.monotonic()
+                if restante <= 0:
+                    break
+                if self._monitor_udev.poll(timeout=min(restante, 0.5)) is not None:
+                    break
+            return not self._detener.is_set()
+        return not self._detener.wait(timeout)
+
+    def _bucle(self):
+        detector = self.detector
+        espera = self.espera_inicial
+
+        while not self._detener.is_set():
+            if detector.estado_conexion == "conectado":
+                detector.fallo_conexion.wait(self.intervalo)
+                if self._detener.is_set():
+                    break
+                if detector.error_lector is not None:
+                    detector.soltar_conexion(detector.error_lector)
+                elif not self.puerto_presente():
+                    detector.soltar_conexion("El puerto ya no existe")
+                else:
+                    continue
+                espera = self.espera_inicial
+
+            if not self.puerto_presente():
+                # Sin dispositivo no se gasta el backoff; se reintenta en cuanto vuelva a aparecer
+                espera = self.espera_inicial
+                self._esperar_evento(self.intervalo)
+                continue
+
+            if self._reconectar():
+                espera = self.espera_inicial
+                continue
+
+            log.info(f"Reintento de reconexión en {espera:.1f}s", extra={"puerto": self.puerto, "intentos": self.intentos})
+            if not self._esperar_evento(espera):
+                break
+            espera = min(espera * 2, self.espera_maxima)
+
+    def _reconectar(self):
+        # Si una petición está conectando o cerrando este puerto se deja para la próxima vuelta
+        if not self.bloqueo.acquire(blocking=False):
+            return False
+        try:
+            if self._detener.is_set():
+                return False
+            self.intentos += 1
+            # Sin lista explícita detectar_y_conectar prueba primero la configuración guardada en la caché
+            resultado = self.detector.detectar_y_conectar(self.puerto, timeout=0.1)
+        except Exception as e:
+            resultado = {"success": False, "error": str(e)}
+        finally:
+            self.bloqueo.release()
+        return self._contar_reconexion(resultado)
+
+    def _contar_reconexion(self, resultado):
+        if resultado.get("success"):
+            self.reconexiones += 1
+            self.detector.metricas.incrementar("reconexiones")
+            log.info(f"✅ Báscula reconectada tras {self.intentos} intento(s)", extra={"puerto": self.puerto})
+            self.intentos = 0
+            return True
+        return False
+
+
+def listar_puertos():
+    try:
+        ports = serial.tools.list_ports.comports()
+        result = []
+        for port in ports:
+            result.append({
+                "device": port.device,
+                "name": port.name,
+                "description": port.description,
+                "vid": port.vid,
+                "pid": port.pid,
+                "serial_number": port.serial_number,
+                "adaptador": _clave_adaptador(port)
+            })
+        return result
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# Tramas reales capturadas de cada marca, usadas por benchmark_decodificador
+CORPUS_TRAMAS = {
+    "braumker_yp200": ["ST,GS,+0012.34kg", "US,GS,+0003.50kg", "ST,GS,+0150.00kg"],
+    "torrey": ["ST,GS, 25.500 kg", "ST,GS,  0.850 kg", "ST,GS,120.125kg"],
+    "cas": ["N012.50", "T001.20", "N 0.000 kg N0045.5"],
+    "signed": ["+012.345", "-0008.200", "+0250.0 kg"],
+    "gramos": ["012345 g", "  25500", "150000"],
+}
+
+
+def detectar_basculas(puertos=None, plazo=2.0, detener_al_primero=False):
+    """Sondea todos los puertos en paralelo y devuelve un reporte ordenado (detectadas primero)."""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    if puertos is None:
+        lista = listar_puertos()
+        puertos = [p["device"] for p in lista] if isinstance(lista, list) else []
+
+    if not puertos:
+        return []
+
+    cancelado = threading.Event()
+    reporte = []
+
+    with ThreadPoolExecutor(max_workers=len(puertos)) as pool:
+        futuros = {
+            pool.submit(DetectorUniversalBasculas().sondear_puerto, puerto, plazo, cancelado): puerto
+            for puerto in puertos
+        }
+        for futuro in as_completed(futuros):
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                resultado = {"puerto": futuros[futuro], "detectada": False, "error": str(e)}
+            reporte.append(resultado)
+            if detener_al_primero and resultado.get("detectada"):
+                cancelado.set()
+
+    reporte.sort(key=lambda r: (not r.get("detectada"), r.get("tiempo_ms", float("inf"))))
+    return reporte
+
+
+def benchmark_decodificador(duracion=1.0):
+    resultados = {}
+    for formato, tramas in CORPUS_TRAMAS.items():
+        for fijado in (False, True):
+            decodificador = DecodificadorPesos()
+            if fijado:
+                decodificador.fijar_protocolo(formato)
+
+            total = 0
+            inicio = time.perf_counter()
+            while time.perf_counter() - inicio < duracion:
+                for _ in range(100):
+                    for trama in tramas:
+                        if not fijado:
+                            decodificador.reiniciar()
+                        decodificador.decodificar(trama)
+                total += 100 * len(tramas)
+            transcurrido = time.perf_counter() - inicio
+
+            clave = "tramas_por_segundo_fijado" if fijado else "tramas_por_segundo"
+            resultados.setdefault(formato, {})[clave] = round(total / transcurrido)
+        resultados[formato]["formato_decodificado"] = DecodificadorPesos().decodificar(tramas[0])[1]
+    return resultados
+
+
+class SimuladorBascula:
+    """Báscula por software sobre un par pseudo-terminal (solo POSIX) para pruebas y benchmarks."""
+
+    FORMATOS = ("braumker_yp200", "torrey", "cas", "gramos")
+
+    def __init__(self, formato="braumker_yp200", hz=10.0, baudios=9600, peso_objetivo=25.0,
+                 subida_s=1.0, ruido=0.0, cortes=0.0, desconectar_cada=None, solo_comando=False,
+                 comando=None, enlace=None, semilla=None, perfil="rampa", anunciar=True):
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato} (use {', '.join(self.FORMATOS)})")
+
+        import random
+
+        self.formato = formato
+        self.intervalo = 1.0 / hz
+        self.segundos_por_byte = 10.0 / baudios  # 8N1: 10 bits por byte en el cable
+        self.peso_objetivo = peso_objetivo
+        self.subida_s = subida_s
+        self.ruido = ruido
+        self.cortes = cortes
+        self.desconectar_cada = desconectar_cada
+        self.solo_comando = solo_comando
+        self.comandos = [comando.encode("ascii")] if comando else [b"P", b"W", b"S", b""]
+        self.enlace = enlace
+        self.aleatorio = random.Random(semilla)
+        # "contador" da a cada trama un peso distinto para poder medir su antigüedad al leerla
+        self.perfil = perfil
+        self.anunciar = anunciar
+        self.envios = {}
+
+        self.maestro = None
+        self.puerto = None
+        self.inicio = None
+        self.tramas_enviadas = 0
+        self._detener = threading.Event()
+
+    def peso_actual(self):
+        if self.perfil == "contador":
+            return 1.0 + (self.tramas_enviadas % 90000) / 100.0, True
+
+        transcurrido = time.monotonic() - self.inicio
+        if transcurrido < self.subida_s:
+            return self.peso_objetivo * transcurrido / self.subida_s, False
+        return self.peso_objetivo, True
+
+    def trama(self):
+        peso, estable = self.peso_actual()
+        if self.formato == "braumker_yp200":
+            return f"{'ST' if estable else 'US'},GS,{peso:+08.2f}kg\r\n".encode("ascii")
+        if self.formato == "torrey":
+            return f"ST,GS, {peso:7.3f} kg\r\n".encode("ascii")
+        if self.formato == "cas":
+            return f"\x02N{peso:07.2f}\x03".encode("ascii")
+        return f"{int(round(peso * 1000)):06d}\r\n".encode("ascii")
+
+    def abrir(self):
+        import pty
+        import tty
+
+        maestro, esclavo = pty.openpty()
+        tty.setraw(esclavo)
+        self.maestro = maestro
+        self._esclavo = esclavo
+        self.puerto = os.ttyname(esclavo)
+
+        if self.enlace:
+            if os.path.lexists(self.enlace):
+                os.unlink(self.enlace)
+            os.symlink(self.puerto, self.enlace)
+
+        if self.anunciar:
+            print(json.dumps({"puerto": self.enlace or self.puerto, "dispositivo": self.puerto, "formato": self.formato}), flush=True)
+
+    def cerrar(self):
+        for fd in (self.maestro, getattr(self, "_esclavo", None)):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.maestro = None
+
+    def detener(self):
+        """Termina ejecutar() desde otro hilo en lo que tarda una vuelta del bucle."""
+        self._detener.set()
+
+    def _enviar(self, datos):
+        if self.ruido and self.aleatorio.random() < self.ruido:
+            basura = bytes(self.aleatorio.choice(b"0123456789.,+-#?\xff") for _ in range(self.aleatorio.randint(1, 6)))
+            datos = basura + datos
+
+        if self.cortes and self.aleatorio.random() < self.cortes and len(datos) > 2:
+            corte = self.aleatorio.randint(1, len(datos) - 1)
+            partes = (datos[:corte], datos[corte:])
+        else:
+            partes = (datos,)
+
+        if self.perfil == "contador":
+            clave = datos.strip(b"\r\n\x02\x03").decode("ascii", "ignore")
+
+        for indice, parte in enumerate(partes):
+            os.write(self.maestro, parte)
+            if self.perfil == "contador" and indice == len(partes) - 1:
+                # Instante en que la trama completa queda disponible para el lector
+                self.envios[clave] = time.monotonic_ns()
+            # Tiempo que tardarían esos bytes en el cable al baudaje simulado
+            time.sleep(len(parte) * self.segundos_por_byte)
+        self.tramas_enviadas += 1
+
+    def ejecutar(self, duracion=None):
+        import select
+
+        self.inicio = time.monotonic()
+        self.abrir()
+        fin = self.inicio + duracion if duracion else None
+        proxima_trama = self.inicio
+        proxima_desconexion = self.inicio + self.desconectar_cada if self.desconectar_cada else None
+        pendiente = b""
+
+        try:
+            while not self._detener.is_set() and (fin is None or time.monotonic() < fin):
+                ahora = time.monotonic()
+
+                if proxima_desconexion is not None and ahora >= proxima_desconexion:
+                    log.info("Simulando desconexión")
+                    self.cerrar()
+                    self._detener.wait(1.0)
+                    self.abrir()
+                    proxima_desconexion = time.monotonic() + self.desconectar_cada
+                    continue
+
+                espera = max(0.0, proxima_trama - ahora) if not self.solo_comando else 0.05
+                listos, _, _ = select.select([self.maestro], [], [], espera)
+                if listos:
+                    try:
+                        pendiente += os.read(self.maestro, 256)
+                    except OSError:
+                        pendiente = b""
+                    while b"\n" in pendiente or b"\r" in pendiente:
+                        separador = min(i for i in (pendiente.find(b"\r"), pendiente.find(b"\n")) if i >= 0)
+                        comando, pendiente = pendiente[:separador].strip(), pendiente[separador + 1:]
+                        if comando in self.comandos and (comando or self.solo_comando):
+                            self._enviar(self.trama())
+                    continue
+
+                if not self.solo_comando and time.monotonic() >= proxima_trama:
+                    self._enviar(self.trama())
+                    proxima_trama += self.intervalo
+        finally:
+            self.cerrar()
+            if self.enlace and os.path.lexists(self.enlace):
+                os.unlink(self.enlace)
+
+
+def _percentiles(valores, escala=1.0):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    n = len(ordenados)
+
+    def rango(p):
+        return round(ordenados[min(n - 1, max(0, int(round(p / 100.0 * n + 0.5)) - 1))] / escala, 3)
+
+    return {
+        "p50": rango(50),
+        "p95": rango(95),
+        "p99": rango(99),
+        "max": round(ordenados[-1] / escala, 3),
+        "media": round(sum(ordenados) / n / escala, 3),
+        "muestras": n
+    }
+
+
+def reproducir_registro(ruta, puerto=None, velocidad=1.0, desde=None, hasta=None, salida=None):
+    """Pasa las tramas de un registro por el decodificador, al ritmo grabado dividido por `velocidad`.
+
+    velocidad=0 reproduce sin esperas (para medir el decodificador). El registro guarda el peso de la
+    trama antes del filtro, así que cuenta como diferencia cada trama cuyo peso decodificado ahora no
+    coincide con el registrado; las que el filtro rechaza se cuentan aparte en "rechazadas".
+    """
+    detectores = {}
+    inicio_real = time.perf_counter()
+    primer_ts = None
+    resumen = {"tramas": 0, "decodificadas": 0, "rechazadas": 0, "diferencias": 0}
+
+    for ts, monotonic, puerto_fila, raw, peso_registrado, _, _ in leer_registro(ruta, puerto, desde, hasta):
+        if velocidad > 0:
+            if primer_ts is None:
+                primer_ts = ts
+            espera = (ts - primer_ts) / velocidad - (time.perf_counter() - inicio_real)
+            if espera > 0:
+                time.sleep(espera)
+
+        detector = detectores.get(puerto_fila)
+        if detector is None:
+            detector = detectores[puerto_fila] = DetectorUniversalBasculas()
+            # Las filas ya son tramas completas, no hay cola cortada que descartar
+            detector.ensamblador.sincronizado = True
+
+        # Filtro y estabilidad ven el instante grabado, así el resultado no depende de la velocidad
+        instante = monotonic if monotonic is not None else ts
+        if detector._llegada_anterior is not None and instante < detector._llegada_anterior:
+            # El reloj monotónico reinicia con cada sesión del lector: es una conexión nueva
+            detector.filtro.reiniciar()
+            detector.estabilidad.reiniciar()
+            detector._llegada_anterior = None
+        decodificada = detector._decodificar_tramas(raw.encode("ascii", "ignore") + b"\r\n", instante=instante)
+        trama = detector.ultima_trama
+        resumen["tramas"] += 1
+        if trama is not None:
+            resumen["decodificadas"] += 1
+            if decodificada is None:
+                resumen["rechazadas"] += 1
+        peso = decodificada[0] if decodificada else None
+        if peso_registrado is not None and (trama is None or abs(trama.peso - peso_registrado) > 1e-9):
+            resumen["diferencias"] += 1
+
+        if salida is not None:
+            salida.write(json.dumps({
+                "ts": ts,
+                "puerto": puerto_fila,
+                "raw": raw,
+                "peso": round(peso, 3) if peso is not None else None,
+                "peso_registrado": peso_registrado,
+                "rechazada": trama is not None and decodificada is None,
+                "estable": decodificada[3] if decodificada else False,
+                "formato_detectado": decodificada[1] if decodificada else None
+            }) + "\n")
+
+    segundos = time.perf_counter() - inicio_real
+    resumen["segundos"] = round(segundos, 3)
+    resumen["tramas_por_segundo"] = int(resumen["tramas"] / segundos) if segundos > 0 else None
+    return resumen
+
+
+# Delimitadores de trama convertidos en LF para partir un bloque entero con bytes.split
+_DELIMITADORES_A_LF = bytes(0x0A if i in b"\r\n\x02\x03" else i for i in range(256))
+
+COLUMNAS_CAPTURA = ("tiempo", "desplazamiento", "peso", "formato", "estable")
+
+
+def _bloques_captura(datos, tamano):
+    """Límites [inicio, fin) de bloques de ~tamano bytes que terminan justo después de un delimitador."""
+    limites = []
+    inicio = 0
+    while inicio < len(datos):
+        corte = EnsambladorTramas._DELIMITADOR.search(datos, inicio + tamano) if inicio + tamano < len(datos) else None
+        fin = corte.end() if corte else len(datos)
+        limites.append((inicio, fin))
+        inicio = fin
+    return limites
+
+
+def _decodificar_bloque(tarea):
+    """Decodifica las tramas que empiezan dentro de [inicio, fin) de una captura.
+
+    Se lee desde `previo` para llegar al bloque con el protocolo fijado y la ventana de estabilidad
+    cargada, como si fuera la lectura continua de la captura; esas tramas no se emiten.
+    Devuelve (columnas, resumen). Las columnas son lo que viaja del proceso hijo al padre y van compactas:
+    por trama solo el desplazamiento y el índice de su (peso, formato, estable) en `columnas["valores"]`,
+    que guarda cada combinación una vez (~12 bytes por trama). El tiempo se deriva del desplazamiento y el
+    texto de salida lo arma el padre.
+    """
+    import mmap
+
+    ruta, previo, inicio, fin, bytes_por_segundo, origen, longitud_maxima = tarea
+    decodificador = DecodificadorPesos()
+    estabilidad = MotorEstabilidad()
+    resumen = {"tramas": 0, "decodificadas": 0, "fallidas": 0, "bytes_descartados": 0, "formatos": {}}
+    formatos = resumen["formatos"]
+    columnas = {"desplazamiento": array("q"), "valor": array("I"), "valores": []}
+    indices = {}
+
+    with open(ruta, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+        piezas = datos[previo:fin].translate(_DELIMITADORES_A_LF).split(b"\n")
+
+    # Un corte que no cae tras un delimitador (inicio del archivo o del tramo previo) deja una trama cortada;
+    # lo que sigue al último delimitador tampoco está completo
+    posicion = previo + len(piezas[0]) + 1
+    if previo == inicio and inicio > 0:
+        posicion = previo
+    else:
+        # Solo el primer bloque emite la trama cortada del inicio del archivo; los demás la leen como solapamiento
+        if inicio == 0:
+            resumen["bytes_descartados"] += len(piezas[0])
+        piezas = piezas[1:]
+    resumen["bytes_descartados"] += len(piezas[-1]) if piezas else 0
+    piezas = piezas[:-1]
+
+    # Una báscula en reposo repite la misma trama: con el protocolo fijado el resultado solo depende de los bytes
+    memoria = {}
+    consultar = memoria.get
+    fijado = decodificador.protocolo_fijado
+    actualizar = estabilidad.actualizar
+    agregar_desplazamiento = columnas["desplazamiento"].append
+    agregar_valor = columnas["valor"].append
+    ultimo_formato = por_formato = None
+    for pieza in piezas:
+        desplazamiento = posicion
+        posicion += len(pieza) + 1
+        if not pieza:
+            continue
+        emitir = desplazamiento >= inicio
+
+        trama = consultar(pieza)
+        if trama is not None:
+            decodificador._fallos = 0
+        else:
+            if len(pieza) > longitud_maxima:
+                if emitir:
+                    resumen["bytes_descartados"] += len(pieza)
+                continue
+            texto = str(pieza, "ascii", "ignore").strip()
+            if not texto:
+                continue
+            trama = decodificador.decodificar_trama(texto)
+            if decodificador.protocolo_fijado is not fijado:
+                fijado = decodificador.protocolo_fijado
+                memoria.clear()
+            if trama is not None and fijado is not None:
+                if len(memoria) >= 4096:
+                    memoria.clear()
+                memoria[pieza] = trama
+
+        if emitir:
+            resumen["tramas"] += 1
+        if trama is None:
+            if emitir:
+                resumen["fallidas"] += 1
+            continue
+
+        tiempo = origen + desplazamiento / bytes_por_segundo
+        estable = actualizar(trama.peso, tiempo, trama.estable)
+        if not emitir:
+            continue
+
+        if trama.formato is not ultimo_formato:
+            ultimo_formato = trama.formato
+            por_formato = formatos.get(ultimo_formato)
+            if por_formato is None:
+                por_formato = formatos[ultimo_formato] = {
+                    "tramas": 0, "estables": 0, "peso_minimo": trama.peso, "peso_maximo": trama.peso
+                }
+        por_formato["tramas"] += 1
+        por_formato["estables"] += estable
+        if trama.peso < por_formato["peso_minimo"]:
+            por_formato["peso_minimo"] = trama.peso
+        elif trama.peso > por_formato["peso_maximo"]:
+            por_formato["peso_maximo"] = trama.peso
+
+        valor = (trama.peso, trama.formato, estable)
+        indice = indices.get(valor)
+        if indice is None:
+            indice = indices[valor] = len(columnas["valores"])
+            columnas["valores"].append(valor)
+        agregar_desplazamiento(desplazamiento)
+        agregar_valor(indice)
+
+    resumen["decodificadas"] = sum(f["tramas"] for f in formatos.values())
+    return columnas, resumen
+
+
+def _escribir_csv(salida, columnas, origen, bytes_por_segundo):
+    colas = [",%r,%s,%d\n" % valor for valor in columnas["valores"]]
+    filas = [
+        "%.6f,%d%s" % (origen + desplazamiento / bytes_por_segundo, desplazamiento, colas[valor])
+        for desplazamiento, valor in zip(columnas["desplazamiento"], columnas["valor"])
+    ]
+    salida.write("".join(filas).encode("ascii"))
+
+
+def decodificar_captura(ruta, destino=None, procesos=1, baudios=9600, origen=0.0, tamano_bloque=8 << 20,
+                        solapamiento=4096, longitud_maxima=256):
+    """Decodifica una captura cruda del puerto serie con los mismos protocolos que la lectura en vivo.
+
+    El archivo se mapea en memoria y se parte en bloques que terminan en un delimitador; cada bloque se
+    divide en tramas con un solo split y, con procesos > 1, los bloques se reparten en un pool de procesos.
+    La captura no guarda instantes: "tiempo" es origen + desplazamiento al ritmo de la línea (baudios / 10
+    bytes por segundo), exacto si la báscula transmite sin pausas y una cota inferior si las hay.
+    Las tramas no pasan por FiltroPesos: se conserva lo que envió la báscula.
+
+    destino: None (CSV a stdout), ruta .csv o ruta .npz (requiere numpy). Devuelve el resumen por formato.
+    """
+    import mmap
+
+    inicio_real = time.perf_counter()
+    formato_salida = "npz" if destino and destino.endswith(".npz") else "csv"
+    if formato_salida == "npz" and _numpy() is None:
+        raise ValueError("La salida .npz requiere numpy; use un destino .csv")
+
+    tamano = os.path.getsize(ruta)
+    bloques = []
+    if tamano:
+        with open(ruta, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            bloques = _bloques_captura(datos, max(tamano_bloque, longitud_maxima * 2))
+    bytes_por_segundo = baudios / 10
+    tareas = [
+        (ruta, max(0, inicio - solapamiento) if inicio else 0, inicio, fin, bytes_por_segundo, origen, longitud_maxima)
+        for inicio, fin in bloques
+    ]
+
+    # Más procesos que núcleos solo suma el coste del pool
+    procesos = min(procesos or os.cpu_count() or 1, os.cpu_count() or 1, len(tareas)) or 1
+    if procesos > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=procesos)
+        resultados = pool.map(_decodificar_bloque, tareas)
+    else:
+        pool = None
+        resultados = map(_decodificar_bloque, tareas)
+
+    resumen = {"bytes": tamano, "bloques": len(tareas), "procesos": procesos, "tramas": 0, "decodificadas": 0,
+               "fallidas": 0, "bytes_descartados": 0, "formatos": {}}
+    columnas = {columna: [] for columna in COLUMNAS_CAPTURA}
+    if formato_salida == "npz":
+        np = _numpy()
+    else:
+        salida = open(destino, "wb") if destino else sys.stdout.buffer
+        salida.write((",".join(COLUMNAS_CAPTURA) + "\n").encode("ascii"))
+    try:
+        for bloque, parcial in resultados:
+            if formato_salida == "csv":
+                _escribir_csv(salida, bloque, origen, bytes_por_segundo)
+            else:
+                valor = np.frombuffer(bloque["valor"], dtype=np.uint32)
+                peso, formato, estable = zip(*bloque["valores"]) if bloque["valores"] else ((), (), ())
+                columnas["desplazamiento"].append(np.frombuffer(bloque["desplazamiento"], dtype=np.int64))
+                columnas["peso"].append(np.array(peso, dtype=np.float64)[valor])
+                columnas["formato"].append(np.array(formato, dtype=str)[valor])
+                columnas["estable"].append(np.array(estable, dtype=bool)[valor])
+
+            for clave in ("tramas", "decodificadas", "fallidas", "bytes_descartados"):
+                resumen[clave] += parcial[clave]
+            for formato, datos_formato in parcial["formatos"].items():
+                acumulado = resumen["formatos"].get(formato)
+                if acumulado is None:
+                    resumen["formatos"][formato] = dict(datos_formato)
+                    continue
+                acumulado["tramas"] += datos_formato["tramas"]
+                acumulado["estables"] += datos_formato["estables"]
+                acumulado["peso_minimo"] = min(acumulado["peso_minimo"], datos_formato["peso_minimo"])
+                acumulado["peso_maximo"] = max(acumulado["peso_maximo"], datos_formato["peso_maximo"])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if formato_salida == "csv":
+            if destino:
+                salida.close()
+            else:
+                salida.flush()
+
+    if formato_salida == "npz":
+        vacias = {"desplazamiento": np.empty(0, np.int64), "peso": np.empty(0), "formato": np.empty(0, str),
+                  "estable": np.empty(0, bool)}
+        for columna in vacias:
+            columnas[columna] = np.concatenate(columnas[columna] or [vacias[columna]])
+        columnas["tiempo"] = origen + columnas["desplazamiento"] / bytes_por_segundo
+        np.savez(destino, **columnas)
+
+    segundos = time.perf_counter() - inicio_real
+    resumen["segundos"] = round(segundos, 3)
+    resumen["mb_por_segundo"] = round(tamano / 1e6 / segundos, 1) if segundos > 0 else None
+    resumen["tramas_por_segundo"] = int(resumen["tramas"] / segundos) if segundos > 0 else None
+    return resumen
+
+
+def benchmark_lectura(puerto=None, duracion=5.0, hz=50.0, modo="hilo", formato_simulado=None, hz_bascula=50.0):
+    """Latencia de llamada, antigüedad del valor leído y tramas/s, contra hardware real o el simulador."""
+    simulador = None
+    if formato_simulado:
+        simulador = SimuladorBascula(formato=formato_simulado, hz=hz_bascula, perfil="contador", anunciar=False)
+        threading.Thread(target=simulador.ejecutar, args=(duracion + 3.0,), name="simulador", daemon=True).start()
+        while simulador.puerto is None:
+            time.sleep(0.01)
+        puerto = simulador.puerto
+
+    detector = DetectorUniversalBasculas(lector_en_segundo_plano=(modo == "hilo"))
+    conexion = detector.detectar_y_conectar(puerto, timeout=0.05)
+    if not conexion.get("success"):
+        return conexion
+
+    # Deja llegar algunas tramas antes de medir
+    if modo == "hilo":
+        detector.esperar_lectura(0, timeout=1.0)
+    else:
+        time.sleep(0.2)
+
+    latencias_ns = []
+    antiguedad_host_ns = []
+    antiguedad_extremo_ns = []
+    errores = 0
+    tramas_inicio = detector.tramas_decodificadas
+
+    intervalo_ns = int(1e9 / hz)
+    inicio_ns = time.perf_counter_ns()
+    fin_ns = inicio_ns + int(duracion * 1e9)
+    siguiente_ns = inicio_ns
+
+    while siguiente_ns < fin_ns:
+        t0 = time.perf_counter_ns()
+        resultado = detector.leer_peso_tiempo_real()
+        t1 = time.perf_counter_ns()
+        visto_ns = time.monotonic_ns()
+        latencias_ns.append(t1 - t0)
+
+        if not resultado.get("success"):
+            errores += 1
+        else:
+            lectura = detector.lectura_actual
+            if modo == "hilo" and lectura is not None and lectura.secuencia == resultado.get("secuencia"):
+                antiguedad_host_ns.append(visto_ns - int(lectura.monotonic * 1e9))
+            if simulador is not None:
+                enviado_ns = simulador.envios.get(resultado.get("raw_data"))
+                if enviado_ns is not None:
+                    antiguedad_extremo_ns.append(visto_ns - enviado_ns)
+
+        siguiente_ns += intervalo_ns
+        espera_ns = siguiente_ns - time.perf_counter_ns()
+        if espera_ns > 0:
+            time.sleep(espera_ns / 1e9)
+
+    transcurrido_s = (time.perf_counter_ns() - inicio_ns) / 1e9
+    tramas = detector.tramas_decodificadas - tramas_inicio
+    detector.cerrar_conexion()
+
+    return {
+        "success": True,
+        "puerto": puerto,
+        "simulado": formato_simulado,
+        "modo": modo,
+        "duracion_s": round(transcurrido_s, 3),
+        "hz_objetivo": hz,
+        "llamadas": len(latencias_ns),
+        "errores": errores,
+        "latencia_llamada_us": _percentiles(latencias_ns, 1e3),
+        "antiguedad_desde_llegada_ms": _percentiles(antiguedad_host_ns, 1e6),
+        "antiguedad_desde_cable_ms": _percentiles(antiguedad_extremo_ns, 1e6),
+        "tramas_decodificadas": tramas,
+        "tramas_por_segundo": round(tramas / transcurrido_s, 1) if transcurrido_s else 0.0
+    }
+
+
+# Importar la CLI (sin daemon ni pyserial) debe costar poco más que arrancar el intérprete
+PRESUPUESTO_IMPORTACION_MS = 25.0
+
+
+def _importtime_ms(modulo, directorio, entorno):
+    """Tiempo acumulado de `import modulo` según python -X importtime, en ms."""
+    import subprocess
+
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=directorio, env=entorno, capture_output=True, text=True
+    )
+    for linea in proceso.stderr.splitlines():
+        campos = linea.split("|")
+        if len(campos) == 3 and campos[2].strip() == modulo:
+            return int(campos[1]) / 1e3
+    raise RuntimeError(proceso.stderr.strip() or f"No se pudo importar {modulo}")
+
+
+def benchmark_arranque(repeticiones=10, presupuesto_ms=None):
+    """Arranque en frío de la CLI: importtime por módulo y tiempo de pared de órdenes sin trabajo serie."""
+    import subprocess
+
+    presupuesto_ms = presupuesto_ms or PRESUPUESTO_IMPORTACION_MS
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    script = os.path.join(directorio, "detector_universal_basculas.py")
+    # Sin daemon para medir el camino en proceso; con caché de bytecode como en producción
+    entorno = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    entorno["BASCULA_DAEMON"] = "off"
+
+    # Una pasada previa compila los .pyc para no medir el compilador
+    _importtime_ms("basculas_servidor", directorio, entorno)
+    _importtime_ms("detector_universal_basculas", directorio, entorno)
+
+    importacion = {}
+    for modulo in ("detector_universal_basculas", "basculas_nucleo", "basculas_servidor"):
+        importacion[modulo] = _percentiles(
+            [_importtime_ms(modulo, directorio, entorno) for _ in range(repeticiones)]
+        )
+
+    ordenes = {
+        "interprete": [sys.executable, "-c", "pass"],
+        "cerrar": [sys.executable, script, "cerrar"],
+        "listar_puertos": [sys.executable, script, "listar_puertos"],
+    }
+    pared = {}
+    for nombre, orden in ordenes.items():
+        tiempos_ns = []
+        for _ in range(repeticiones):
+            t0 = time.perf_counter_ns()
+            subprocess.run(orden, cwd=directorio, env=entorno, capture_output=True)
+            tiempos_ns.append(time.perf_counter_ns() - t0)
+        pared[nombre] = _percentiles(tiempos_ns, 1e6)
+
+    return {
+        "success": True,
+        "python": sys.version.split()[0],
+        "repeticiones": repeticiones,
+        "importacion_ms": importacion,
+        "presupuesto_importacion_ms": presupuesto_ms,
+        "dentro_presupuesto": importacion["detector_universal_basculas"]["p50"] <= presupuesto_ms,
+        "pared_ms": pared
+    }
+
+
+detector_global = None
+
+def obtener_detector():
+    global detector_global
+    if detector_global is None:
+        detector_global = DetectorUniversalBasculas()
+    return detector_global
+
+
+class GestorBasculas:
+    """Un DetectorUniversalBasculas independiente por puerto, con su hilo lector, decodificador y estabilidad.
+
+    `basculas` asigna IDs lógicos a puertos ({"piso": "/dev/ttyUSB0", "banco": "COM4"}); en todas las
+    llamadas se puede usar indistintamente el ID o el puerto.
+    """
+
+    def __init__(self, basculas=None, reconexion=True, registro=None, hz_sondeo=20.0, filtro=None, memoria=None):
+        self.basculas = dict(basculas or {})
+        self.filtro = filtro
+        self.memoria = memoria
+        self.detectores = {}
+        self.bloqueos = {}
+        self.reconexion = reconexion
+        self.registro = registro
+        self.hz_sondeo = hz_sondeo
+        self.bloqueo_global = threading.Lock()
+
+    def registrar(self, identificador, puerto):
+        with self.bloqueo_global:
+            self.basculas[identificador] = puerto
+
+    def resolver(self, identificador):
+        return self.basculas.get(identificador, identificador)
+
+    def _obtener(self, puerto):
+        with self.bloqueo_global:
+            if puerto not in self.detectores:
+                self.detectores[puerto] = self.configurar_detector(
+                    DetectorUniversalBasculas(lector_en_segundo_plano=True, hz_sondeo=self.hz_sondeo)
+                )
+                self.bloqueos[puerto] = threading.Lock()
+            return self.detectores[puerto], self.bloqueos[puerto]
+
+    def configurar_detector(self, detector):
+        """Aplica a un detector nuevo el registro, la memoria compartida y el filtro del gestor."""
+        detector.registro = self.registro
+        detector.directorio_memoria = self.memoria
+        if self.filtro is not None:
+            detector.filtro = FiltroPesos.desde_texto(self.filtro)
+        return detector
+
+    def conectar(self, puerto, timeout=0.1, configuraciones=None):
+        puerto = self.resolver(puerto)
+        detector, bloqueo = self._obtener(puerto)
+        with bloqueo:
+            resultado = detector.detectar_y_conectar(puerto, timeout, configuraciones)
+        self._supervisar(detector, bloqueo, resultado)
+        return resultado
+
+    def leer(self, puerto, timeout=0.1):
+        puerto = self.resolver(puerto)
+        detector, bloqueo = self._obtener(puerto)
+        resultado = self._asegurar_conexion(detector, bloqueo, puerto, timeout)
+        if resultado is not None:
+            return resultado
+        if detector.lectura_actual is None:
+            # Recién conectada: se espera la primera trama en lugar de responder 0.0
+            detector.esperar_lectura(0, max(timeout, 0.5))
+        # Con el hilo lector activo la lectura es solo la última instantánea
+        return detector.leer_peso_tiempo_real()
+
+    def leer_estable(self, puerto, plazo=10.0, timeout=0.1):
+        puerto = self.resolver(puerto)
+        detector, bloqueo = self._obtener(puerto)
+        resultado = self._asegurar_conexion(detector, bloqueo, puerto, timeout)
+        if resultado is not None:
+            return resultado
+        return detector.esperar_peso_estable(plazo)
+
+    def leer_todas(self, conectar=True, timeout=0.1):
+        """Última lectura de cada báscula registrada o abierta, en una sola respuesta.
+
+        Las básculas ya conectadas solo cuestan copiar su instantánea; las que falten se conectan en
+        paralelo para que una báscula lenta o ausente no retrase a las demás.
+        """
+        with self.bloqueo_global:
+            nombres = dict(self.basculas)
+            for puerto in self.detectores:
+                if puerto not in nombres.values():
+                    nombres[puerto] = puerto
+
+        pendientes = [
+            identificador for identificador, puerto in nombres.items()
+            if self.detectores.get(puerto) is None or (
+                self.detectores[puerto].supervisor is None and not self.detectores[puerto].conexion_activa
+            )
+        ]
+
+        lecturas = {}
+        if conectar and pendientes:
+            from concurrent.futures import ThreadPoolExecutor, as_completed
+
+            with ThreadPoolExecutor(max_workers=len(pendientes)) as pool:
+                futuros = {pool.submit(self.leer, nombres[i], timeout): i for i in pendientes}
+                for futuro in as_completed(futuros):
+                    try:
+                        lecturas[futuros[futuro]] = futuro.result()
+                    except Exception as e:
+                        lecturas[futuros[futuro]] = {"success": False, "error": str(e)}
+
+        for identificador, puerto in nombres.items():
+            if identificador in lecturas:
+                continue
+            detector = self.detectores.get(puerto)
+            if detector is None:
+                lecturas[identificador] = {"success": False, "error": "Báscula no conectada", "requiere_conexion": True}
+            else:
+                lecturas[identificador] = detector.leer_peso_tiempo_real()
+
+        for identificador, lectura in lecturas.items():
+            lectura["puerto"] = nombres[identificador]
+
+        return {
+            "success": True,
+            "basculas": lecturas,
+            "conectadas": sum(1 for lectura in lecturas.values() if lectura.get("success")),
+            "timestamp": time.time()
+        }
+
+    def estadisticas(self, puerto, ventana_ms=1000.0):
+        puerto = self.resolver(puerto)
+        detector = self.detectores.get(puerto)
+        if detector is None:
+            return {"success": False, "error": f"Sin historial para {puerto}", "requiere_conexion": True}
+        return dict(detector.historial.resumen(ventana_ms), success=True, puerto=puerto)
+
+    def tarar(self, puerto):
+        puerto = self.resolver(puerto)
+        detector = self.detectores.get(puerto)
+        if detector is None:
+            return {"success": False, "error": f"Sin historial para {puerto}", "requiere_conexion": True}
+        with detector.historial.bloqueo:
+            detector.historial.tarar(time.monotonic())
+        return {"success": True, "puerto": puerto, "mensaje": "Pico reiniciado"}
+
+    def estado(self):
+        return {
+            p: {
+                "conectado": bool(d.conexion_activa and d.conexion_activa.is_open),
+                "estado": d.estado_conexion,
+                "configuracion": d.config_activa,
+                "ultimo_peso": d.ultimo_peso,
+                "reconexiones": d.supervisor.reconexiones if d.supervisor else 0,
+                "ids": [i for i, puerto in self.basculas.items() if puerto == p],
+            }
+            for p, d in list(self.detectores.items())
+        }
+
+    def cerrar(self, puerto=None):
+        puertos = [self.resolver(puerto)] if puerto else list(self.detectores.keys())
+        for p in puertos:
+            if p in self.detectores:
+                detector, bloqueo = self._obtener(p)
+                with bloqueo:
+                    detector.cerrar_conexion()
+        return puertos
+
+    def _asegurar_conexion(self, detector, bloqueo, puerto, timeout):
+        """Conecta en la primera petición; una vez supervisado, reconectar nunca corre en el hilo de la petición."""
+        if detector.supervisor is not None:
+            return None
+
+        if not detector.conexion_activa or not detector.conexion_activa.is_open:
+            with bloqueo:
+                if not detector.conexion_activa or not detector.conexion_activa.is_open:
+                    resultado = detector.detectar_y_conectar(puerto, timeout)
+                    if not resultado.get("success"):
+                        return resultado
+        self._supervisar(detector, bloqueo, {"success": True})
+        return None
+
+    def _supervisar(self, detector, bloqueo, resultado):
+        if self.reconexion and resultado.get("success"):
+            detector.supervisar(bloqueo)
+
+    def cerrar_todo(self):
+        for detector in list(self.detectores.values()):
+            detector.cerrar_conexion()
+
@@ -0,0 +1,863 @@
+""" scripts/basculas_servidor.py """
+# Daemon de básculas: protocolo JSON por socket, SSE, /metrics y la variante asyncio.
+# Se importa solo desde "servir"; las órdenes de un solo disparo no pagan asyncio ni http.server.
+import serial
+import time
+import json
+import os
+import asyncio
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from collections import deque
+
+from basculas_cliente import _parsear_direccion
+from basculas_nucleo import (
+    log, MetricasDetector, DetectorUniversalBasculas, GestorBasculas, SupervisorConexion, listar_puertos,
+    detectar_basculas
+)
+
+
+def exportar_prometheus(detectores):
+    """Texto de exposición Prometheus para {puerto: detector}."""
+    contadores = {}
+    histogramas = {}
+    for puerto, detector in detectores.items():
+        metricas = detector.metricas
+        with metricas.bloqueo:
+            for (nombre, etiquetas), valor in metricas.contadores.items():
+                contadores.setdefault(nombre, []).append(((("puerto", puerto),) + etiquetas, valor))
+            for nombre, (conteos, suma, total) in metricas.histogramas.items():
+                histogramas.setdefault(nombre, []).append((puerto, list(conteos), suma, total))
+        contadores.setdefault("bytes_descartados", []).append(
+            ((("puerto", puerto),), detector.ensamblador.bytes_descartados)
+        )
+
+    def etiquetas_texto(etiquetas):
+        return ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in etiquetas)
+
+    lineas = []
+    for nombre, muestras in sorted(contadores.items()):
+        lineas.append(f"# TYPE bascula_{nombre}_total counter")
+        for etiquetas, valor in muestras:
+            lineas.append(f"bascula_{nombre}_total{{{etiquetas_texto(etiquetas)}}} {valor}")
+
+    for nombre, muestras in sorted(histogramas.items()):
+        lineas.append(f"# TYPE bascula_{nombre}_segundos histogram")
+        for puerto, conteos, suma, total in muestras:
+            acumulado = 0
+            for limite, conteo in zip(MetricasDetector.CUBETAS + ("+Inf",), conteos):
+                acumulado += conteo
+                lineas.append(f'bascula_{nombre}_segundos_bucket{{puerto="{puerto}",le="{limite}"}} {acumulado}')
+            lineas.append(f'bascula_{nombre}_segundos_sum{{puerto="{puerto}"}} {suma}')
+            lineas.append(f'bascula_{nombre}_segundos_count{{puerto="{puerto}"}} {total}')
+
+    return "\n".join(lineas) + "\n"
+
+
+class ServidorBasculas(GestorBasculas):
+    """Atiende el protocolo JSON del daemon sobre un GestorBasculas que mantiene abiertas las básculas."""
+
+    def __init__(self, banda_muerta=0.001, reconexion=True, basculas=None, registro=None, hz_sondeo=20.0,
+                 filtro=None, memoria=None):
+        super().__init__(basculas, reconexion, registro, hz_sondeo, filtro, memoria)
+        self.difusores = {}
+        self.banda_muerta = banda_muerta
+
+    def obtener_difusor(self, puerto, timeout=0.1):
+        puerto = self.resolver(puerto)
+        resultado = self.leer(puerto, timeout)
+        if not resultado.get("success"):
+            return None, resultado
+
+        detector, _ = self._obtener(puerto)
+        with self.bloqueo_global:
+            if puerto not in self.difusores:
+                self.difusores[puerto] = DifusorPeso(detector, self.banda_muerta)
+            return self.difusores[puerto], resultado
+
+    def atender(self, solicitud):
+        comando = solicitud.get("comando")
+        puerto = self.resolver(solicitud.get("bascula") or solicitud.get("puerto"))
+
+        if comando == "listar_puertos":
+            return listar_puertos()
+
+        if comando == "estado":
+            return {"success": True, "basculas": self.estado()}
+
+        if comando == "leer_todas":
+            for p in solicitud.get("puertos") or []:
+                if p not in self.basculas and p not in self.basculas.values():
+                    self.registrar(p, p)
+            return self.leer_todas(
+                conectar=solicitud.get("conectar", True), timeout=float(solicitud.get("timeout", 0.1))
+            )
+
+        if comando == "registrar":
+            if not solicitud.get("id") or not puerto:
+                return {"success": False, "error": "Se requieren 'id' y 'puerto' para registrar"}
+            self.registrar(solicitud["id"], puerto)
+            return {"success": True, "basculas": dict(self.basculas)}
+
+        if comando == "metricas":
+            if solicitud.get("formato") == "prometheus":
+                return {"success": True, "texto": exportar_prometheus(dict(self.detectores))}
+            return {
+                "success": True,
+                "metricas": {p: d.metricas.instantanea() for p, d in list(self.detectores.items())}
+            }
+
+        if comando == "cerrar":
+            return {"success": True, "mensaje": "Conexión cerrada", "puertos": self.cerrar(puerto)}
+
+        if comando == "detectar":
+            return {"success": True, "reporte": detectar_basculas(plazo=float(solicitud.get("plazo", 2.0)))}
+
+        if comando == "conectar" and not puerto:
+            reporte = detectar_basculas(detener_al_primero=True)
+            if not reporte or not reporte[0].get("detectada"):
+                return {"success": False, "error": "No se detectó ninguna báscula", "reporte": reporte}
+            puerto = reporte[0]["puerto"]
+            solicitud = dict(solicitud, configuracion=reporte[0]["configuracion"])
+
+        if not puerto:
+            return {"success": False, "error": f"Se requiere puerto para '{comando}'"}
+
+        timeout = float(solicitud.get("timeout", 0.1))
+
+        if comando == "conectar":
+            configuraciones = [solicitud["configuracion"]] if solicitud.get("configuracion") else None
+            return self.conectar(puerto, timeout, configuraciones)
+
+        if comando == "leer":
+            return self.leer(puerto, timeout)
+
+        if comando == "leer_estable":
+            return self.leer_estable(puerto, float(solicitud.get("plazo", 10.0)), timeout)
+
+        if comando == "estadisticas":
+            return self.estadisticas(puerto, float(solicitud.get("ventana_ms", 1000.0)))
+
+        if comando == "tarar":
+            return self.tarar(puerto)
+
+        return {"success": False, "error": f"Comando desconocido: {comando}"}
+
+
+class DifusorPeso:
+    """Un hilo por báscula descarta lecturas repetidas y despierta a todos los suscriptores a la vez."""
+
+    def __init__(self, detector, banda_muerta=0.001):
+        self.detector = detector
+        self.banda_muerta = banda_muerta
+        self.evento = None
+        self.suscriptores = 0
+        self.hilo = None
+        self.condicion = threading.Condition()
+
+    def suscribir(self):
+        with self.condicion:
+            self.suscriptores += 1
+            if self.hilo is None:
+                self.hilo = threading.Thread(target=self._bucle, name="difusor", daemon=True)
+                self.hilo.start()
+
+    def desuscribir(self):
+        with self.condicion:
+            self.suscriptores -= 1
+
+    def esperar(self, id_anterior=0, timeout=5.0):
+        with self.condicion:
+            self.condicion.wait_for(
+                lambda: self.evento is not None and self.evento[0] > id_anterior, timeout=timeout
+            )
+            return self.evento
+
+    def _emitir(self, datos):
+        with self.condicion:
+            identificador = self.evento[0] + 1 if self.evento else 1
+            self.evento = (identificador, datos)
+            self.condicion.notify_all()
+
+    def _bucle(self):
+        secuencia = 0
+        ultimo_peso = None
+        ultimo_estable = None
+
+        while True:
+            with self.condicion:
+                if self.suscriptores <= 0:
+                    self.hilo = None
+                    return
+
+            lectura = self.detector.esperar_lectura(secuencia, timeout=1.0)
+
+            if self.detector.supervisor is not None and self.detector.estado_conexion != "conectado":
+                # Se avisa una vez y se sigue esperando: el supervisor reanuda las lecturas al reconectar
+                if ultimo_estable is not False or ultimo_peso is not None:
+                    self._emitir(self.detector.leer_peso_tiempo_real())
+                    ultimo_peso = None
+                    ultimo_estable = False
+                continue
+
+            if self.detector.error_lector is not None or self.detector.conexion_activa is None:
+                self._emitir(self.detector.leer_peso_tiempo_real())
+                with self.condicion:
+                    self.hilo = None
+                return
+
+            if lectura is None or lectura.secuencia == secuencia:
+                continue
+            secuencia = lectura.secuencia
+
+            if ultimo_peso is not None and abs(lectura.peso - ultimo_peso) <= self.banda_muerta \
+                    and lectura.estable == ultimo_estable:
+                continue
+            ultimo_peso = lectura.peso
+            ultimo_estable = lectura.estable
+
+            self._emitir(self.detector.leer_peso_tiempo_real())
+
+
+class _ManejadorSSE(BaseHTTPRequestHandler):
+    """GET /stream?puerto=COM3 -> text/event-stream con un evento 'peso' por cambio y latidos.
+    GET /metrics -> métricas en formato de texto Prometheus."""
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/metrics":
+            cuerpo = exportar_prometheus(dict(self.server.basculas.detectores)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+            return
+
+        if url.path != "/stream":
+            self.send_error(404)
+            return
+
+        puerto = parse_qs(url.query).get("puerto", [None])[0]
+        if not puerto:
+            self.send_error(400, "Se requiere puerto")
+            return
+
+        difusor, resultado = self.server.basculas.obtener_difusor(puerto)
+        if difusor is None:
+            self.send_response(503)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(json.dumps(resultado).encode("utf-8"))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "keep-alive")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+
+        difusor.suscribir()
+        try:
+            ultimo_id = 0
+            while True:
+                evento = difusor.esperar(ultimo_id, timeout=self.server.latido)
+                if evento is None or evento[0] == ultimo_id:
+                    self.wfile.write(b": latido\n\n")
+                else:
+                    ultimo_id, datos = evento
+                    tipo = "peso" if datos.get("success") else "error"
+                    self.wfile.write(f"id: {ultimo_id}\nevent: {tipo}\ndata: {json.dumps(datos)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            difusor.desuscribir()
+
+
+def crear_servidor_sse(direccion, basculas, latido=5.0):
+    _, destino = _parsear_direccion(direccion)
+    servidor = ThreadingHTTPServer(destino, _ManejadorSSE)
+    servidor.daemon_threads = True
+    servidor.basculas = basculas
+    servidor.latido = latido
+    return servidor
+
+
+class _ManejadorSolicitudes(socketserver.StreamRequestHandler):
+    """Una solicitud JSON por línea, una respuesta JSON por línea."""
+
+    def handle(self):
+        for linea in self.rfile:
+            if not linea.strip():
+                continue
+            try:
+                resultado = self.server.basculas.atender(json.loads(linea))
+            except Exception as e:
+                resultado = {"success": False, "error": str(e)}
+            self.wfile.write(json.dumps(resultado).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _ServidorTCP(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def crear_servidor(direccion, basculas=None):
+    tipo, destino = _parsear_direccion(direccion)
+
+    if tipo == "unix":
+        if os.path.exists(destino):
+            os.unlink(destino)
+
+        class _ServidorUnix(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        servidor = _ServidorUnix(destino, _ManejadorSolicitudes)
+    else:
+        servidor = _ServidorTCP(destino, _ManejadorSolicitudes)
+
+    servidor.basculas = basculas or ServidorBasculas()
+    return servidor
+
+
+class DetectorAsincronoBasculas(DetectorUniversalBasculas):
+    """Variante asyncio: el descriptor del puerto lo atiende el bucle de eventos, sin un hilo por báscula.
+
+    Conectar y esperar lecturas son corrutinas con nombre propio (*_asincrono/_asincrona); los métodos
+    heredados siguen siendo síncronos y sirven desde el bucle: leer_peso_tiempo_real copia la última
+    instantánea y cerrar_conexion quita el lector del bucle. esperar_lectura y esperar_peso_estable
+    síncronos bloquean, así que solo sirven desde otro hilo.
+    """
+
+    METODO_LECTOR = "bucle_eventos"
+
+    def __init__(self, hz_sondeo=20.0):
+        super().__init__(lector_en_segundo_plano=False, hz_sondeo=hz_sondeo)
+        self._loop = None
+        self._evento_lectura = None
+        self._fallo = None
+        self._tarea_lectura = None
+        self._tarea_sondeo = None
+        self._fd_registrado = None
+
+    def _lector_activo(self):
+        # Toda conexión abierta desde el bucle tiene su lector ahí; si falló, error_lector lo informa
+        return self._loop is not None and self.conexion_activa is not None
+
+    def detectar_y_conectar(self, puerto, timeout=0.1, configuraciones=None):
+        raise TypeError("DetectorAsincronoBasculas se conecta con 'await detectar_y_conectar_asincrono(...)'")
+
+    def detener_lector(self):
+        super().detener_lector()
+        self._quitar_lector()
+
+    def supervisar(self, bloqueo=None, **opciones):
+        if self.supervisor is None:
+            self.supervisor = SupervisorAsincrono(self, bloqueo or asyncio.Lock(), **opciones)
+            self.supervisor.iniciar()
+        return self.supervisor
+
+    def _preparar_bucle(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._evento_lectura = asyncio.Event()
+            self._fallo = asyncio.Event()
+
+    async def detectar_y_conectar_asincrono(self, puerto, timeout=0.1, configuraciones=None):
+        self._preparar_bucle()
+        loop = self._loop
+        # Como detectar_y_conectar: se cierra el puerto pero no el supervisor, que puede ser quien reconecta
+        self._cerrar_puerto()
+
+        entrada_cache = None
+        if configuraciones is None:
+            entrada_cache = await loop.run_in_executor(None, self.cache_detecciones.obtener, puerto)
+            configuraciones = self._configuraciones_con_cache(entrada_cache)
+            if entrada_cache is None:
+                configuraciones = await loop.run_in_executor(
+                    None, self._configuraciones_por_escucha, puerto, configuraciones
+                )
+
+        for config in configuraciones:
+            config_actual = dict(config, timeout=timeout)
+            try:
+                ser = serial.Serial(
+                    port=puerto,
+                    baudrate=config_actual['baudrate'],
+                    bytesize=config_actual['bytesize'],
+                    parity=config_actual['parity'],
+                    stopbits=config_actual['stopbits'],
+                    timeout=0
+                )
+                ser.reset_input_buffer()
+            except Exception as e:
+                log.info(f"Configuración descartada: {e}", extra={"puerto": puerto})
+                continue
+
+            self.lectura_actual = None
+            self.error_lector = None
+            self._fallo.clear()
+            # La caché se escribe solo cuando la configuración decodificó una trama o aprendió un comando
+            self._activar_conexion(ser, puerto, config_actual, entrada_cache, guardar=False)
+            self._iniciar_lectura_async(ser)
+
+            lectura = await self._esperar_peso_inicial(timeout, entrada_cache)
+            if lectura is None:
+                log.info(f"Sin tramas válidas con {config_actual['baudrate']} baud", extra={"puerto": puerto})
+                self._cerrar_puerto()
+                continue
+
+            if self.comando_activo is None:
+                await loop.run_in_executor(None, self._guardar_cache_conexion)
+            self._marcar_estado("conectado")
+            return self._resultado_conexion(puerto, config_actual, lectura.peso)
+
+        return {
+            "success": False,
+            "error": f"No se pudo conectar en {puerto}",
+            "puerto": puerto
+        }
+
+    def _cerrar_puerto(self):
+        self.detener_lector()
+        if self.conexion_activa:
+            try:
+                self.conexion_activa.close()
+            except Exception:
+                pass
+            self.conexion_activa = None
+
+    def _iniciar_lectura_async(self, ser):
+        try:
+            fd = ser.fileno()
+            self._loop.add_reader(fd, self._al_recibir_datos, ser)
+            self._fd_registrado = fd
+        except (AttributeError, NotImplementedError, ValueError):
+            # Windows (Proactor) no admite add_reader sobre el puerto: lectura bloqueante en el executor
+            ser.timeout = 0.05
+            self._tarea_lectura = self._loop.create_task(self._bucle_executor(ser))
+
+    def _al_recibir_datos(self, ser):
+        try:
+            chunk = ser.read(ser.in_waiting or 1)
+        except Exception as e:
+            self._marcar_error(e)
+            return
+        if chunk:
+            self._decodificar_tramas(chunk, publicar=True)
+
+    async def _bucle_executor(self, ser):
+        while self.conexion_activa is ser:
+            try:
+                chunk = await self._loop.run_in_executor(None, lambda: ser.read(ser.in_waiting or 1))
+            except Exception as e:
+                self._marcar_error(e)
+                return
+            if chunk:
+                self._decodificar_tramas(chunk, publicar=True)
+
+    def _marcar_error(self, error):
+        log.warning(f"❌ Lector detenido: {error}", extra={"puerto": self.puerto_activo})
+        self.error_lector = str(error)
+        self._quitar_lector()
+        if self.memoria is not None:
+            self.memoria.marcar_conexion(False)
+        self._fallo.set()
+        self._evento_lectura.set()
+
+    def _quitar_lector(self):
+        if self._fd_registrado is not None:
+            self._loop.remove_reader(self._fd_registrado)
+            self._fd_registrado = None
+        if self._tarea_lectura is not None:
+            self._tarea_lectura.cancel()
+            self._tarea_lectura = None
+        if self._tarea_sondeo is not None:
+            self._tarea_sondeo.cancel()
+            self._tarea_sondeo = None
+
+    def _publicar_lectura(self, peso, formato, raw, estable=False):
+        super()._publicar_lectura(peso, formato, raw, estable)
+        if self._evento_lectura is not None:
+            self._evento_lectura.set()
+
+    def _marcar_estado(self, estado, motivo=None):
+        super()._marcar_estado(estado, motivo)
+        if self._evento_lectura is not None:
+            self._evento_lectura.set()
+
+    async def _esperar_peso_inicial(self, timeout, entrada_cache=None):
+        lectura = await self.esperar_lectura_asincrona(0, max(timeout, self.plazo_pasivo))
+        if lectura is not None:
+            return lectura
+
+        # Básculas que solo responden a comando: la respuesta la publica el lector del bucle
+        for cmd in self._comandos_con_cache(entrada_cache):
+            if self.conexion_activa is None:
+                break
+            self.conexion_activa.write(cmd)
+            self.ensamblador.reiniciar()
+            self.ensamblador.sincronizado = True
+            lectura = await self.esperar_lectura_asincrona(0, self.plazo_respuesta)
+            if lectura is not None:
+                self.comando_activo = cmd
+                await self._loop.run_in_executor(
+                    None, self.cache_detecciones.guardar, self.puerto_activo, self.config_activa, None, cmd
+                )
+                self._tarea_sondeo = self._loop.create_task(self._bucle_sondeo(self.conexion_activa))
+                return lectura
+        return None
+
+    async def _bucle_sondeo(self, ser):
+        """Envía el comando aprendido a hz_sondeo con hasta en_vuelo_maximo solicitudes sin respuesta."""
+        metricas = self.metricas
+        intervalo = 1.0 / self.hz_sondeo if self.hz_sondeo else 0.0
+        enviados = deque()
+        respondidas = self.tramas_decodificadas
+
+        while self.conexion_activa is ser:
+            ahora = self._loop.time()
+            nuevas = self.tramas_decodificadas - respondidas
+            respondidas += nuevas
+            for _ in range(min(nuevas, len(enviados))):
+                metricas.observar("respuesta_comando", ahora - enviados.popleft())
+            while enviados and ahora - enviados[0] > self.plazo_respuesta:
+                enviados.popleft()
+                metricas.incrementar("respuestas_perdidas")
+
+            if len(enviados) < self.en_vuelo_maximo:
+                try:
+                    ser.write(self.comando_activo)
+                except Exception as e:
+                    self._marcar_error(e)
+                    return
+                enviados.append(ahora)
+                metricas.incrementar("comandos_enviados")
+                await asyncio.sleep(intervalo)
+            else:
+                # Con la ventana llena se espera una respuesta (o a que la más vieja se dé por perdida)
+                self._evento_lectura.clear()
+                try:
+                    await asyncio.wait_for(self._evento_lectura.wait(), self.plazo_respuesta)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def esperar_lectura_asincrona(self, secuencia_anterior=0, timeout=1.0):
+        """Como esperar_lectura, sin bloquear el bucle."""
+        self._preparar_bucle()
+        fin = self._loop.time() + timeout
+        while True:
+            lectura = self.lectura_actual
+            if lectura is not None and lectura.secuencia > secuencia_anterior:
+                return lectura
+            restante = fin - self._loop.time()
+            # Con supervisor se sigue esperando: la reconexión puede publicar dentro del plazo
+            if restante <= 0 or (self.supervisor is None and (self.error_lector is not None or self.conexion_activa is None)):
+                return lectura
+            self._evento_lectura.clear()
+            try:
+                await asyncio.wait_for(self._evento_lectura.wait(), restante)
+            except asyncio.TimeoutError:
+                pass
+
+    async def esperar_peso_estable_asincrono(self, timeout=10.0):
+        """Como esperar_peso_estable, sin bloquear el bucle."""
+        if self.supervisor is not None and self.estado_conexion != "conectado":
+            return self._resultado_desconectado()
+
+        if not self.conexion_activa:
+            return {
+                "success": False,
+                "error": "No hay conexión activa",
+                "requiere_conexion": True
+            }
+
+        fin = self._loop.time() + timeout
+        while True:
+            lectura = self.lectura_actual
+            if lectura is not None and lectura.estable:
+                return self.leer_peso_tiempo_real()
+
+            restante = fin - self._loop.time()
+            if restante <= 0 or self.error_lector is not None or not self._lector_activo():
+                return self._resultado_no_estable()
+
+            await self.esperar_lectura_asincrona(lectura.secuencia if lectura else 0, restante)
+
+    async def esperar_fallo(self, timeout):
+        """Vuelve cuando el lector del bucle falla o vence `timeout`."""
+        try:
+            await asyncio.wait_for(self._fallo.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class SupervisorAsincrono(SupervisorConexion):
+    """SupervisorConexion como tarea del bucle: misma espera exponencial, sin hilo por báscula."""
+
+    def __init__(self, detector, bloqueo, **opciones):
+        super().__init__(detector, bloqueo, **opciones)
+        self.tarea = None
+
+    def iniciar(self):
+        if self.tarea is None:
+            self.tarea = asyncio.get_running_loop().create_task(self._bucle_asincrono())
+
+    def detener(self):
+        if self.tarea is not None:
+            self.tarea.cancel()
+            self.tarea = None
+
+    async def _puerto_presente(self):
+        # En Windows puerto_presente enumera los COM: fuera del bucle
+        return await asyncio.get_running_loop().run_in_executor(None, self.puerto_presente)
+
+    async def _bucle_asincrono(self):
+        detector = self.detector
+        espera = self.espera_inicial
+
+        while True:
+            if detector.estado_conexion == "conectado":
+                await detector.esperar_fallo(self.intervalo)
+                if detector.error_lector is not None:
+                    detector.soltar_conexion(detector.error_lector)
+                elif not await self._puerto_presente():
+                    detector.soltar_conexion("El puerto ya no existe")
+                else:
+                    continue
+                espera = self.espera_inicial
+
+            if not await self._puerto_presente():
+                espera = self.espera_inicial
+                await asyncio.sleep(self.intervalo)
+                continue
+
+            if await self._reconectar_asincrono():
+                espera = self.espera_inicial
+                continue
+
+            log.info(f"Reintento de reconexión en {espera:.1f}s", extra={"puerto": self.puerto, "intentos": self.intentos})
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, self.espera_maxima)
+
+    async def _reconectar_asincrono(self):
+        # Si una petición está conectando o cerrando este puerto se deja para la próxima vuelta
+        if self.bloqueo.locked():
+            return False
+        async with self.bloqueo:
+            self.intentos += 1
+            try:
+                resultado = await self.detector.detectar_y_conectar_asincrono(self.puerto, timeout=0.1)
+            except Exception as e:
+                resultado = {"success": False, "error": str(e)}
+        return self._contar_reconexion(resultado)
+
+
+class ServidorBasculasAsincrono:
+    """Mismo protocolo JSON por líneas que ServidorBasculas, atendido por un único bucle asyncio.
+
+    Los IDs de báscula, las opciones y los comandos sin E/S serie (registrar, estado, metricas,
+    estadisticas, tarar) son los de un ServidorBasculas que comparte los detectores con este; aquí se
+    atiende solo lo que espera al puerto, con la misma reconexión en segundo plano.
+    """
+
+    COMANDOS_SERIE = ("conectar", "leer", "leer_estable", "leer_todas", "cerrar")
+
+    def __init__(self, banda_muerta=0.001, reconexion=True, basculas=None, registro=None, hz_sondeo=20.0,
+                 filtro=None, memoria=None):
+        self._sincrono = ServidorBasculas(banda_muerta, reconexion, basculas, registro, hz_sondeo, filtro, memoria)
+        self.detectores = self._sincrono.detectores
+        self.bloqueos = {}
+
+    def _obtener(self, puerto):
+        if puerto not in self.detectores:
+            self.detectores[puerto] = self._sincrono.configurar_detector(
+                DetectorAsincronoBasculas(hz_sondeo=self._sincrono.hz_sondeo)
+            )
+        if puerto not in self.bloqueos:
+            self.bloqueos[puerto] = asyncio.Lock()
+        return self.detectores[puerto], self.bloqueos[puerto]
+
+    async def atender(self, solicitud):
+        comando = solicitud.get("comando")
+        loop = asyncio.get_running_loop()
+
+        if comando in ("listar_puertos", "detectar"):
+            return await loop.run_in_executor(None, self._sincrono.atender, solicitud)
+
+        if comando not in self.COMANDOS_SERIE:
+            return self._sincrono.atender(solicitud)
+
+        puerto = self._sincrono.resolver(solicitud.get("bascula") or solicitud.get("puerto"))
+        timeout = float(solicitud.get("timeout", 0.1))
+
+        if comando == "leer_todas":
+            for p in solicitud.get("puertos") or []:
+                if p not in self._sincrono.basculas and p not in self._sincrono.basculas.values():
+                    self._sincrono.registrar(p, p)
+            return await self.leer_todas(conectar=solicitud.get("conectar", True), timeout=timeout)
+
+        if comando == "cerrar":
+            return {"success": True, "mensaje": "Conexión cerrada", "puertos": await self.cerrar(puerto)}
+
+        if comando == "conectar" and not puerto:
+            reporte = await loop.run_in_executor(None, lambda: detectar_basculas(detener_al_primero=True))
+            if not reporte or not reporte[0].get("detectada"):
+                return {"success": False, "error": "No se detectó ninguna báscula", "reporte": reporte}
+            puerto = reporte[0]["puerto"]
+            solicitud = dict(solicitud, configuracion=reporte[0]["configuracion"])
+
+        if not puerto:
+            return {"success": False, "error": f"Se requiere puerto para '{comando}'"}
+
+        if comando == "conectar":
+            configuraciones = [solicitud["configuracion"]] if solicitud.get("configuracion") else None
+            return await self.conectar(puerto, timeout, configuraciones)
+
+        if comando == "leer":
+            return await self.leer(puerto, timeout)
+
+        return await self.leer_estable(puerto, float(solicitud.get("plazo", 10.0)), timeout)
+
+    async def conectar(self, puerto, timeout=0.1, configuraciones=None):
+        detector, bloqueo = self._obtener(puerto)
+        async with bloqueo:
+            resultado = await detector.detectar_y_conectar_asincrono(puerto, timeout, configuraciones)
+        self._supervisar(detector, bloqueo, resultado)
+        return resultado
+
+    async def leer(self, puerto, timeout=0.1):
+        detector, bloqueo = self._obtener(puerto)
+        resultado = await self._asegurar_conexion(detector, bloqueo, puerto, timeout)
+        if resultado is not None:
+            return resultado
+        if detector.lectura_actual is None:
+            # Recién conectada: se espera la primera trama en lugar de responder 0.0
+            await detector.esperar_lectura_asincrona(0, max(timeout, 0.5))
+        return detector.leer_peso_tiempo_real()
+
+    async def leer_estable(self, puerto, plazo=10.0, timeout=0.1):
+        detector, bloqueo = self._obtener(puerto)
+        resultado = await self._asegurar_conexion(detector, bloqueo, puerto, timeout)
+        if resultado is not None:
+            return resultado
+        return await detector.esperar_peso_estable_asincrono(plazo)
+
+    async def leer_todas(self, conectar=True, timeout=0.1):
+        """Como GestorBasculas.leer_todas: las que falten se conectan a la vez, el resto copia su instantánea."""
+        nombres = dict(self._sincrono.basculas)
+        for puerto in self.detectores:
+            if puerto not in nombres.values():
+                nombres[puerto] = puerto
+
+        pendientes = [
+            identificador for identificador, puerto in nombres.items()
+            if self.detectores.get(puerto) is None or (
+                self.detectores[puerto].supervisor is None and not self.detectores[puerto].conexion_activa
+            )
+        ]
+
+        lecturas = {}
+        if conectar and pendientes:
+            resultados = await asyncio.gather(
+                *(self.leer(nombres[i], timeout) for i in pendientes), return_exceptions=True
+            )
+            for identificador, resultado in zip(pendientes, resultados):
+                if isinstance(resultado, Exception):
+                    resultado = {"success": False, "error": str(resultado)}
+                lecturas[identificador] = resultado
+
+        for identificador, puerto in nombres.items():
+            if identificador in lecturas:
+                continue
+            detector = self.detectores.get(puerto)
+            if detector is None:
+                lecturas[identificador] = {"success": False, "error": "Báscula no conectada", "requiere_conexion": True}
+            else:
+                lecturas[identificador] = detector.leer_peso_tiempo_real()
+
+        for identificador, lectura in lecturas.items():
+            lectura["puerto"] = nombres[identificador]
+
+        return {
+            "success": True,
+            "basculas": lecturas,
+            "conectadas": sum(1 for lectura in lecturas.values() if lectura.get("success")),
+            "timestamp": time.time()
+        }
+
+    async def cerrar(self, puerto=None):
+        puertos = [puerto] if puerto else list(self.detectores.keys())
+        for p in puertos:
+            if p in self.detectores:
+                detector, bloqueo = self._obtener(p)
+                async with bloqueo:
+                    detector.cerrar_conexion()
+        return puertos
+
+    async def _asegurar_conexion(self, detector, bloqueo, puerto, timeout):
+        """Conecta en la primera petición; una vez supervisado, reconectar nunca corre en la petición."""
+        if detector.supervisor is not None:
+            return None
+
+        if not detector.conexion_activa or not detector.conexion_activa.is_open:
+            async with bloqueo:
+                if not detector.conexion_activa or not detector.conexion_activa.is_open:
+                    resultado = await detector.detectar_y_conectar_asincrono(puerto, timeout)
+                    if not resultado.get("success"):
+                        return resultado
+        self._supervisar(detector, bloqueo, {"success": True})
+        return None
+
+    def _supervisar(self, detector, bloqueo, resultado):
+        if self._sincrono.reconexion and resultado.get("success"):
+            detector.supervisar(bloqueo)
+
+    async def _atender_cliente(self, reader, writer):
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                if not linea.strip():
+                    continue
+                try:
+                    resultado = await self.atender(json.loads(linea))
+                except Exception as e:
+                    resultado = {"success": False, "error": str(e)}
+                writer.write(json.dumps(resultado).encode("utf-8") + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def cerrar_todo(self):
+        await self.cerrar()
+
+
+async def servir_asincrono(direccion, basculas=None):
+    tipo, destino = _parsear_direccion(direccion)
+    basculas = basculas or ServidorBasculasAsincrono()
+
+    if tipo == "unix":
+        if os.path.exists(destino):
+            os.unlink(destino)
+        servidor = await asyncio.start_unix_server(basculas._atender_cliente, path=destino)
+    else:
+        servidor = await asyncio.start_server(basculas._atender_cliente, destino[0], destino[1])
+
+    log.info(f"Servidor de básculas (asyncio) escuchando en {direccion}")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        await basculas.cerrar_todo()
@@ -1,455 +1,113 @@
 """ scripts/detector_universal_basculas.py """
 #!/usr/bin/env python3
-import serial
-import time
+# Punto de entrada de la CLI. Solo carga la biblioteca estándar: si hay un daemon escuchando le
+# reenvía la orden, y si no cada subcomando importa el motor serie (basculas_nucleo) o el
+# daemon (basculas_servidor) cuando lo necesita.
 import sys
 import json
-import re
-import serial.tools.list_ports
-
-class DetectorUniversalBasculas:
-    def __init__(self):
-        self.configuraciones_comunes = [
-            {'baudrate': 9600, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'timeout': 0.05},  # Reducido timeout
-            {'baudrate': 9600, 'bytesize': 7, 'parity': 'E', 'stopbits': 1, 'timeout': 0.05},
-            {'baudrate': 2400, 'bytesize': 7, 'parity': 'E', 'stopbits': 1, 'timeout': 0.05},
-            {'baudrate': 4800, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'timeout': 0.05},
-            {'baudrate': 19200, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'timeout': 0.05},
-        ]
-
-        self.comandos_solicitud = [b'P\r\n', b'W\r\n', b'S\r\n', b'\r\n']
-        self.conexion_activa = None
-        self.config_activa = None
-        self.puerto_activo = None
-        
-        self.buffer_activo = ""
-        self.ultimo_peso = 0.0
-        self.ultimo_raw_data = ""
-        self.ultimo_timestamp = time.time()
-
-    def detectar_y_conectar(self, puerto, timeout=0.1):
-        print(f"🔍 Conectando a {puerto} con timeout {timeout}s", file=sys.stderr)
-
-        if self.conexion_activa and self.conexion_activa.is_open:
-            try:
-                self.conexion_activa.close()
-            except:
-                pass
-            self.conexion_activa = None
 
-        for config in self.configuraciones_comunes:
-            try:
-                config_actual = config.copy()
-                config_actual['timeout'] = timeout
-                
-                print(f"🎯 Probando: {config_actual['baudrate']} baud, {timeout}s timeout", file=sys.stderr)
-
-                ser = serial.Serial(
-                    port=puerto,
-                    baudrate=config_actual['baudrate'],
-                    bytesize=config_actual['bytesize'],
-                    parity=config_actual['parity'],
-                    stopbits=config_actual['stopbits'],
-                    timeout=config_actual['timeout']  
-                )
+from basculas_cliente import (
+    DIRECCION_DAEMON_DEFECTO, DaemonNoDisponible, consultar_daemon, direccion_daemon,
+    LectorMemoria, directorio_memoria, ruta_memoria, _leer_opcion, _posicionales, _basculas_configuradas
+)
 
-                time.sleep(0.1)
-                ser.reset_input_buffer()
-                ser.reset_output_buffer()
-
-                peso_inicial = self._leer_peso_conexion(ser, config_actual)
-
-                self.conexion_activa = ser
-                self.config_activa = config_actual
-                self.puerto_activo = puerto
-
-                print(f"Conectado en {puerto} (MODO TIEMPO REAL)", file=sys.stderr)
-
-                return {
-                    "success": True,
-                    "conectado": True,
-                    "peso": peso_inicial if peso_inicial is not None else 0.0,
-                    "puerto": puerto,
-                    "configuracion": config_actual,
-                    "baudios_detectados": config_actual['baudrate'],
-                    "mensaje": f"Báscula conectada en {puerto} - Modo tiempo real activado",
-                    "tiene_peso_inicial": peso_inicial is not None
-                }
-
-            except Exception as e:
-                print(f" Error: {e}", file=sys.stderr)
-                if 'ser' in locals():
-                    try:
-                        ser.close()
-                    except:
-                        pass
-                continue
-
-        return {
-            "success": False,
-            "error": f"No se pudo conectar en {puerto}",
-            "puerto": puerto
-        }
-
-    def _leer_peso_conexion(self, ser, config):
-        try:
-            if ser.in_waiting > 0:
-                data = ser.read(ser.in_waiting).decode('ascii', errors='ignore')
-                peso, _ = self._extraer_peso_universal(data)
-                if peso is not None:
-                    return peso
-
-            for cmd in self.comandos_solicitud:
-                try:
-                    ser.reset_input_buffer()
-                    ser.write(cmd)
-                    time.sleep(0.1)
-
-                    if ser.in_waiting > 0:
-                        data = ser.read(ser.in_waiting).decode('ascii', errors='ignore')
-                        peso, _ = self._extraer_peso_universal(data)
-                        if peso is not None:
-                            return peso
-                except Exception as e:
-                    print(f"  Error con comando {cmd}: {e}", file=sys.stderr)
-                    continue
-
-            return 0.0
-            
-        except Exception as e:
-            print(f"  Error en lectura inicial: {e}", file=sys.stderr)
-            return 0.0
+# Un daemon local acepta en microsegundos; más que esto es que no hay nadie escuchando
+PLAZO_CONEXION_DAEMON = 0.25
 
-    def leer_peso_conexion_activa(self):
-        if not self.conexion_activa or not self.conexion_activa.is_open:
-            return {
-                "success": False,
-                "error": "No hay conexión activa",
-                "requiere_conexion": True
-            }
 
-        try:
-            ser = self.conexion_activa
+def _solicitud_daemon(comando, argumentos):
+    """Traduce una orden de un solo disparo al protocolo del daemon: (solicitud, timeout) o (None, None)."""
+    posicionales = _posicionales(argumentos[2:])
 
-            try:
-                ser.in_waiting
-            except Exception as e:
-                print(f"❌ Puerto desconectado: {e}", file=sys.stderr)
-                self.conexion_activa = None
-                return {
-                    "success": False,
-                    "error": "Puerto desconectado",
-                    "requiere_conexion": True
-                }
-
-            if ser.in_waiting > 0:
-                data = ser.read(ser.in_waiting).decode('ascii', errors='ignore')
-                if data.strip():
-                    peso, formato = self._extraer_peso_universal(data)
-                    if peso is not None:
-                        self.ultimo_peso = peso
-                        self.ultimo_raw_data = data.strip()
-                        self.ultimo_timestamp = time.time()
-                        
-                        return {
-                            "success": True,
-                            "peso": round(peso, 3),
-                            "raw_data": data.strip(),
-                            "formato_detectado": formato,
-                            "metodo": "buffer_directo",
-                            "timestamp": self.ultimo_timestamp
-                        }
-
-            if time.time() - self.ultimo_timestamp < 1.0:
-                return {
-                    "success": True,
-                    "peso": round(self.ultimo_peso, 3),
-                    "raw_data": self.ultimo_raw_data,
-                    "formato_detectado": "cache",
-                    "metodo": "ultimo_conocido",
-                    "timestamp": self.ultimo_timestamp
-                }
-
-            return {
-                "success": True,
-                "peso": 0.0,
-                "mensaje": "Esperando datos de báscula...",
-                "metodo": "sin_datos_recientes",
-                "timestamp": time.time()
-            }
-
-        except Exception as e:
-            print(f"Error leyendo peso: {e}", file=sys.stderr)
-            try:
-                if self.conexion_activa:
-                    self.conexion_activa.close()
-            except:
-                pass
-            self.conexion_activa = None
-            return {
-                "success": False,
-                "error": f"Error de comunicación: {str(e)}",
-                "requiere_conexion": True
-            }
-
-    def leer_peso_tiempo_real(self):
-        if not self.conexion_activa or not self.conexion_activa.is_open:
-            return {
-                "success": False,
-                "error": "No hay conexión activa",
-                "requiere_conexion": True
-            }
-
-        try:
-            ser = self.conexion_activa
-            timestamp_actual = time.time()
-            
-            timeout_original = ser.timeout
-            
-            ser.timeout = 0.001
-            
-            try:
-                bytes_disponibles = ser.in_waiting
-                if bytes_disponibles > 0:
-                    while bytes_disponibles > 0:
-                        chunk = ser.read(min(bytes_disponibles, 1024))
-                        data = chunk.decode('ascii', errors='ignore')
-                        
-                        if data.strip():
-                            peso, formato = self._extraer_peso_universal(data)
-                            if peso is not None:
-                                self.ultimo_peso = peso
-                                self.ultimo_raw_data = data.strip()
-                                self.ultimo_timestamp = timestamp_actual
-                                
-                                ser.timeout = timeout_original
-                                
-                                return {
-                                    "success": True,
-                                    "peso": round(peso, 3),
-                                    "raw_data": data.strip(),
-                                    "formato_detectado": formato,
-                                    "metodo": "tiempo_real_instantaneo",
-                                    "timestamp": timestamp_actual,
-                                    "latencia_ms": 0
-                                }
-                        
-                        bytes_disponibles = ser.in_waiting
-                
-                ser.timeout = timeout_original
-                
-                if timestamp_actual - self.ultimo_timestamp < 0.1:
-                    return {
-                        "success": True,
-                        "peso": round(self.ultimo_peso, 3),
-                        "raw_data": self.ultimo_raw_data,
-                        "formato_detectado": "cache_reciente",
-                        "metodo": "cache_ultimo",
-                        "timestamp": self.ultimo_timestamp,
-                        "latencia_ms": int((timestamp_actual - self.ultimo_timestamp) * 1000)
-                    }
-                
-                return {
-                    "success": True,
-                    "peso": round(self.ultimo_peso, 3),
-                    "raw_data": self.ultimo_raw_data,
-                    "formato_detectado": "cache",
-                    "metodo": "esperando_nuevos_datos",
-                    "timestamp": self.ultimo_timestamp,
-                    "latencia_ms": int((timestamp_actual - self.ultimo_timestamp) * 1000)
-                }
-                
-            except Exception as e:
-                ser.timeout = timeout_original
-                raise e
-                
-        except Exception as e:
-            print(f"Error en tiempo real: {e}", file=sys.stderr)
-            return {
-                "success": False,
-                "error": f"Error lectura tiempo real: {str(e)}",
-                "requiere_conexion": True
-            }
-
-    def leer_peso_una_vez(self, puerto, baudios=None, timeout=0.1):
-        print(f"Lectura rápida desde {puerto} con timeout {timeout}s", file=sys.stderr)
-        
-        configs_a_probar = self.configuraciones_comunes
-        
-        if baudios:
-            configs_a_probar = [
-                {'baudrate': baudios, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'timeout': timeout}
-            ] + self.configuraciones_comunes
-
-        for config in configs_a_probar:
-            try:
-                ser = serial.Serial(
-                    port=puerto,
-                    baudrate=config['baudrate'],
-                    bytesize=config['bytesize'],
-                    parity=config['parity'],
-                    stopbits=config['stopbits'],
-                    timeout=config['timeout']
-                )
+    if comando == 'listar_puertos':
+        return {"comando": "listar_puertos"}, 5.0
 
-                time.sleep(0.1)
-                ser.reset_input_buffer()
-                
-                if ser.in_waiting > 0:
-                    data = ser.read(ser.in_waiting).decode('ascii', errors='ignore')
-                    peso, formato = self._extraer_peso_universal(data)
-                    if peso is not None:
-                        ser.close()
-                        return {
-                            "success": True,
-                            "peso": peso,
-                            "configuracion": config,
-                            "metodo": "buffer_inmediato"
-                        }
-                
-                for cmd in self.comandos_solicitud:
-                    try:
-                        ser.reset_input_buffer()
-                        ser.write(cmd)
-                        time.sleep(0.1)
-                        
-                        if ser.in_waiting > 0:
-                            data = ser.read(ser.in_waiting).decode('ascii', errors='ignore')
-                            peso, formato = self._extraer_peso_universal(data)
-                            if peso is not None:
-                                ser.close()
-                                return {
-                                    "success": True,
-                                    "peso": peso,
-                                    "configuracion": config,
-                                    "formato_detectado": formato,
-                                    "metodo": "comando_solicitud"
-                                }
-                    except:
-                        continue
-                
-                ser.close()
-                
-            except Exception as e:
-                try:
-                    ser.close()
-                except:
-                    pass
-                continue
-
-        return {
-            "success": False,
-            "error": f"No se pudo leer peso desde {puerto}",
-            "puerto": puerto
-        }
-
-    def _extraer_peso_universal(self, datos):
-        if not datos or len(datos) < 2:
-            return None, "sin_datos"
-
-        # 1. Braumker YP200 (prioridad alta por formato específico)
-        match = re.search(r'(ST|US),GS,([+-]?\d+\.\d{2})kg', datos)
-        if match:
-            try:
-                peso = float(match.group(2))
-                if 0.001 <= peso <= 1000:
-                    return peso, "braumker_yp200"
-            except:
-                pass
+    if comando == 'conectar':
+        solicitud = {"comando": "conectar"}
+        if posicionales:
+            solicitud["puerto"] = posicionales[0]
+        if len(posicionales) >= 2:
+            solicitud["timeout"] = float(posicionales[1])
+        return solicitud, 30.0
 
-        # 2. Torrey (ST,GS formato)
-        if 'ST,GS' in datos:
-            match = re.search(r'ST,GS[, ]*([0-9]+\.[0-9]+)', datos)
-            if match:
-                try:
-                    peso = float(match.group(1))
-                    if 0.001 <= peso <= 1000:
-                        return peso, "torrey"
-                except:
-                    pass
-
-        # 3. CAS (N o T seguido de número)
-        match = re.search(r'[NT](\d+\.?\d*)', datos)
-        if match:
-            try:
-                peso = float(match.group(1))
-                if 0.001 <= peso <= 1000:
-                    return peso, "cas"
-            except:
-                pass
+    if comando == 'leer' and posicionales:
+        solicitud = {"comando": "leer", "puerto": posicionales[0]}
+        if len(posicionales) >= 3:
+            solicitud["timeout"] = float(posicionales[2])
+        return solicitud, 30.0
 
-        # 4. Números con signo (+/-)
-        match = re.search(r'[+-]?(\d+\.?\d*)', datos)
-        if match:
-            try:
-                peso = float(match.group(1))
-                if 0.001 <= peso <= 1000:
-                    return peso, "signed"
-            except:
-                pass
+    if comando == 'leer_estable' and posicionales:
+        plazo = float(posicionales[1]) if len(posicionales) >= 2 else 10.0
+        return {"comando": "leer_estable", "puerto": posicionales[0], "plazo": plazo}, plazo + 30.0
 
-        # 5. Decimal simple
-        match = re.search(r'(\d+\.\d+)', datos)
-        if match:
-            try:
-                peso = float(match.group(1))
-                if 0.001 <= peso <= 1000:
-                    return peso, "simple"
-            except:
-                pass
+    if comando == 'leer_todas':
+        return {"comando": "leer_todas", "puertos": posicionales}, 30.0
 
-        # 6. Números grandes (gramos)
-        match = re.search(r'(\d{3,})', datos)
-        if match:
-            try:
-                peso = float(match.group(1))
-                if peso > 1000:
-                    peso = peso / 1000.0
-                if 0.001 <= peso <= 1000:
-                    return peso, "gramos"
-            except:
-                pass
+    if comando == 'cerrar':
+        # El daemon cierra todas sus básculas con puerto None: eso se pide explícitamente con --todas
+        if posicionales:
+            return {"comando": "cerrar", "puerto": posicionales[0]}, 5.0
+        if '--todas' in argumentos:
+            return {"comando": "cerrar", "puerto": None}, 5.0
 
-        return None, "desconocido"
+    return None, None
 
-    def cerrar_conexion(self):
-        if self.conexion_activa:
-            try:
-                if self.conexion_activa.is_open:
-                    self.conexion_activa.reset_input_buffer()
-                    self.conexion_activa.reset_output_buffer()
-                    time.sleep(0.05)  # Reducido
-                    self.conexion_activa.close()
-                print(f"Conexión cerrada correctamente", file=sys.stderr)
-            except Exception as e:
-                print(f"Error cerrando: {e}", file=sys.stderr)
-            finally:
-                self.conexion_activa = None
-                self.config_activa = None
 
+def _reenviar_al_daemon(comando, argumentos):
+    """True si un daemon atendió la orden; con el daemon caído la orden se ejecuta en este proceso."""
+    solicitud, timeout = _solicitud_daemon(comando, argumentos)
+    direccion = direccion_daemon(argumentos)
+    if solicitud is None or direccion is None:
+        return False
 
-def listar_puertos():
     try:
-        ports = serial.tools.list_ports.comports()
-        result = []
-        for port in ports:
-            result.append({
-                "device": port.device,
-                "name": port.name,
-                "description": port.description
-            })
-        return result
-    except Exception as e:
-        return {"error": str(e)}
+        resultado = consultar_daemon(direccion, solicitud, timeout, PLAZO_CONEXION_DAEMON)
+    except DaemonNoDisponible:
+        return False
+    print(json.dumps(resultado))
+    return True
+
+
+def _opciones_salida(argumentos, banda_muerta):
+    """--salida json|ndjson|binario, --banda-muerta, --hz-maximo, --latido s y --vaciado-ms de leer_continuo/leer_rapido."""
+    hz_maximo = _leer_opcion(argumentos, '--hz-maximo')
+    return {
+        "formato": _leer_opcion(argumentos, '--salida', 'json'),
+        "banda_muerta": float(_leer_opcion(argumentos, '--banda-muerta', banda_muerta)),
+        "hz_maximo": float(hz_maximo) if hz_maximo else None,
+        "latido": float(_leer_opcion(argumentos, '--latido', 1.0)),
+        "vaciado": float(_leer_opcion(argumentos, '--vaciado-ms', 50.0)) / 1000.0
+    }
+
+
+def _transmitir(detector, salida):
+    """Pasa cada lectura nueva a la salida hasta un error de conexión; mientras el supervisor reconecta, espera."""
+    secuencia = 0
+    espera = 0.1
+    while True:
+        lectura = detector.esperar_lectura(secuencia, timeout=espera)
+        if lectura is not None and lectura.secuencia > secuencia:
+            salida.ofrecer(lectura, omitidas=lectura.secuencia - secuencia - 1 if secuencia else 0)
+            secuencia = lectura.secuencia
+        else:
+            resultado = detector.leer_peso_tiempo_real()
+            if not resultado.get("success"):
+                salida.estado(resultado)
+                if not resultado.get("reconectando"):
+                    return
+        espera = salida.atender()
+
 
+def _cerrar_salida(salida):
+    try:
+        resumen = salida.cerrar()
+    except BrokenPipeError:
+        resumen = salida.resumen()
+    print(json.dumps(resumen), file=sys.stderr)
 
-detector_global = None
 
-def obtener_detector():
-    global detector_global
-    if detector_global is None:
-        detector_global = DetectorUniversalBasculas()
-    return detector_global
+def _interrumpir(senal, marco):
+    raise KeyboardInterrupt
 
 
 def main():
@@ -460,136 +118,371 @@ def main():
     comando = sys.argv[1]
 
     try:
+        if _reenviar_al_daemon(comando, sys.argv):
+            return
+
+        if comando == 'cerrar':
+            # Sin puerto ni --todas no se reenvía; un proceso recién creado no tiene conexiones abiertas
+            # y no hace falta cargar pyserial
+            print(json.dumps({"success": True, "mensaje": "Sin conexiones abiertas"}))
+            return
+
+        if comando not in ('estadisticas', 'metricas', 'leer_shm'):
+            from basculas_nucleo import configurar_log
+            configurar_log(_leer_opcion(sys.argv, '--log-nivel'))
+
         if comando == 'listar_puertos':
+            from basculas_nucleo import listar_puertos
             resultado = listar_puertos()
             print(json.dumps(resultado))
 
         elif comando == 'conectar':
+            from basculas_nucleo import obtener_detector, detectar_basculas
             detector = obtener_detector()
-            if len(sys.argv) >= 3:
-                puerto = sys.argv[2]
-                timeout = float(sys.argv[3]) if len(sys.argv) >= 4 else 0.1
+            argumentos = _posicionales(sys.argv[2:])
+            if argumentos:
+                puerto = argumentos[0]
+                timeout = float(argumentos[1]) if len(argumentos) >= 2 else 0.1
                 resultado = detector.detectar_y_conectar(puerto, timeout)
                 print(json.dumps(resultado))
             else:
-                puertos = listar_puertos()
-                for p in puertos:
-                    print(f"Probando {p['device']}...", file=sys.stderr)
-                    resultado = detector.detectar_y_conectar(p['device'], timeout=0.1)
-                    if resultado.get("success"):
-                        print(json.dumps(resultado))
-                        break
+                reporte = detectar_basculas(detener_al_primero=True)
+                if reporte and reporte[0].get("detectada"):
+                    mejor = reporte[0]
+                    resultado = detector.detectar_y_conectar(mejor['puerto'], 0.1, [mejor['configuracion']])
+                    resultado["reporte"] = reporte
+                    print(json.dumps(resultado))
                 else:
-                    print(json.dumps({"success": False, "error": "No se detectó ninguna báscula"}))
+                    print(json.dumps({"success": False, "error": "No se detectó ninguna báscula", "reporte": reporte}))
+
+        elif comando == 'detectar':
+            from basculas_nucleo import detectar_basculas
+            plazo = float(_leer_opcion(sys.argv, '--plazo', 2.0))
+            puertos = _posicionales(sys.argv[2:])
+            print(json.dumps(detectar_basculas(puertos or None, plazo), indent=2))
 
         elif comando == 'leer':
+            from basculas_nucleo import obtener_detector
             detector = obtener_detector()
             
             if detector.conexion_activa and detector.conexion_activa.is_open:
                 resultado = detector.leer_peso_tiempo_real()
                 print(json.dumps(resultado))
             else:
-                if len(sys.argv) >= 3:
-                    puerto = sys.argv[2]
-                    baudios = int(sys.argv[3]) if len(sys.argv) >= 4 else None
-                    timeout = float(sys.argv[4]) if len(sys.argv) >= 5 else 0.1
+                argumentos = _posicionales(sys.argv[2:])
+                if argumentos:
+                    puerto = argumentos[0]
+                    baudios = int(argumentos[1]) if len(argumentos) >= 2 else None
+                    timeout = float(argumentos[2]) if len(argumentos) >= 3 else 0.1
                     resultado = detector.leer_peso_una_vez(puerto, baudios, timeout)
                     print(json.dumps(resultado))
                 else:
                     print(json.dumps({"success": False, "error": "Se requiere puerto para lectura única"}))
 
+        elif comando == 'leer_estable':
+            from basculas_nucleo import obtener_detector
+            argumentos = _posicionales(sys.argv[2:])
+            if argumentos:
+                puerto = argumentos[0]
+                plazo = float(argumentos[1]) if len(argumentos) >= 2 else 10.0
+                detector = obtener_detector()
+                detector.lector_en_segundo_plano = True
+
+                resultado = detector.detectar_y_conectar(puerto, timeout=0.05)
+                if resultado.get("success"):
+                    resultado = detector.esperar_peso_estable(plazo)
+                    detector.cerrar_conexion()
+                print(json.dumps(resultado))
+            else:
+                print(json.dumps({"success": False, "error": "Uso: detector.py leer_estable <puerto> [plazo_s]"}))
+
         elif comando == 'leer_continuo':
+            from basculas_nucleo import obtener_detector, FiltroPesos, SalidaLecturas, crear_registro
             detector = obtener_detector()
-            
-            intervalo = 0.01
-            
+            detector.lector_en_segundo_plano = True
+            detector.hz_sondeo = float(_leer_opcion(sys.argv, '--hz-sondeo', detector.hz_sondeo))
+            if _leer_opcion(sys.argv, '--filtro'):
+                detector.filtro = FiltroPesos.desde_texto(_leer_opcion(sys.argv, '--filtro'))
+            detector.registro = crear_registro(_leer_opcion(sys.argv, '--registro'), _leer_opcion(sys.argv, '--registro-modo'))
+            detector.directorio_memoria = directorio_memoria(sys.argv)
+
+            argumentos = _posicionales(sys.argv[2:])
+            if argumentos:
+                puerto = argumentos[0]
+                print(f"Conectando a {puerto}...", file=sys.stderr)
+                if detector.detectar_y_conectar(puerto, timeout=0.05).get("success"):
+                    detector.supervisar()
+
             print("Iniciando LECTURA TIEMPO REAL (Ctrl+C para salir)...", file=sys.stderr)
-            print("Frecuencia: 100Hz | Intervalo: 10ms", file=sys.stderr)
-            print("Mínimo lag garantizado", file=sys.stderr)
+            print("Publicación por trama recibida (hilo lector)", file=sys.stderr)
 
-            ultimo_peso_impreso = 0
-            contador = 0
-            
+            salida = SalidaLecturas(detector, **_opciones_salida(sys.argv, banda_muerta=0.001))
             try:
-                while True:
-                    contador += 1
-                    
-                    resultado = detector.leer_peso_tiempo_real()
-                    
-                    peso_actual = resultado.get("peso", 0)
-                    if (abs(peso_actual - ultimo_peso_impreso) > 0.001) or (contador % 10 == 0):
-                        print(json.dumps(resultado), flush=True)
-                        ultimo_peso_impreso = peso_actual
-                    
-                    time.sleep(intervalo)
-                    
-            except KeyboardInterrupt:
+                _transmitir(detector, salida)
+            except (KeyboardInterrupt, BrokenPipeError):
                 print("\nLectura tiempo real detenida", file=sys.stderr)
-                print(f"Ciclos totales: {contador}", file=sys.stderr)
+            finally:
+                detector.cerrar_conexion()
+                if detector.registro is not None:
+                    detector.registro.cerrar()
+                _cerrar_salida(salida)
 
         elif comando == 'leer_rapido':
+            from basculas_nucleo import obtener_detector, SalidaLecturas
             detector = obtener_detector()
-            
-            if len(sys.argv) >= 3:
-                puerto = sys.argv[2]
+            detector.lector_en_segundo_plano = True
+
+            argumentos = _posicionales(sys.argv[2:])
+            if argumentos:
+                puerto = argumentos[0]
                 if not detector.conexion_activa or not detector.conexion_activa.is_open:
                     print(f"Conectando a {puerto}...", file=sys.stderr)
                     detector.detectar_y_conectar(puerto, timeout=0.05)
-                
-                print("Modo RÁPIDO activado (máxima frecuencia)", file=sys.stderr)
-                print("Leyendo a ~500Hz", file=sys.stderr)
-                
+
+                print("Modo RÁPIDO activado (una salida por cambio de peso)", file=sys.stderr)
+
+                salida = SalidaLecturas(detector, **_opciones_salida(sys.argv, banda_muerta=0.0))
                 try:
-                    while True:
-                        resultado = detector.leer_peso_tiempo_real()
-                        print(json.dumps(resultado), flush=True)
-                        time.sleep(0.002)
-                except KeyboardInterrupt:
+                    _transmitir(detector, salida)
+                except (KeyboardInterrupt, BrokenPipeError):
                     print("\nModo rápido detenido", file=sys.stderr)
+                finally:
+                    detector.cerrar_conexion()
+                    _cerrar_salida(salida)
             else:
                 print(json.dumps({"error": "Uso: detector.py leer_rapido <puerto>"}))
 
-        elif comando == 'cerrar':
-            detector = obtener_detector()
-            detector.cerrar_conexion()
-            print(json.dumps({"success": True, "mensaje": "Conexión cerrada"}))
+        elif comando == 'benchmark':
+            from basculas_nucleo import benchmark_lectura
+            puertos = _posicionales(sys.argv[2:])
+            formato_simulado = _leer_opcion(sys.argv, '--simulado')
+            if not puertos and not formato_simulado:
+                print(json.dumps({"error": "Uso: detector.py benchmark <puerto> | --simulado <formato> [--duracion s] [--hz n] [--modo hilo|sondeo]"}))
+            else:
+                resultado = benchmark_lectura(
+                    puertos[0] if puertos else None,
+                    duracion=float(_leer_opcion(sys.argv, '--duracion', 5.0)),
+                    hz=float(_leer_opcion(sys.argv, '--hz', 50.0)),
+                    modo=_leer_opcion(sys.argv, '--modo', 'hilo'),
+                    formato_simulado=formato_simulado,
+                    hz_bascula=float(_leer_opcion(sys.argv, '--hz-bascula', 50.0))
+                )
+                print(json.dumps(resultado, indent=2))
 
         elif comando == 'test_latencia':
-            detector = obtener_detector()
-            
-            if len(sys.argv) >= 3:
-                puerto = sys.argv[2]
-                if not detector.conexion_activa or not detector.conexion_activa.is_open:
-                    detector.detectar_y_conectar(puerto, timeout=0.05)
-                
-                print("Test de latencia iniciado", file=sys.stderr)
-                print("Midiendo tiempo de respuesta...", file=sys.stderr)
-                
-                tiempos = []
-                for i in range(50):
-                    inicio = time.time()
-                    resultado = detector.leer_peso_tiempo_real()
-                    fin = time.time()
-                    latencia = (fin - inicio) * 1000
-                    tiempos.append(latencia)
-                    
-                    if resultado.get("success"):
-                        print(f"[{i+1:02d}] Peso: {resultado.get('peso', 0):.3f} | Latencia: {latencia:.2f}ms")
-                    else:
-                        print(f"[{i+1:02d}] Error: {resultado.get('error', 'Desconocido')}")
-                    
-                    time.sleep(0.02)
-                
-                if tiempos:
-                    print(f"\nESTADÍSTICAS DE LATENCIA:", file=sys.stderr)
-                    print(f"   Mínima: {min(tiempos):.2f}ms", file=sys.stderr)
-                    print(f"   Máxima: {max(tiempos):.2f}ms", file=sys.stderr)
-                    print(f"   Promedio: {sum(tiempos)/len(tiempos):.2f}ms", file=sys.stderr)
-                
+            # Conservado por compatibilidad: ~50 llamadas como antes, ahora con percentiles
+            from basculas_nucleo import benchmark_lectura
+            argumentos = _posicionales(sys.argv[2:])
+            if argumentos:
+                print(json.dumps(benchmark_lectura(argumentos[0], duracion=1.0, hz=50.0), indent=2))
             else:
                 print(json.dumps({"error": "Uso: detector.py test_latencia <puerto>"}))
 
+        elif comando == 'benchmark_decodificador':
+            from basculas_nucleo import benchmark_decodificador
+            argumentos = _posicionales(sys.argv[2:])
+            duracion = float(argumentos[0]) if argumentos else 1.0
+            print(json.dumps(benchmark_decodificador(duracion), indent=2))
+
+        elif comando == 'simular':
+            from basculas_nucleo import SimuladorBascula
+            duracion = _leer_opcion(sys.argv, '--duracion')
+            desconectar_cada = _leer_opcion(sys.argv, '--desconectar-cada')
+            semilla = _leer_opcion(sys.argv, '--semilla')
+            simulador = SimuladorBascula(
+                formato=_leer_opcion(sys.argv, '--formato', 'braumker_yp200'),
+                hz=float(_leer_opcion(sys.argv, '--hz', 10)),
+                baudios=int(_leer_opcion(sys.argv, '--baudios', 9600)),
+                peso_objetivo=float(_leer_opcion(sys.argv, '--peso', 25.0)),
+                subida_s=float(_leer_opcion(sys.argv, '--subida', 1.0)),
+                ruido=float(_leer_opcion(sys.argv, '--ruido', 0.0)),
+                cortes=float(_leer_opcion(sys.argv, '--cortes', 0.0)),
+                desconectar_cada=float(desconectar_cada) if desconectar_cada else None,
+                solo_comando='--solo-comando' in sys.argv,
+                comando=_leer_opcion(sys.argv, '--comando'),
+                enlace=_leer_opcion(sys.argv, '--enlace'),
+                semilla=int(semilla) if semilla else None
+            )
+            try:
+                simulador.ejecutar(float(duracion) if duracion else None)
+            except KeyboardInterrupt:
+                pass
+            print(f"Tramas enviadas: {simulador.tramas_enviadas}", file=sys.stderr)
+
+        elif comando == 'servir':
+            import signal
+            import threading
+            from basculas_nucleo import crear_registro
+            from basculas_servidor import (
+                ServidorBasculas, ServidorBasculasAsincrono, crear_servidor, crear_servidor_sse, servir_asincrono
+            )
+            socket_unix = _leer_opcion(sys.argv, '--socket')
+            direccion = f"unix://{socket_unix}" if socket_unix else _leer_opcion(sys.argv, '--tcp', DIRECCION_DAEMON_DEFECTO)
+
+            registro = crear_registro(_leer_opcion(sys.argv, '--registro'), _leer_opcion(sys.argv, '--registro-modo'))
+            if registro is not None:
+                print(f"Registrando {registro.modo} en {registro.ruta}", file=sys.stderr)
+            # SIGTERM (systemd, supervisor) sale por el mismo camino que Ctrl+C para vaciar el registro
+            signal.signal(signal.SIGTERM, _interrumpir)
+
+            # Las dos variantes del daemon aceptan las mismas opciones
+            opciones = dict(
+                reconexion='--sin-reconexion' not in sys.argv,
+                basculas=_basculas_configuradas(sys.argv),
+                registro=registro,
+                hz_sondeo=float(_leer_opcion(sys.argv, '--hz-sondeo', 20.0)),
+                filtro=_leer_opcion(sys.argv, '--filtro'),
+                memoria=directorio_memoria(sys.argv)
+            )
+            banda_muerta = float(_leer_opcion(sys.argv, '--banda-muerta', 0.001))
+
+            if '--asyncio' in sys.argv:
+                import asyncio
+                try:
+                    asyncio.run(servir_asincrono(direccion, ServidorBasculasAsincrono(banda_muerta, **opciones)))
+                except KeyboardInterrupt:
+                    print("\nServidor detenido", file=sys.stderr)
+                finally:
+                    if registro is not None:
+                        registro.cerrar()
+                return
+
+            servidor = crear_servidor(direccion, ServidorBasculas(banda_muerta, **opciones))
+            print(f"Servidor de básculas escuchando en {direccion}", file=sys.stderr)
+
+            direccion_sse = _leer_opcion(sys.argv, '--sse')
+            if direccion_sse:
+                servidor_sse = crear_servidor_sse(
+                    direccion_sse, servidor.basculas, float(_leer_opcion(sys.argv, '--latido', 5.0))
+                )
+                threading.Thread(target=servidor_sse.serve_forever, name="sse", daemon=True).start()
+                print(f"Streaming SSE en http://{direccion_sse}/stream?puerto=<puerto>", file=sys.stderr)
+
+            direccion_metricas = _leer_opcion(sys.argv, '--metricas')
+            if direccion_metricas and direccion_metricas != direccion_sse:
+                servidor_metricas = crear_servidor_sse(direccion_metricas, servidor.basculas, 5.0)
+                threading.Thread(target=servidor_metricas.serve_forever, name="metricas", daemon=True).start()
+            if direccion_metricas or direccion_sse:
+                print(f"Métricas en http://{direccion_metricas or direccion_sse}/metrics", file=sys.stderr)
+
+            try:
+                servidor.serve_forever()
+            except KeyboardInterrupt:
+                print("\nServidor detenido", file=sys.stderr)
+            finally:
+                servidor.server_close()
+                servidor.basculas.cerrar_todo()
+                if registro is not None:
+                    registro.cerrar()
+
+        elif comando == 'reproducir':
+            # reproducir <registro.sqlite> [--puerto P] [--velocidad 1|10|0] [--desde ts] [--hasta ts] [--resumen]
+            from basculas_nucleo import reproducir_registro
+            argumentos = _posicionales(sys.argv[2:])
+            if not argumentos:
+                raise ValueError("Uso: reproducir <registro> [--puerto P] [--velocidad N] [--desde ts] [--hasta ts] [--resumen]")
+            desde = _leer_opcion(sys.argv, '--desde')
+            hasta = _leer_opcion(sys.argv, '--hasta')
+            try:
+                resumen = reproducir_registro(
+                    argumentos[0],
+                    puerto=_leer_opcion(sys.argv, '--puerto'),
+                    velocidad=float(_leer_opcion(sys.argv, '--velocidad', 1.0)),
+                    desde=float(desde) if desde else None,
+                    hasta=float(hasta) if hasta else None,
+                    salida=None if '--resumen' in sys.argv else sys.stdout
+                )
+            except (KeyboardInterrupt, BrokenPipeError):
+                return
+            print(json.dumps(resumen), file=sys.stderr if '--resumen' not in sys.argv else sys.stdout)
+
+        elif comando == 'decodificar_captura':
+            # decodificar_captura <captura> [destino.csv|destino.npz] [--procesos N] [--baudios B] [--inicio ts]
+            #                     [--bloque-mb M]
+            from basculas_nucleo import decodificar_captura
+            argumentos = _posicionales(sys.argv[2:])
+            if not argumentos:
+                raise ValueError("Uso: decodificar_captura <captura> [destino.csv|destino.npz] [--procesos N] "
+                                 "[--baudios B] [--inicio ts] [--bloque-mb M]")
+            destino = argumentos[1] if len(argumentos) > 1 else None
+            try:
+                resumen = decodificar_captura(
+                    argumentos[0],
+                    destino,
+                    procesos=int(_leer_opcion(sys.argv, '--procesos', 1)),
+                    baudios=int(_leer_opcion(sys.argv, '--baudios', 9600)),
+                    origen=float(_leer_opcion(sys.argv, '--inicio', 0.0)),
+                    tamano_bloque=int(float(_leer_opcion(sys.argv, '--bloque-mb', 8)) * (1 << 20))
+                )
+            except (KeyboardInterrupt, BrokenPipeError):
+                return
+            # Sin destino las filas van a stdout y el resumen a stderr
+            print(json.dumps(resumen, indent=2), file=sys.stdout if destino else sys.stderr)
+
+        elif comando == 'leer_todas':
+            # Sin daemon se abren las básculas indicadas solo para esta lectura:
+            # leer_todas [--daemon DIR] [--bascula ID=PUERTO ...] [puertos...]
+            from basculas_nucleo import GestorBasculas
+            gestor = GestorBasculas(_basculas_configuradas(sys.argv), reconexion=False)
+            for puerto in _posicionales(sys.argv[2:]):
+                gestor.registrar(puerto, puerto)
+            try:
+                resultado = gestor.leer_todas()
+            finally:
+                gestor.cerrar_todo()
+            print(json.dumps(resultado))
+
+        elif comando == 'estadisticas':
+            # El historial vive en el daemon: estadisticas <puerto|id> [ventana_ms] [--daemon DIR]
+            argumentos = _posicionales(sys.argv[2:])
+            if not argumentos:
+                raise ValueError("Uso: estadisticas <puerto|id> [ventana_ms]")
+            resultado = consultar_daemon(direccion_daemon(sys.argv) or DIRECCION_DAEMON_DEFECTO, {
+                "comando": "estadisticas",
+                "puerto": argumentos[0],
+                "ventana_ms": float(argumentos[1]) if len(argumentos) > 1 else 1000.0
+            })
+            print(json.dumps(resultado))
+
+        elif comando == 'leer_shm':
+            # Última lectura publicada por otro proceso con --shm: leer_shm <puerto|archivo.shm> [--shm DIR]
+            argumentos = _posicionales(sys.argv[2:])
+            if not argumentos:
+                raise ValueError("Uso: leer_shm <puerto|archivo.shm> [--shm DIR]")
+            ruta = argumentos[0]
+            if not ruta.endswith(".shm"):
+                directorio = directorio_memoria(sys.argv)
+                if not directorio:
+                    raise ValueError("Indique el directorio de los segmentos con --shm DIR o BASCULA_SHM")
+                ruta = ruta_memoria(directorio, ruta)
+            lector = LectorMemoria(ruta)
+            try:
+                print(json.dumps(lector.resultado()))
+            finally:
+                lector.cerrar()
+
+        elif comando == 'metricas':
+            # Métricas del daemon en ejecución: metricas [--daemon tcp://H:P] [--formato prometheus|json]
+            formato = _leer_opcion(sys.argv, '--formato', 'prometheus')
+            respuesta = consultar_daemon(
+                direccion_daemon(sys.argv) or DIRECCION_DAEMON_DEFECTO,
+                {"comando": "metricas", "formato": formato}
+            )
+            if formato == 'prometheus' and respuesta.get("success"):
+                sys.stdout.write(respuesta["texto"])
+            else:
+                print(json.dumps(respuesta))
+
+        elif comando == 'benchmark_arranque':
+            # Coste de arrancar la CLI sin daemon: benchmark_arranque [--repeticiones N] [--presupuesto-ms M]
+            from basculas_nucleo import benchmark_arranque
+            print(json.dumps(benchmark_arranque(
+                repeticiones=int(_leer_opcion(sys.argv, '--repeticiones', 10)),
+                presupuesto_ms=float(_leer_opcion(sys.argv, '--presupuesto-ms', 0)) or None
+            ), indent=2))
+
         else:
+            from basculas_nucleo import obtener_detector
             puerto = comando
             detector = obtener_detector()
             resultado = detector.detectar_y_conectar(puerto, timeout=0.1)
@@ -601,4 +494,4 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+# Antes de importar los módulos: la caché se fija al importar y no debe tocar la del usuario
+os.environ["BASCULA_CACHE"] = os.path.join(tempfile.mkdtemp(prefix="basculas-"), "cache.json")
+os.environ["BASCULA_DAEMON"] = "off"
+for variable in ("BASCULA_SHM", "BASCULA_FILTRO"):
+    os.environ.pop(variable, None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from basculas_nucleo import SimuladorBascula  # noqa: E402
+
+solo_posix = pytest.mark.skipif(os.name != "posix", reason="SimuladorBascula usa un par pseudo-terminal")
+
+
+def esperar(condicion, plazo=5.0):
+    limite = time.monotonic() + plazo
+    while not condicion():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+@pytest.fixture
+def simulador(tmp_path):
+    """Arranca un SimuladorBascula en un hilo con un enlace fijo (sobrevive a sus desconexiones) y lo detiene al final."""
+    corriendo = []
+
+    def arrancar(formato="torrey", **opciones):
+        opciones = dict({"hz": 20.0, "peso_objetivo": 25.0, "subida_s": 0.0}, **opciones)
+        enlace = str(tmp_path / f"bascula{len(corriendo)}")
+        bascula = SimuladorBascula(formato, enlace=enlace, anunciar=False, **opciones)
+        hilo = threading.Thread(target=bascula.ejecutar, daemon=True)
+        hilo.start()
+        corriendo.append((bascula, hilo))
+        assert esperar(lambda: os.path.lexists(enlace)), "El simulador no creó el puerto"
+        return bascula
+
+    yield arrancar
+
+    for bascula, hilo in corriendo:
+        bascula.detener()
+        hilo.join(5.0)
@@ -0,0 +1,71 @@
+import json
+import os
+import pty
+
+from basculas_nucleo import CacheDetecciones, DetectorUniversalBasculas
+from conftest import solo_posix
+
+OCHO_N_UNO = {"baudrate": 9600, "bytesize": 8, "parity": "N", "stopbits": 1}
+SIETE_E_UNO = {"baudrate": 2400, "bytesize": 7, "parity": "E", "stopbits": 1}
+
+
+def test_escrituras_de_dos_procesos_se_combinan(tmp_path):
+    # Dos instancias equivalen a dos procesos: cada una tiene su copia en memoria
+    ruta = str(tmp_path / "cache.json")
+    cli, daemon = CacheDetecciones(ruta), CacheDetecciones(ruta)
+    assert cli.obtener("/dev/ttyA") is None
+
+    daemon.guardar("/dev/ttyB", dict(OCHO_N_UNO, timeout=0.1), "torrey")
+    cli.guardar("/dev/ttyA", SIETE_E_UNO)
+
+    with open(ruta, encoding="utf-8") as f:
+        entradas = json.load(f)
+    assert sorted(e["puerto"] for e in entradas.values()) == ["/dev/ttyA", "/dev/ttyB"]
+    assert cli.obtener("/dev/ttyB")["configuracion"] == OCHO_N_UNO
+    assert not [nombre for nombre in os.listdir(tmp_path) if nombre.endswith(".tmp")]
+
+
+def test_guardar_en_segundo_plano(tmp_path):
+    cache = CacheDetecciones(str(tmp_path / "cache.json"))
+    cache.guardar("/dev/ttyA", OCHO_N_UNO)
+    cache.guardar_en_segundo_plano("/dev/ttyA", OCHO_N_UNO, "cas")
+    cache._pendientes.join()
+    assert cache.obtener("/dev/ttyA")["protocolo"] == "cas"
+
+
+def _detector(tmp_path):
+    detector = DetectorUniversalBasculas()
+    detector.cache_detecciones = CacheDetecciones(str(tmp_path / "cache.json"))
+    return detector
+
+
+@solo_posix
+def test_silencio_no_borra_la_entrada(tmp_path):
+    maestro, esclavo = pty.openpty()
+    puerto = os.ttyname(esclavo)
+    detector = _detector(tmp_path)
+    try:
+        detector.cache_detecciones.guardar(puerto, OCHO_N_UNO, "torrey")
+        # Báscula aún arrancando: nadie escribe en la línea
+        assert not detector.detectar_y_conectar(puerto)["success"]
+        assert detector.cache_detecciones.obtener(puerto)["protocolo"] == "torrey"
+    finally:
+        detector.cerrar_conexion()
+        os.close(maestro)
+        os.close(esclavo)
+
+
+@solo_posix
+def test_otra_configuracion_reemplaza_la_entrada(simulador, tmp_path):
+    bascula = simulador("torrey")
+    detector = _detector(tmp_path)
+    try:
+        # Un pty acepta cualquier velocidad y encuadre: la configuración guardada falla por ser inválida
+        guardada = dict(SIETE_E_UNO, bytesize=9)
+        detector.cache_detecciones.guardar(bascula.enlace, guardada, "cas")
+        assert detector.detectar_y_conectar(bascula.enlace)["success"]
+        entrada = detector.cache_detecciones.obtener(bascula.enlace)
+        assert entrada["configuracion"] == OCHO_N_UNO
+        assert entrada["protocolo"] is None
+    finally:
+        detector.cerrar_conexion()
@@ -0,0 +1,76 @@
+import csv
+
+import pytest
+
+from basculas_nucleo import DecodificadorPesos, decodificar_captura
+
+# Empieza con la cola de una trama cortada y mezcla líneas que ningún protocolo reconoce
+TRAMAS = [
+    f"{'ST' if i % 10 else 'US'},GS,{i / 4:+08.2f}kg" if i % 25 else "ERR 07"
+    for i in range(1, 400)
+]
+CAPTURA = b"4kg\r\n" + b"".join(t.encode("ascii") + b"\r\n" for t in TRAMAS)
+
+
+@pytest.fixture
+def captura(tmp_path):
+    ruta = tmp_path / "captura.bin"
+    ruta.write_bytes(CAPTURA)
+    return str(ruta)
+
+
+def _filas(ruta):
+    with open(ruta, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_igual_que_la_lectura_en_vivo(captura, tmp_path):
+    destino = str(tmp_path / "salida.csv")
+    resumen = decodificar_captura(captura, destino, baudios=9600, origen=100.0)
+
+    decodificador = DecodificadorPesos()
+    esperado = [decodificador.decodificar(t) for t in TRAMAS]
+    esperado = [(peso, formato) for peso, formato in esperado if peso is not None]
+    filas = _filas(destino)
+    assert [(float(f["peso"]), f["formato"]) for f in filas] == esperado
+
+    assert resumen["tramas"] == len(TRAMAS)
+    assert resumen["fallidas"] == len(TRAMAS) - len(esperado)
+    assert resumen["bytes_descartados"] == 3
+    assert resumen["formatos"]["braumker_yp200"]["tramas"] == len(esperado)
+
+    # El tiempo sale del desplazamiento a baudios / 10 bytes por segundo
+    primera = filas[0]
+    assert int(primera["desplazamiento"]) == len(b"4kg\r\n")
+    assert float(primera["tiempo"]) == pytest.approx(100.0 + 5 / 960.0, abs=1e-6)
+
+
+def test_bloques_pequenos_dan_el_mismo_resultado(captura, tmp_path):
+    entero, partido = str(tmp_path / "entero.csv"), str(tmp_path / "partido.csv")
+    resumen_entero = decodificar_captura(captura, entero)
+    # Bloques de ~512 bytes: decenas de cortes, cada uno retomado desde el tramo solapado
+    resumen_partido = decodificar_captura(captura, partido, tamano_bloque=64, longitud_maxima=256)
+
+    assert resumen_partido["bloques"] > 10
+    assert _filas(partido) == _filas(entero)
+    for clave in ("tramas", "decodificadas", "fallidas", "bytes_descartados", "formatos"):
+        assert resumen_partido[clave] == resumen_entero[clave], clave
+
+
+def test_salida_npz(captura, tmp_path):
+    np = pytest.importorskip("numpy")
+    destino = str(tmp_path / "salida.npz")
+    decodificar_captura(captura, destino, tamano_bloque=64)
+    columnas = np.load(destino)
+    decodificar_captura(captura, str(tmp_path / "salida.csv"), tamano_bloque=64)
+    filas = _filas(str(tmp_path / "salida.csv"))
+    assert columnas["peso"].tolist() == [float(f["peso"]) for f in filas]
+    assert columnas["estable"].tolist() == [f["estable"] == "True" for f in filas]
+
+
+def test_captura_vacia(tmp_path):
+    ruta = tmp_path / "vacia.bin"
+    ruta.write_bytes(b"")
+    resumen = decodificar_captura(str(ruta), str(tmp_path / "salida.csv"))
+    assert (resumen["bloques"], resumen["tramas"]) == (0, 0)
+    assert _filas(str(tmp_path / "salida.csv")) == []
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+
+import pytest
+
+from basculas_cliente import DaemonNoDisponible, consultar_daemon
+from basculas_servidor import ServidorBasculas, ServidorBasculasAsincrono, crear_servidor
+from conftest import solo_posix
+
+pytestmark = solo_posix
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    direccion = f"unix://{tmp_path / 'd.sock'}"
+    servidor = crear_servidor(direccion, ServidorBasculas(reconexion=False))
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield direccion
+    servidor.shutdown()
+    servidor.basculas.cerrar_todo()
+    servidor.server_close()
+
+
+def test_ida_y_vuelta_json(simulador, daemon):
+    bascula = simulador("braumker_yp200")
+
+    conectado = consultar_daemon(daemon, {"comando": "conectar", "puerto": bascula.enlace})
+    assert conectado["success"], conectado
+    assert conectado["configuracion"]["baudrate"] == 9600
+
+    lectura = consultar_daemon(daemon, {"comando": "leer", "puerto": bascula.enlace})
+    assert lectura["success"], lectura
+    assert lectura["peso"] == 25.0
+    assert lectura["formato_detectado"] == "braumker_yp200"
+
+    estado = consultar_daemon(daemon, {"comando": "estado"})
+    assert estado["basculas"][bascula.enlace]["conectado"]
+
+    cerrado = consultar_daemon(daemon, {"comando": "cerrar", "puerto": bascula.enlace})
+    assert cerrado["puertos"] == [bascula.enlace]
+
+
+def test_errores_viajan_como_json(daemon):
+    assert consultar_daemon(daemon, {"comando": "leer"}) == {
+        "success": False, "error": "Se requiere puerto para 'leer'"
+    }
+    respuesta = consultar_daemon(daemon, {"comando": "inexistente", "puerto": "/dev/null"})
+    assert respuesta == {"success": False, "error": "Comando desconocido: inexistente"}
+
+
+def test_sin_daemon(tmp_path):
+    with pytest.raises(DaemonNoDisponible):
+        consultar_daemon(f"unix://{tmp_path / 'nadie.sock'}", {"comando": "estado"})
+
+
+def _sesion_asincrona(ruta, dialogo, **opciones):
+    """Corre `dialogo(consultar)` contra un ServidorBasculasAsincrono servido por un socket unix."""
+    async def sesion():
+        basculas = ServidorBasculasAsincrono(**opciones)
+        servidor = await asyncio.start_unix_server(basculas._atender_cliente, path=ruta)
+
+        async def consultar(solicitud):
+            # consultar_daemon bloquea: se ejecuta fuera del bucle que atiende
+            return await asyncio.to_thread(consultar_daemon, f"unix://{ruta}", solicitud, 5.0)
+
+        try:
+            return basculas, await dialogo(consultar)
+        finally:
+            servidor.close()
+            await basculas.cerrar_todo()
+
+    return asyncio.run(sesion())
+
+
+def test_ida_y_vuelta_json_asincrono(simulador, tmp_path):
+    bascula = simulador("cas")
+
+    async def dialogo(consultar):
+        return [await consultar(solicitud) for solicitud in (
+            {"comando": "conectar", "bascula": "banco"},
+            {"comando": "leer", "bascula": "banco"},
+            {"comando": "estado"},
+            {"comando": "estadisticas", "bascula": "banco"},
+        )]
+
+    basculas, (conectado, lectura, estado, estadisticas) = _sesion_asincrona(
+        str(tmp_path / "a.sock"), dialogo, basculas={"banco": bascula.enlace}, filtro="mediana=3"
+    )
+
+    assert conectado["success"], conectado
+    assert lectura["success"], lectura
+    assert lectura["peso"] == 25.0
+    assert lectura["metodo"] == "bucle_eventos"
+    assert estado["basculas"][bascula.enlace]["ids"] == ["banco"]
+    assert estadisticas["success"] and estadisticas["puerto"] == bascula.enlace
+    detector = basculas.detectores[bascula.enlace]
+    assert detector.filtro.mediana == 3
+    # cerrar_todo usa el cerrar_conexion síncrono heredado: quita el lector del bucle y el supervisor
+    assert detector.conexion_activa is None and detector.supervisor is None
+
+
+def test_reconexion_asincrona(simulador, tmp_path):
+    bascula = simulador(desconectar_cada=1.0)
+
+    async def dialogo(consultar):
+        antes = await consultar({"comando": "leer", "puerto": bascula.enlace})
+        for _ in range(100):
+            estado = (await consultar({"comando": "estado"}))["basculas"][bascula.enlace]
+            if estado["reconexiones"] >= 1 and estado["estado"] == "conectado":
+                break
+            await asyncio.sleep(0.1)
+        return antes, await consultar({"comando": "leer", "puerto": bascula.enlace}), estado
+
+    _, (antes, despues, estado) = _sesion_asincrona(str(tmp_path / "a.sock"), dialogo)
+
+    assert antes["success"], antes
+    assert estado["reconexiones"] >= 1, estado
+    assert despues["success"], despues
+    assert despues["peso"] == 25.0
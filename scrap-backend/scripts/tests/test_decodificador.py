@@ -0,0 +1,50 @@
+import pytest
+
+from basculas_nucleo import CORPUS_TRAMAS, DecodificadorPesos, EnsambladorTramas
+
+# Lo que devuelve el decodificador para cada trama de CORPUS_TRAMAS; "signed" entrega la magnitud
+LINEA_BASE = {
+    "braumker_yp200": [12.34, 3.5, 150.0],
+    "torrey": [25.5, 0.85, 120.125],
+    "cas": [12.5, 1.2, 45.5],
+    "signed": [12.345, 8.2, 250.0],
+    "gramos": [12.345, 25.5, 150.0],
+}
+
+
+@pytest.mark.parametrize("formato", sorted(CORPUS_TRAMAS))
+def test_corpus_contra_linea_base(formato):
+    assert sorted(LINEA_BASE) == sorted(CORPUS_TRAMAS)
+    for trama, peso in zip(CORPUS_TRAMAS[formato], LINEA_BASE[formato]):
+        assert DecodificadorPesos().decodificar(trama) == (peso, formato)
+
+
+@pytest.mark.parametrize("formato", sorted(CORPUS_TRAMAS))
+def test_corpus_con_protocolo_fijado(formato):
+    decodificador = DecodificadorPesos()
+    decodificador.fijar_protocolo(formato)
+    pesos = [decodificador.decodificar(trama) for trama in CORPUS_TRAMAS[formato]]
+    assert pesos == [(peso, formato) for peso in LINEA_BASE[formato]]
+
+
+def test_ensamblador_une_tramas_partidas():
+    ensamblador = EnsambladorTramas()
+    # Lo anterior al primer delimitador es la cola de una trama cortada
+    assert ensamblador.alimentar(b"0kg\r\nST,GS,+0012") == []
+    assert ensamblador.bytes_descartados == 3
+    assert ensamblador.alimentar(b".34kg\r\nUS,GS,+0003.50kg\r\n") == ["ST,GS,+0012.34kg", "US,GS,+0003.50kg"]
+
+
+def test_rampa_en_gramos_no_se_fija_en_otro_formato():
+    # Una báscula en gramos que sube desde cero: ninguna trama debe leerse como kg ni perderse al pasar 1000 g
+    decodificador = DecodificadorPesos()
+    for gramos in range(100, 30000, 100):
+        assert decodificador.decodificar(f"{gramos:06d}") == (gramos / 1000.0, "gramos")
+    assert decodificador.protocolo_fijado.nombre == "gramos"
+    assert decodificador.decodificar_trama("000500").unidad == "kg"
+
+
+def test_signed_exige_signo_o_decimales():
+    assert DecodificadorPesos().decodificar("+3") == (3.0, "signed")
+    assert DecodificadorPesos().decodificar("12.5") == (12.5, "signed")
+    assert DecodificadorPesos().decodificar("250") == (0.25, "gramos")
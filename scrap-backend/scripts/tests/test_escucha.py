@@ -0,0 +1,58 @@
+import os
+import pty
+import time
+
+import pytest
+
+from basculas_nucleo import DetectorUniversalBasculas, puntuar_encuadre
+from conftest import solo_posix
+
+TRAFICO = b"".join(b"ST,GS, %7.3f kg\r\n" % (25 + i / 100) for i in range(5))
+
+
+def _con_paridad(datos, impar=False):
+    """Los bytes como los ve un puerto 8N1 cuando la báscula transmite 7 bits + paridad."""
+    return bytes(b | ((bin(b).count("1") & 1 ^ impar) << 7) for b in datos)
+
+
+@pytest.mark.parametrize("datos, encuadre", [
+    (TRAFICO, (8, "N")),
+    (_con_paridad(TRAFICO), (7, "E")),
+    (_con_paridad(TRAFICO, impar=True), (7, "O")),
+])
+def test_puntaje_elige_el_encuadre_de_la_captura(datos, encuadre):
+    puntajes = {e: puntuar_encuadre(datos, *e)[0] for e in ((8, "N"), (7, "E"), (7, "O"))}
+    assert max(puntajes, key=puntajes.get) == encuadre
+    puntaje, _, trama = puntuar_encuadre(datos, *encuadre)
+    assert puntaje == pytest.approx(1.0)
+    assert (trama.peso, trama.formato) == (25.04, "torrey")
+
+
+def test_puntaje_sin_datos():
+    assert puntuar_encuadre(b"") == (0.0, {"bytes": 0}, None)
+
+
+@solo_posix
+def test_escucha_del_simulador(simulador):
+    bascula = simulador("torrey")
+    resultado = DetectorUniversalBasculas().escuchar_configuracion(bascula.enlace)
+    assert resultado["configuracion"] == {"baudrate": 9600, "bytesize": 8, "parity": "N", "stopbits": 1}
+    assert (resultado["protocolo"], resultado["peso"]) == ("torrey", 25.0)
+    # Un puntaje casi perfecto en la primera velocidad no prueba las demás
+    assert resultado["ventanas"] == 1
+
+
+@solo_posix
+def test_linea_en_silencio_se_abandona_en_la_primera_ventana():
+    maestro, esclavo = pty.openpty()
+    detector = DetectorUniversalBasculas()
+    try:
+        inicio = time.monotonic()
+        resultado = detector.escuchar_configuracion(os.ttyname(esclavo))
+        assert resultado["configuracion"] is None
+        assert resultado["error"] == "Sin tráfico en la línea"
+        assert resultado["ventanas"] == 1
+        assert time.monotonic() - inicio < detector.plazo_escucha * 2
+    finally:
+        os.close(maestro)
+        os.close(esclavo)
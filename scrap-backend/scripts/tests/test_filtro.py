@@ -0,0 +1,62 @@
+import pytest
+
+from basculas_nucleo import DecodificadorPesos, FiltroPesos
+
+
+def _filtrar(filtro, textos, paso=0.1):
+    """Pasa tramas "signed" a `paso` s una de otra; None donde el filtro rechaza."""
+    decodificador = DecodificadorPesos()
+    decodificador.fijar_protocolo("signed")
+    return [filtro.filtrar(decodificador.decodificar_trama(t), t, i * paso) for i, t in enumerate(textos)]
+
+
+def test_por_defecto_no_descarta_saltos():
+    filtro = FiltroPesos.desde_texto("")
+    assert filtro.velocidad_maxima is None
+    assert _filtrar(filtro, ["+001.00", "+900.00", "+001.00"]) == [1.0, 900.0, 1.0]
+
+
+def test_velocidad_derivada_de_la_capacidad():
+    assert FiltroPesos(capacidad=150).velocidad_maxima == pytest.approx(1500.0)
+    # Una velocidad explícita manda sobre la capacidad
+    assert FiltroPesos.desde_texto("capacidad=150,velocidad=300").velocidad_maxima == 300.0
+
+
+def test_pico_aislado_se_descarta():
+    filtro = FiltroPesos(velocidad=50)
+    assert _filtrar(filtro, ["+025.00", "+090.00", "+025.00"]) == [25.0, None, 25.0]
+    assert filtro.motivo is None
+
+
+def test_salto_confirmado_es_carga_real():
+    filtro = FiltroPesos(velocidad=50, confirmaciones=3)
+    pesos = _filtrar(filtro, ["+001.00", "+090.00", "+090.00", "+090.00", "+090.00"])
+    assert pesos == [1.0, None, None, 90.0, 90.0]
+
+
+def test_forma_nueva_se_adopta_tras_confirmaciones():
+    filtro = FiltroPesos(confirmaciones=2)
+    assert _filtrar(filtro, ["+025.00", "+025.0", "+025.0", "+025.0"]) == [25.0, None, 25.0, 25.0]
+    # Una trama cortada aislada no cambia la forma establecida
+    assert _filtrar(filtro, ["+25.0", "+025.0"]) == [None, 25.0]
+    assert filtro.motivo is None
+
+
+def test_mediana_quita_el_valor_atipico():
+    filtro = FiltroPesos(mediana=3)
+    assert _filtrar(filtro, ["+010.00", "+010.00", "+040.00", "+010.00"]) == [10.0, 10.0, 10.0, 10.0]
+
+
+def test_ema_suaviza():
+    filtro = FiltroPesos(ema=0.5)
+    assert _filtrar(filtro, ["+001.00", "+011.00", "+011.00"]) == [1.0, 6.0, 8.5]
+
+
+def test_mediana_antes_que_ema():
+    filtro = FiltroPesos.desde_texto("mediana=3,ema=0.5")
+    assert _filtrar(filtro, ["+010.00", "+010.00", "+090.00", "+010.00"]) == [10.0, 10.0, 10.0, 10.0]
+
+
+def test_opcion_desconocida():
+    with pytest.raises(ValueError, match="Opción de filtro desconocida"):
+        FiltroPesos.desde_texto("ventana=3")
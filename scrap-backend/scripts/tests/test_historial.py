@@ -0,0 +1,43 @@
+from basculas_nucleo import HistorialPesos
+
+
+def test_capacidad_por_defecto_cubre_la_ventana_maxima():
+    historial = HistorialPesos()
+    paso = 1.0 / HistorialPesos.HZ_MAXIMO
+    for i in range(historial.capacidad):
+        historial.agregar(1.0, i * paso)
+    ahora = (historial.capacidad - 1) * paso
+
+    resultado = historial.ventana(HistorialPesos.VENTANA_MAXIMA_MS, ahora)
+    assert resultado["muestras"] == historial.capacidad
+    assert resultado["truncada"] is False
+
+
+def test_ventana_acotada_al_maximo():
+    historial = HistorialPesos(capacidad=8)
+    historial.agregar(2.0, 0.0)
+    assert historial.ventana(10 ** 9, 1.0)["ventana_ms"] == HistorialPesos.VENTANA_MAXIMA_MS
+
+
+def test_ventana_mayor_que_el_buffer_se_marca_truncada():
+    historial = HistorialPesos(capacidad=10)
+    for segundo in range(20):
+        historial.agregar(float(segundo), float(segundo))
+
+    completa = historial.ventana(5000, 19.0)
+    assert (completa["muestras"], completa["minimo"], completa["truncada"]) == (6, 14.0, False)
+
+    # La ventana de 60 s empieza antes de la muestra más antigua que conserva el buffer
+    parcial = historial.ventana(60000, 19.0)
+    assert (parcial["muestras"], parcial["minimo"], parcial["truncada"]) == (10, 10.0, True)
+    assert parcial["cubierta_ms"] == 9000
+
+
+def test_pico_y_pesadas():
+    historial = HistorialPesos(capacidad=16)
+    for instante, (peso, estable) in enumerate([(0.0, True), (5.0, False), (5.0, True), (5.0, True),
+                                                (0.0, True), (3.0, True)]):
+        historial.agregar(peso, float(instante), estable)
+    assert historial.pesadas == 2
+    # Volver a cero reinicia el pico
+    assert historial.pico_desde_tara == 3.0
@@ -0,0 +1,91 @@
+import threading
+import time
+
+from basculas_cliente import LectorMemoria, ruta_memoria
+from basculas_nucleo import GestorBasculas, LecturaPeso, PublicadorMemoria
+from conftest import esperar, solo_posix
+
+
+def _lectura(peso, secuencia, formato="torrey", estable=True):
+    return LecturaPeso(peso, formato, "", time.monotonic(), secuencia, estable)
+
+
+def test_publicar_y_leer(tmp_path):
+    ruta = str(tmp_path / "b.shm")
+    publicador = PublicadorMemoria(ruta, "/dev/ttyUSB0")
+    lector = LectorMemoria(ruta)
+    try:
+        assert lector.puerto == "/dev/ttyUSB0"
+        assert lector.resultado()["success"] is False
+
+        publicador.marcar_conexion(True)
+        publicador.publicar(_lectura(12.5, 7))
+        instantanea = lector.leer()
+        assert instantanea.peso == 12.5
+        assert instantanea.lecturas == 7
+        assert instantanea.secuencia % 2 == 0
+
+        resultado = lector.resultado()
+        assert resultado["success"]
+        assert resultado["estable"] is True
+        assert resultado["formato_detectado"] == "torrey"
+
+        publicador.marcar_conexion(False)
+        assert lector.resultado() == {
+            "success": False, "error": "Báscula desconectada", "puerto": "/dev/ttyUSB0", "peso": 12.5,
+            "metodo": "memoria_compartida"
+        }
+    finally:
+        lector.cerrar()
+        publicador.cerrar()
+
+
+def test_seqlock_nunca_entrega_registros_mezclados(tmp_path):
+    ruta = str(tmp_path / "b.shm")
+    publicador = PublicadorMemoria(ruta, "COM3")
+    lector = LectorMemoria(ruta)
+    terminado = threading.Event()
+
+    def escribir():
+        secuencia = 0
+        while not terminado.is_set():
+            secuencia += 1
+            publicador.publicar(_lectura(float(secuencia), secuencia, estable=bool(secuencia & 1)))
+
+    escritor = threading.Thread(target=escribir, daemon=True)
+    escritor.start()
+    try:
+        ultima = 0
+        limite = time.monotonic() + 1.0
+        while time.monotonic() < limite:
+            instantanea = lector.leer()
+            # Peso, contador y estabilidad vienen de la misma publicación y nunca retroceden
+            assert instantanea.peso == instantanea.lecturas
+            assert instantanea.estable == instantanea.lecturas & 1
+            assert instantanea.lecturas >= ultima
+            ultima = instantanea.lecturas
+        assert ultima > 0
+    finally:
+        terminado.set()
+        escritor.join()
+        lector.cerrar()
+        publicador.cerrar()
+
+
+@solo_posix
+def test_detector_publica_en_memoria(simulador, tmp_path):
+    bascula = simulador("gramos")
+    directorio = str(tmp_path / "shm")
+    gestor = GestorBasculas(reconexion=False, memoria=directorio)
+    try:
+        assert gestor.leer(bascula.enlace)["success"]
+        lector = LectorMemoria(ruta_memoria(directorio, bascula.enlace))
+        try:
+            assert esperar(lambda: lector.resultado()["success"] and lector.leer().lecturas > 0)
+            resultado = lector.resultado()
+            assert resultado["peso"] == 25.0
+            assert resultado["formato_detectado"] == "gramos"
+        finally:
+            lector.cerrar()
+    finally:
+        gestor.cerrar_todo()
@@ -0,0 +1,44 @@
+import pytest
+
+from basculas_nucleo import DetectorUniversalBasculas, RegistroEventos, leer_registro, reproducir_registro
+
+# 25 kg estables, un pico de una sola trama y de nuevo 25 kg: a 10 Hz el pico supera velocidad=50 kg/s
+TRAMAS = ["+25.00"] * 10 + ["+90.00"] + ["+25.00"] * 10
+
+
+@pytest.fixture(autouse=True)
+def filtro_de_picos(monkeypatch):
+    monkeypatch.setenv("BASCULA_FILTRO", "velocidad=50")
+
+
+def _grabar(ruta, modo):
+    registro = RegistroEventos(ruta, modo, intervalo=0.05)
+    detector = DetectorUniversalBasculas()
+    detector.registro = registro
+    detector.ensamblador.sincronizado = True
+    instantes = [100.0 + i * 0.1 for i in range(len(TRAMAS))]
+    for texto, instante in zip(TRAMAS, instantes):
+        detector._decodificar_tramas(texto.encode() + b"\r\n", instante=instante)
+    registro.cerrar()
+    return list(leer_registro(ruta)), instantes
+
+
+def test_registro_guarda_el_instante_de_decodificacion(tmp_path):
+    filas, instantes = _grabar(str(tmp_path / "r.sqlite"), "tramas")
+    assert [fila[1] for fila in filas] == instantes
+    # El pico rechazado queda registrado con el peso que envió la báscula
+    assert [(fila[4], fila[6]) for fila in filas if fila[3] == "+90.00"] == [(90.0, 0)]
+
+
+def test_pico_rechazado_no_duplica_la_pesada_estable(tmp_path):
+    filas, _ = _grabar(str(tmp_path / "r.sqlite"), "estables")
+    assert [(fila[4], fila[6]) for fila in filas] == [(25.0, 1)]
+
+
+def test_reproducir_no_cuenta_rechazos_como_diferencias(tmp_path):
+    ruta = str(tmp_path / "r.sqlite")
+    _grabar(ruta, "tramas")
+    resumen = reproducir_registro(ruta, velocidad=0)
+    assert resumen["tramas"] == resumen["decodificadas"] == len(TRAMAS)
+    assert resumen["rechazadas"] == 1
+    assert resumen["diferencias"] == 0
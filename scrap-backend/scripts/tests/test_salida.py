@@ -0,0 +1,80 @@
+import io
+import json
+import time
+
+from basculas_nucleo import DetectorUniversalBasculas, LecturaPeso, SalidaLecturas
+
+
+def _lectura(peso, secuencia, estable=False):
+    return LecturaPeso(peso, "torrey", f"{peso}kg", time.monotonic(), secuencia, estable)
+
+
+def _salida(formato="ndjson", **opciones):
+    detector = DetectorUniversalBasculas()
+    destino = io.BytesIO()
+    return detector, destino, SalidaLecturas(detector, formato, destino=destino, **opciones)
+
+
+def _lineas(destino):
+    return [json.loads(linea) for linea in destino.getvalue().splitlines()]
+
+
+def test_json_serializa_la_lectura_agrupada():
+    detector, destino, salida = _salida("json", banda_muerta=0.01)
+    # La instantánea del detector ya avanzó: lo emitido debe ser lo ofrecido
+    detector.lectura_actual = _lectura(99.0, 9)
+    salida.ofrecer(_lectura(10.0, 1), ahora=10.0)
+    salida.ofrecer(_lectura(10.005, 2), ahora=10.1)
+    salida.ofrecer(_lectura(12.0, 3), ahora=10.2)
+    salida.cerrar()
+
+    emitidas = _lineas(destino)
+    assert [(e["peso"], e["secuencia"], e["fusionadas"]) for e in emitidas] == [(10.0, 1, 0), (12.0, 3, 1)]
+    assert emitidas[0]["raw_data"] == "10.0kg" and emitidas[0]["formato_detectado"] == "torrey"
+
+
+def test_hz_maximo_retiene_y_descarta_lo_superado():
+    _, destino, salida = _salida(hz_maximo=10)
+    salida.ofrecer(_lectura(1.0, 1), ahora=10.0)
+    salida.ofrecer(_lectura(2.0, 2), ahora=10.01)
+    salida.ofrecer(_lectura(3.0, 3), ahora=10.02)
+    salida.atender(ahora=10.11)
+    salida.cerrar()
+
+    assert [(e["p"], e["s"], e["d"]) for e in _lineas(destino)] == [(1.0, 1, 0), (3.0, 3, 1)]
+    assert salida.resumen()["descartadas"] == 1
+
+
+def test_cambio_retenido_que_vuelve_al_valor_emitido():
+    _, destino, salida = _salida(hz_maximo=10)
+    salida.ofrecer(_lectura(1.0, 1), ahora=10.0)
+    salida.ofrecer(_lectura(2.0, 2), ahora=10.01)
+    salida.ofrecer(_lectura(1.0, 3), ahora=10.02)
+    salida.atender(ahora=10.2)
+    salida.cerrar()
+
+    assert [e["p"] for e in _lineas(destino)] == [1.0]
+    assert (salida.fusionadas, salida.descartadas) == (1, 1)
+
+
+def test_latido_repite_la_ultima_lectura():
+    detector, destino, salida = _salida(latido=1.0)
+    detector.lectura_actual = _lectura(5.0, 1, estable=True)
+    salida.ofrecer(detector.lectura_actual, ahora=10.0)
+    salida.atender(ahora=10.5)
+    salida.atender(ahora=11.0)
+    salida.cerrar()
+
+    assert [(e["p"], e["e"], e.get("l")) for e in _lineas(destino)] == [(5.0, 1, None), (5.0, 1, 1)]
+
+
+def test_binario_registros_de_tamano_fijo():
+    _, destino, salida = _salida("binario")
+    salida.ofrecer(_lectura(7.5, 4, estable=True), ahora=10.0)
+    salida.cerrar()
+
+    datos = destino.getvalue()
+    magia, _, tamano, _ = SalidaLecturas.CABECERA.unpack_from(datos)
+    assert (magia, tamano) == (b"BSCS", SalidaLecturas.REGISTRO.size)
+    _, peso, secuencia, _, _, estable, _, tipo = SalidaLecturas.REGISTRO.unpack(datos[-tamano:])
+    assert (peso, secuencia, estable, tipo) == (7.5, 4, 1, SalidaLecturas.LECTURA)
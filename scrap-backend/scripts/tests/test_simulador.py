@@ -0,0 +1,87 @@
+import pytest
+
+from basculas_nucleo import DetectorUniversalBasculas, GestorBasculas, SimuladorBascula
+from conftest import esperar, solo_posix
+
+pytestmark = solo_posix
+
+
+@pytest.mark.parametrize("formato", SimuladorBascula.FORMATOS)
+def test_conectar_y_leer(simulador, formato):
+    bascula = simulador(formato)
+    detector = DetectorUniversalBasculas()
+    try:
+        resultado = detector.detectar_y_conectar(bascula.enlace)
+        assert resultado["success"], resultado
+        assert resultado["peso"] == 25.0
+
+        # Sin hilo lector cada llamada decodifica lo que llegó desde la anterior
+        lecturas = []
+
+        def trama_nueva():
+            lecturas.append(detector.leer_peso_tiempo_real())
+            return lecturas[-1].get("metodo") == "tiempo_real_instantaneo"
+
+        assert esperar(trama_nueva), lecturas[-1]
+        lectura = lecturas[-1]
+        assert lectura["peso"] == 25.0
+        assert lectura["formato_detectado"] == formato
+    finally:
+        detector.cerrar_conexion()
+
+
+def test_conectar_y_leer_bascula_por_comando(simulador):
+    bascula = simulador("braumker_yp200", solo_comando=True)
+    gestor = GestorBasculas(reconexion=False)
+    try:
+        assert gestor.conectar(bascula.enlace)["success"]
+        lectura = gestor.leer(bascula.enlace)
+        assert lectura["success"], lectura
+        assert lectura["peso"] == 25.0
+    finally:
+        gestor.cerrar_todo()
+
+
+def test_reconecta_tras_desconexion(simulador):
+    bascula = simulador(desconectar_cada=1.0)
+    gestor = GestorBasculas()
+    try:
+        assert gestor.conectar(bascula.enlace)["success"]
+        antes = gestor.leer(bascula.enlace)["secuencia"]
+
+        supervisor = gestor.detectores[bascula.enlace].supervisor
+        assert esperar(lambda: supervisor.reconexiones >= 1, plazo=10.0), gestor.estado()
+        assert esperar(lambda: gestor.estado()[bascula.enlace]["estado"] == "conectado")
+
+        despues = gestor.leer(bascula.enlace)
+        assert despues["success"], despues
+        assert despues["peso"] == 25.0
+        assert despues["secuencia"] > antes
+    finally:
+        gestor.cerrar_todo()
+
+
+def test_gestor_acepta_ids_en_todas_las_llamadas(simulador):
+    bascula = simulador("torrey")
+    gestor = GestorBasculas(basculas={"banco": bascula.enlace}, reconexion=False)
+    try:
+        assert gestor.conectar("banco")["success"]
+        assert gestor.leer("banco")["peso"] == 25.0
+        assert gestor.leer_estable("banco", plazo=5.0)["success"]
+        assert gestor.estadisticas("banco")["puerto"] == bascula.enlace
+        assert gestor.tarar("banco")["success"]
+        # Un solo detector: el ID nunca abre el puerto por segunda vez
+        assert list(gestor.detectores) == [bascula.enlace]
+        assert gestor.cerrar("banco") == [bascula.enlace]
+        assert gestor.detectores[bascula.enlace].conexion_activa is None
+    finally:
+        gestor.cerrar_todo()
+
+
+@pytest.mark.parametrize("solo_comando, metodo", [(False, "buffer_inmediato"), (True, "comando_solicitud")])
+def test_lectura_unica(simulador, solo_comando, metodo):
+    bascula = simulador("cas", solo_comando=solo_comando)
+    # Con baudios explícitos no hay escucha previa: la primera configuración ya es la correcta
+    resultado = DetectorUniversalBasculas().leer_peso_una_vez(bascula.enlace, baudios=9600)
+    assert resultado["success"], resultado
+    assert (resultado["peso"], resultado["formato_detectado"], resultado["metodo"]) == (25.0, "cas", metodo)
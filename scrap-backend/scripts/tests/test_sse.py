@@ -0,0 +1,105 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from basculas_servidor import ServidorBasculas, crear_servidor_sse
+from conftest import solo_posix
+
+pytestmark = solo_posix
+
+
+@pytest.fixture
+def servidor_sse():
+    creados = []
+
+    def crear(**opciones):
+        basculas = ServidorBasculas(reconexion=False, **opciones)
+        servidor = crear_servidor_sse("tcp://127.0.0.1:0", basculas, latido=0.2)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        creados.append(servidor)
+        return servidor.server_address[1]
+
+    yield crear
+    for servidor in creados:
+        servidor.shutdown()
+        servidor.basculas.cerrar_todo()
+        servidor.server_close()
+
+
+def _get(puerto_http, ruta):
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto_http, timeout=5.0)
+    conexion.request("GET", ruta)
+    return conexion, conexion.getresponse()
+
+
+def _bloque(respuesta):
+    """Líneas de un evento SSE o de un comentario, hasta la línea en blanco."""
+    lineas = []
+    while True:
+        linea = respuesta.readline().decode("utf-8").rstrip("\n")
+        if not linea:
+            return lineas
+        lineas.append(linea)
+
+
+def _evento(lineas):
+    campos = dict(linea.split(": ", 1) for linea in lineas)
+    return int(campos["id"]), campos["event"], json.loads(campos["data"])
+
+
+def test_un_evento_por_cambio_y_latidos_sin_cambios(simulador, servidor_sse):
+    bascula = simulador("torrey", subida_s=0.5)
+    conexion, respuesta = _get(servidor_sse(basculas={"banco": bascula.enlace}), "/stream?puerto=banco")
+    try:
+        assert respuesta.status == 200
+        assert respuesta.getheader("Content-Type") == "text/event-stream"
+
+        eventos = []
+        while not eventos or eventos[-1][2]["peso"] != 25.0:
+            eventos.append(_evento(_bloque(respuesta)))
+        assert all(tipo == "peso" for _, tipo, _ in eventos)
+        assert [i for i, _, _ in eventos] == sorted(i for i, _, _ in eventos)
+
+        # Peso quieto: la banda muerta se traga las tramas repetidas y solo quedan latidos
+        assert _bloque(respuesta) == [": latido"]
+        assert _bloque(respuesta) == [": latido"]
+    finally:
+        conexion.close()
+
+
+def test_bascula_inexistente_responde_503(servidor_sse, tmp_path):
+    conexion, respuesta = _get(servidor_sse(), f"/stream?puerto={tmp_path / 'nadie'}")
+    try:
+        assert respuesta.status == 503
+        assert json.loads(respuesta.read())["success"] is False
+    finally:
+        conexion.close()
+
+
+@pytest.mark.parametrize("ruta, estado", [("/stream", 400), ("/otra", 404)])
+def test_solicitudes_invalidas(servidor_sse, ruta, estado):
+    conexion, respuesta = _get(servidor_sse(), ruta)
+    try:
+        assert respuesta.status == estado
+    finally:
+        conexion.close()
+
+
+def test_metricas_prometheus(simulador, servidor_sse):
+    bascula = simulador("cas")
+    puerto_http = servidor_sse()
+    conexion, respuesta = _get(puerto_http, f"/stream?puerto={bascula.enlace}")
+    try:
+        _evento(_bloque(respuesta))
+    finally:
+        conexion.close()
+
+    conexion, respuesta = _get(puerto_http, "/metrics")
+    try:
+        texto = respuesta.read().decode("utf-8")
+        assert "# TYPE bascula_tramas_total counter" in texto
+        assert f'bascula_tramas_total{{puerto="{bascula.enlace}",formato="cas"}}' in texto
+    finally:
+        conexion.close()